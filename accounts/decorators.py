@@ -2,7 +2,7 @@ from functools import wraps
 from django.shortcuts import redirect
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from .models import FeaturePermission
+from .permissions import has_feature
 
 
 def feature_required(feature):
@@ -15,7 +15,7 @@ def feature_required(feature):
         @login_required
         def wrapped_view(request, *args, **kwargs):
             # Check if user has permission
-            if FeaturePermission.user_has_permission(request.user, feature):
+            if has_feature(request.user, feature):
                 return view_func(request, *args, **kwargs)
             else:
                 messages.error(request, 'You do not have permission to access this feature.')
@@ -34,7 +34,7 @@ def admin_or_feature_required(feature):
         @login_required
         def wrapped_view(request, *args, **kwargs):
             if request.user.user_type == 'ADMINISTRATOR' or \
-               FeaturePermission.user_has_permission(request.user, feature):
+               has_feature(request.user, feature):
                 return view_func(request, *args, **kwargs)
             else:
                 messages.error(request, 'You do not have permission to access this feature.')
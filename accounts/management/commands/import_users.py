@@ -0,0 +1,208 @@
+import csv
+import os
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from openpyxl import load_workbook
+
+from accounts.models import User, UserProfile, USER_TYPE_CHOICES, LANGUAGE_CHOICES, COMMUNITY_CHOICES
+from accounts.search import normalize_phone
+from accounts.utils import PHONE_COUNTRY_RULES, format_phone_numbers_with_country
+
+USER_FIELDS = ['first_name', 'last_name', 'email', 'user_type', 'constituency', 'district', 'state', 'preferred_language']
+PROFILE_FIELDS = ['community_type', 'occupation', 'address', 'pincode']
+
+USER_TYPES = {value for value, _ in USER_TYPE_CHOICES}
+LANGUAGES = {value for value, _ in LANGUAGE_CHOICES}
+COMMUNITY_TYPES = {value for value, _ in COMMUNITY_CHOICES}
+
+MAX_LENGTHS = {
+    field: model._meta.get_field(field).max_length
+    for model, fields in ((User, USER_FIELDS), (UserProfile, PROFILE_FIELDS))
+    for field in fields
+    if model._meta.get_field(field).max_length
+}
+
+
+def _clean(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        # Spreadsheets hand back phone numbers and pincodes as floats
+        value = int(value)
+    return str(value).strip()
+
+
+def read_csv(path):
+    with open(path, newline='', encoding='utf-8-sig') as handle:
+        reader = csv.DictReader(handle)
+        if not reader.fieldnames or 'phone_number' not in reader.fieldnames:
+            raise CommandError('Input must have a phone_number column')
+        for row in reader:
+            yield {key.strip(): _clean(value) for key, value in row.items() if key}
+
+
+def read_xlsx(path):
+    # read_only mode streams rows instead of loading the whole sheet
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [_clean(cell) for cell in next(rows, ())]
+        if 'phone_number' not in header:
+            raise CommandError('Input must have a phone_number column')
+        for values in rows:
+            yield {key: _clean(value) for key, value in zip(header, values) if key}
+    finally:
+        workbook.close()
+
+
+class Command(BaseCommand):
+    help = 'Bulk import supporters from a CSV or XLSX file, skipping phone numbers that already exist'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or XLSX file with a phone_number column')
+        parser.add_argument('--country-code', default='+91', help='Country code for numbers without one (default +91)')
+        parser.add_argument('--user-type', default='SUPPORTER', help='user_type for rows that do not set one')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Rows normalized, checked and inserted together')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per INSERT statement')
+        parser.add_argument('--rejects', help='Where to write rejected rows (default: <path>.rejects.csv)')
+        parser.add_argument('--dry-run', action='store_true', help='Validate and report without inserting')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f'File not found: {path}')
+        if options['country_code'] not in PHONE_COUNTRY_RULES:
+            raise CommandError(f"Unsupported country code: {options['country_code']}")
+        if options['user_type'] not in USER_TYPES:
+            raise CommandError(f"Unknown user type: {options['user_type']}")
+
+        self.country_code = options['country_code']
+        self.default_user_type = options['user_type']
+        self.batch_size = options['batch_size']
+        self.dry_run = options['dry_run']
+        # Imported supporters log in with OTP; hash the unusable password once
+        self.password = make_password(None)
+        self.seen = set()
+
+        reader = read_xlsx if path.lower().endswith(('.xlsx', '.xlsm')) else read_csv
+        rejects_path = options['rejects'] or f'{path}.rejects.csv'
+        chunk_size = options['chunk_size']
+
+        started = time.monotonic()
+        total = created = rejected = 0
+        with open(rejects_path, 'w', newline='', encoding='utf-8') as rejects_file:
+            self.rejects = csv.writer(rejects_file)
+            self.rejects.writerow(['row', 'phone_number', 'reason'])
+
+            chunk = []
+            for line, row in enumerate(reader(path), start=2):
+                chunk.append((line, row))
+                if len(chunk) >= chunk_size:
+                    inserted, failed = self.import_chunk(chunk)
+                    total += len(chunk)
+                    created += inserted
+                    rejected += failed
+                    chunk = []
+                    self.stdout.write(f'Processed {total} rows ({created} created, {rejected} rejected)...')
+            if chunk:
+                inserted, failed = self.import_chunk(chunk)
+                total += len(chunk)
+                created += inserted
+                rejected += failed
+
+        elapsed = time.monotonic() - started
+        rate = total / elapsed * 60 if elapsed else total
+        verb = 'Would create' if self.dry_run else 'Created'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {created} users from {total} rows in {elapsed:.1f}s ({rate:.0f} rows/min); '
+            f'{rejected} rejected, see {rejects_path}'
+        ))
+
+    def reject(self, line, row, reason):
+        self.rejects.writerow([line, row.get('phone_number', ''), reason])
+
+    def import_chunk(self, chunk):
+        phones = format_phone_numbers_with_country([row.get('phone_number') for _, row in chunk], self.country_code)
+
+        candidates = []
+        rejected = 0
+        for (line, row), (phone, error) in zip(chunk, phones):
+            if error is None:
+                error = self.validate(row, phone)
+            if error:
+                self.reject(line, row, error)
+                rejected += 1
+                continue
+            self.seen.add(phone)
+            candidates.append((line, row, phone))
+
+        # One indexed IN lookup per chunk instead of one query per row
+        numbers = [phone for _, _, phone in candidates]
+        existing = set(User.objects.filter(phone_number__in=numbers).values_list('phone_number', flat=True))
+        # Usernames follow OTP signup, which uses the phone number itself
+        taken_usernames = set(User.objects.filter(username__in=numbers).values_list('username', flat=True))
+
+        users, profiles = [], []
+        for line, row, phone in candidates:
+            if phone in existing:
+                self.reject(line, row, 'Phone number already registered')
+                rejected += 1
+                continue
+            if phone in taken_usernames:
+                self.reject(line, row, f'Username {phone} already taken')
+                rejected += 1
+                continue
+            users.append(self.build_user(row, phone))
+            profiles.append(self.build_profile(row))
+
+        if users and not self.dry_run:
+            with transaction.atomic():
+                # bulk_create skips User.save(), which fills phone_digits;
+                # build_user sets it instead. Primary keys come back from the
+                # INSERT on PostgreSQL and SQLite.
+                User.objects.bulk_create(users, batch_size=self.batch_size)
+                for user, profile in zip(users, profiles):
+                    profile.user = user
+                UserProfile.objects.bulk_create(profiles, batch_size=self.batch_size)
+
+        return len(users), rejected
+
+    def validate(self, row, phone):
+        if phone in self.seen:
+            return 'Duplicate phone number in file'
+        if row.get('user_type') and row['user_type'].upper() not in USER_TYPES:
+            return f"Unknown user type: {row['user_type']}"
+        if row.get('user_type', '').upper() == 'ADMINISTRATOR':
+            return 'Administrators cannot be imported'
+        if row.get('preferred_language') and row['preferred_language'].lower() not in LANGUAGES:
+            return f"Unknown language: {row['preferred_language']}"
+        if row.get('community_type') and row['community_type'].upper() not in COMMUNITY_TYPES:
+            return f"Unknown community type: {row['community_type']}"
+        if row.get('pincode') and not (row['pincode'].isdigit() and len(row['pincode']) == 6):
+            return f"Invalid pincode: {row['pincode']}"
+        if row.get('email') and '@' not in row['email']:
+            return f"Invalid email: {row['email']}"
+        for field, max_length in MAX_LENGTHS.items():
+            if len(row.get(field, '')) > max_length:
+                return f'{field} is longer than {max_length} characters'
+        return None
+
+    def build_user(self, row, phone):
+        values = {field: row.get(field, '') for field in USER_FIELDS}
+        values['user_type'] = values['user_type'].upper() or self.default_user_type
+        values['preferred_language'] = values['preferred_language'].lower() or 'hi'
+        return User(
+            username=phone,
+            phone_number=phone,
+            phone_digits=normalize_phone(phone),
+            password=self.password,
+            **values
+        )
+
+    def build_profile(self, row):
+        values = {field: row.get(field, '') for field in PROFILE_FIELDS}
+        values['community_type'] = values['community_type'].upper()
+        return UserProfile(**values)
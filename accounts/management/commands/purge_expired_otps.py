@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from accounts.models import PhoneVerification
+
+
+class Command(BaseCommand):
+    help = 'Delete expired PhoneVerification rows in small batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows deleted per statement')
+        parser.add_argument('--sleep', type=float, default=0.1, help='Seconds to pause between batches')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        pause = options['sleep']
+        cutoff = timezone.now()
+        total = 0
+
+        while True:
+            # Delete by primary key so each statement only locks one batch of rows
+            batch = list(PhoneVerification.objects.filter(
+                expires_at__lt=cutoff
+            ).values_list('pk', flat=True)[:batch_size])
+            if not batch:
+                break
+
+            deleted, _ = PhoneVerification.objects.filter(pk__in=batch).delete()
+            total += deleted
+            self.stdout.write(f'Deleted {total} expired OTP rows...')
+
+            if len(batch) < batch_size:
+                break
+            time.sleep(pause)
+
+        self.stdout.write(self.style.SUCCESS(f'Purged {total} expired OTP rows'))
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 03:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_featurepermission'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='phoneverification',
+            name='otp_code',
+            field=models.CharField(max_length=64),
+        ),
+    ]
@@ -0,0 +1,86 @@
+# Generated by Django 4.2.7 on 2026-10-17 03:14
+
+from django.db import migrations, models
+
+TRIGRAM_COLUMNS = ['first_name', 'last_name', 'email']
+
+
+def backfill_phone_digits(apps, schema_editor):
+    User = apps.get_model('accounts', 'User')
+    batch = []
+    for user in User.objects.only('id', 'phone_number').iterator(chunk_size=2000):
+        user.phone_digits = ''.join(filter(str.isdigit, user.phone_number or ''))
+        batch.append(user)
+        if len(batch) >= 2000:
+            User.objects.bulk_update(batch, ['phone_digits'])
+            batch = []
+    if batch:
+        User.objects.bulk_update(batch, ['phone_digits'])
+
+
+def create_text_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        # Expression indexes match the UPPER(col::text) LIKE ... that icontains generates
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        for column in TRIGRAM_COLUMNS:
+            schema_editor.execute(
+                f"CREATE INDEX IF NOT EXISTS accounts_user_{column}_trgm "
+                f"ON accounts_user USING gin ((UPPER({column}::text)) gin_trgm_ops)"
+            )
+    elif vendor == 'sqlite':
+        # External-content FTS5 table kept in sync by triggers (local development)
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS accounts_user_fts USING fts5("
+            "first_name, last_name, email, content='accounts_user', content_rowid='id')"
+        )
+        schema_editor.execute(
+            "CREATE TRIGGER IF NOT EXISTS accounts_user_fts_ai AFTER INSERT ON accounts_user BEGIN "
+            "INSERT INTO accounts_user_fts(rowid, first_name, last_name, email) "
+            "VALUES (new.id, new.first_name, new.last_name, new.email); END"
+        )
+        schema_editor.execute(
+            "CREATE TRIGGER IF NOT EXISTS accounts_user_fts_ad AFTER DELETE ON accounts_user BEGIN "
+            "INSERT INTO accounts_user_fts(accounts_user_fts, rowid, first_name, last_name, email) "
+            "VALUES ('delete', old.id, old.first_name, old.last_name, old.email); END"
+        )
+        schema_editor.execute(
+            "CREATE TRIGGER IF NOT EXISTS accounts_user_fts_au AFTER UPDATE ON accounts_user BEGIN "
+            "INSERT INTO accounts_user_fts(accounts_user_fts, rowid, first_name, last_name, email) "
+            "VALUES ('delete', old.id, old.first_name, old.last_name, old.email); "
+            "INSERT INTO accounts_user_fts(rowid, first_name, last_name, email) "
+            "VALUES (new.id, new.first_name, new.last_name, new.email); END"
+        )
+        schema_editor.execute("INSERT INTO accounts_user_fts(accounts_user_fts) VALUES ('rebuild')")
+
+
+def drop_text_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        for column in TRIGRAM_COLUMNS:
+            schema_editor.execute(f"DROP INDEX IF EXISTS accounts_user_{column}_trgm")
+    elif vendor == 'sqlite':
+        for suffix in ('ai', 'ad', 'au'):
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS accounts_user_fts_{suffix}")
+        schema_editor.execute("DROP TABLE IF EXISTS accounts_user_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_alter_phoneverification_otp_code'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='phone_digits',
+            field=models.CharField(blank=True, editable=False, max_length=15),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['phone_digits'], name='accounts_user_phone_digits', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.RunPython(backfill_phone_digits, migrations.RunPython.noop),
+        migrations.RunPython(create_text_search_indexes, drop_text_search_indexes),
+    ]
@@ -51,6 +51,7 @@ class UserManager(BaseUserManager):
 
 class User(AbstractUser):
     phone_number = models.CharField(max_length=15, unique=True)
+    phone_digits = models.CharField(max_length=15, blank=True, editable=False)  # digits-only copy for prefix search
     is_phone_verified = models.BooleanField(default=False)
     user_type = models.CharField(max_length=20, choices=USER_TYPE_CHOICES, default='SUPPORTER')
     constituency = models.CharField(max_length=100, blank=True)
@@ -66,6 +67,19 @@ class User(AbstractUser):
 
     USERNAME_FIELD = 'phone_number'
     REQUIRED_FIELDS = []  # Remove required fields for easier superuser creation
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # varchar_pattern_ops lets PostgreSQL answer LIKE 'prefix%' from the index
+            models.Index(fields=['phone_digits'], name='accounts_user_phone_digits', opclasses=['varchar_pattern_ops']),
+            # Keyset pagination of the admin user list, newest first (core.pagination)
+            models.Index(fields=['date_joined', 'id'], name='accounts_user_date_joined'),
+        ]
+
+    def save(self, *args, **kwargs):
+        from .search import normalize_phone
+        self.phone_digits = normalize_phone(self.phone_number)
+        super().save(*args, **kwargs)
     
     def __str__(self):
         return f"{self.get_full_name()} ({self.phone_number})"
@@ -94,7 +108,7 @@ class UserProfile(models.Model):
 
 class PhoneVerification(models.Model):
     phone_number = models.CharField(max_length=15)
-    otp_code = models.CharField(max_length=6)
+    otp_code = models.CharField(max_length=64)  # salted HMAC of the code, see accounts.otp_store
     created_at = models.DateTimeField(auto_now_add=True)
     is_verified = models.BooleanField(default=False)
     attempts = models.IntegerField(default=0)
@@ -150,24 +164,18 @@ class FeaturePermission(models.Model):
     @classmethod
     def user_has_permission(cls, user, feature):
         """Check if a user has permission for a specific feature"""
-        # Admins have all permissions
-        if user.user_type == 'ADMINISTRATOR':
-            return True
+        from .permissions import has_feature
 
-        # Check if user has active permission for this feature
-        return cls.objects.filter(
-            user=user,
-            feature=feature,
-            is_active=True
-        ).exists()
+        # Admins have all permissions; everyone else reads the cached snapshot
+        return has_feature(user, feature)
 
     @classmethod
     def get_user_features(cls, user):
         """Get all features a user has access to"""
+        from .permissions import get_feature_snapshot
+
         if user.user_type == 'ADMINISTRATOR':
             return [choice[0] for choice in FEATURE_CHOICES]
 
-        return list(cls.objects.filter(
-            user=user,
-            is_active=True
-        ).values_list('feature', flat=True))
+        snapshot = get_feature_snapshot(user)
+        return [choice[0] for choice in FEATURE_CHOICES if choice[0] in snapshot]
@@ -0,0 +1,132 @@
+"""
+OTP storage backends.
+
+Codes are never stored in clear text: each backend keeps a salted HMAC of the
+phone number and code. The cache backend is used with Redis and keeps an OTP
+and its attempt counter in two keys that expire with the code, so issuing and
+verifying an OTP never touches the PhoneVerification table. The database
+backend is the default, for deployments without a shared cache: with a
+per-process cache a code issued by one worker could not be verified by
+another, and each worker would keep its own attempt counter.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models
+from django.utils import timezone
+from django.utils.crypto import salted_hmac, constant_time_compare
+from django.utils.module_loading import import_string
+
+from .models import PhoneVerification
+
+VERIFIED = 'VERIFIED'
+INVALID = 'INVALID'
+EXPIRED = 'EXPIRED'
+LOCKED = 'LOCKED'
+
+
+def hash_otp(phone_number, otp_code):
+    return salted_hmac('accounts.otp', f"{phone_number}:{otp_code}", algorithm='sha256').hexdigest()
+
+
+class BaseOTPStore:
+    def __init__(self):
+        self.ttl = getattr(settings, 'OTP_TTL_SECONDS', 600)
+        self.max_attempts = getattr(settings, 'OTP_MAX_ATTEMPTS', 5)
+
+    def issue(self, phone_number, otp_code):
+        """Store a new OTP for the phone number, replacing any pending one"""
+        raise NotImplementedError
+
+    def verify(self, phone_number, otp_code):
+        """Check an OTP and consume it on success. Returns a status constant"""
+        raise NotImplementedError
+
+
+class CacheOTPStore(BaseOTPStore):
+    def _otp_key(self, phone_number):
+        return f"otp:code:{phone_number}"
+
+    def _attempts_key(self, phone_number):
+        return f"otp:attempts:{phone_number}"
+
+    def issue(self, phone_number, otp_code):
+        cache.set_many({
+            self._otp_key(phone_number): {
+                'hash': hash_otp(phone_number, otp_code),
+                'issued_at': timezone.now().timestamp(),
+            },
+            self._attempts_key(phone_number): 0,
+        }, self.ttl)
+
+    def verify(self, phone_number, otp_code):
+        otp_key = self._otp_key(phone_number)
+        attempts_key = self._attempts_key(phone_number)
+
+        # Code and attempt counter come back in a single round trip
+        values = cache.get_many([otp_key, attempts_key])
+        entry = values.get(otp_key)
+        if entry is None:
+            return EXPIRED
+
+        if values.get(attempts_key, 0) >= self.max_attempts:
+            return LOCKED
+
+        if constant_time_compare(entry['hash'], hash_otp(phone_number, otp_code)):
+            cache.delete_many([otp_key, attempts_key])
+            return VERIFIED
+
+        try:
+            cache.incr(attempts_key)
+        except ValueError:
+            # Counter expired between the read and the increment
+            pass
+        return INVALID
+
+
+class DatabaseOTPStore(BaseOTPStore):
+    def issue(self, phone_number, otp_code):
+        now = timezone.now()
+        values = {
+            'otp_code': hash_otp(phone_number, otp_code),
+            'expires_at': now + timezone.timedelta(seconds=self.ttl),
+            'attempts': 0,
+            'created_at': now,
+        }
+        # Reuse the pending row in one UPDATE; only insert when there is none
+        updated = PhoneVerification.objects.filter(
+            phone_number=phone_number,
+            is_verified=False
+        ).update(**values)
+        if not updated:
+            PhoneVerification.objects.create(phone_number=phone_number, **values)
+
+    def verify(self, phone_number, otp_code):
+        verification = PhoneVerification.objects.filter(
+            phone_number=phone_number,
+            is_verified=False
+        ).order_by('-created_at').first()
+
+        if verification is None or verification.is_expired:
+            return EXPIRED
+
+        if verification.attempts >= self.max_attempts:
+            return LOCKED
+
+        if constant_time_compare(verification.otp_code, hash_otp(phone_number, otp_code)):
+            PhoneVerification.objects.filter(pk=verification.pk).update(is_verified=True)
+            return VERIFIED
+
+        PhoneVerification.objects.filter(pk=verification.pk).update(attempts=models.F('attempts') + 1)
+        return INVALID
+
+
+_store = None
+
+
+def get_otp_store():
+    """Return the configured OTP store (settings.OTP_STORE_BACKEND)"""
+    global _store
+    if _store is None:
+        backend = getattr(settings, 'OTP_STORE_BACKEND', 'accounts.otp_store.DatabaseOTPStore')
+        _store = import_string(backend)()
+    return _store
@@ -0,0 +1,88 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import FeaturePermission, FEATURE_CHOICES
+
+ALL_FEATURES = frozenset(choice[0] for choice in FEATURE_CHOICES)
+
+# Attribute used to memoise the feature set on the user instance for the
+# lifetime of a request (request.user is shared by views and templates)
+REQUEST_CACHE_ATTR = '_feature_permission_snapshot'
+
+
+def _cache_timeout():
+    return getattr(settings, 'FEATURE_PERMISSION_CACHE_TIMEOUT', 300)
+
+
+def _version_key(user_id):
+    return f"feature_perms:version:{user_id}"
+
+
+def _features_key(user_id, version):
+    return f"feature_perms:{user_id}:v{version}"
+
+
+def _get_version(user_id):
+    version = cache.get(_version_key(user_id))
+    if version is None:
+        version = 1
+        cache.add(_version_key(user_id), version, None)
+    return version
+
+
+def _load_features(user):
+    """Read the user's active features from the database"""
+    return frozenset(FeaturePermission.objects.filter(
+        user=user,
+        is_active=True
+    ).values_list('feature', flat=True))
+
+
+def get_feature_snapshot(user):
+    """
+    Return the frozenset of features the user can access.
+    Resolved at most once per request and shared across requests through
+    a versioned cache entry that is bumped on grant/revoke/delete (unless
+    FEATURE_PERMISSION_CACHE_TIMEOUT is 0).
+    """
+    if not getattr(user, 'is_authenticated', False):
+        return frozenset()
+
+    if user.user_type == 'ADMINISTRATOR':
+        return ALL_FEATURES
+
+    snapshot = getattr(user, REQUEST_CACHE_ATTR, None)
+    if snapshot is not None:
+        return snapshot
+
+    timeout = _cache_timeout()
+    if not timeout:
+        snapshot = _load_features(user)
+    else:
+        key = _features_key(user.pk, _get_version(user.pk))
+        snapshot = cache.get(key)
+        if snapshot is None:
+            snapshot = _load_features(user)
+            cache.set(key, snapshot, timeout)
+
+    setattr(user, REQUEST_CACHE_ATTR, snapshot)
+    return snapshot
+
+
+def has_feature(user, feature):
+    """Check a single feature against the user's snapshot"""
+    return feature in get_feature_snapshot(user)
+
+
+def invalidate_user_features(user):
+    """Drop cached feature sets for a user after their permissions change"""
+    user_id = getattr(user, 'pk', user)
+    key = _version_key(user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # No version stored yet; start past the default so stale entries are ignored
+        cache.set(key, 2, None)
+
+    if hasattr(user, REQUEST_CACHE_ATTR):
+        delattr(user, REQUEST_CACHE_ATTR)
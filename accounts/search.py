@@ -0,0 +1,121 @@
+"""
+User directory search.
+
+Phone lookups use the digits-only User.phone_digits column, which has a
+prefix (varchar_pattern_ops) index, so they are index range scans. Name and
+email lookups use pg_trgm GIN indexes on PostgreSQL and the accounts_user_fts
+FTS5 table on SQLite; both are created in migration 0005. Results are ranked
+best match first.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Case, When, Value, IntegerField, Q
+from django.db.models.functions import Greatest
+
+DEFAULT_COUNTRY_CODE = '91'
+MIN_PHONE_DIGITS = 2
+
+
+def normalize_phone(value):
+    """Digits-only form of a phone number"""
+    return ''.join(filter(str.isdigit, str(value or '')))
+
+
+def _looks_like_phone(query):
+    return bool(re.fullmatch(r'[\d\s+\-()]+', query)) and len(normalize_phone(query)) >= MIN_PHONE_DIGITS
+
+
+def _phone_search(queryset, query):
+    digits = normalize_phone(query)
+    prefixes = [digits]
+    if not digits.startswith(DEFAULT_COUNTRY_CODE):
+        # Numbers are stored with their country code; most searches omit it
+        prefixes.append(DEFAULT_COUNTRY_CODE + digits)
+
+    condition = Q()
+    for prefix in prefixes:
+        condition |= Q(phone_digits__startswith=prefix)
+
+    return queryset.filter(condition).annotate(
+        search_rank=Case(
+            When(phone_digits=digits, then=Value(2)),
+            default=Value(1),
+            output_field=IntegerField(),
+        )
+    ).order_by('-search_rank', 'phone_digits')
+
+
+def _postgres_text_search(queryset, query):
+    from django.contrib.postgres.search import TrigramSimilarity
+
+    # icontains compiles to UPPER(col::text) LIKE UPPER(%term%), which the
+    # gin_trgm_ops expression indexes answer without a sequential scan.
+    # Every word must match one of the columns ("ram nishad")
+    condition = Q()
+    for term in query.split():
+        condition &= (
+            Q(first_name__icontains=term) |
+            Q(last_name__icontains=term) |
+            Q(email__icontains=term)
+        )
+
+    return queryset.filter(condition).annotate(
+        search_rank=Greatest(
+            TrigramSimilarity('first_name', query),
+            TrigramSimilarity('last_name', query),
+            TrigramSimilarity('email', query),
+        )
+    ).order_by('-search_rank', 'first_name', 'last_name')
+
+
+def _sqlite_text_search(queryset, query, limit):
+    terms = re.findall(r'\w+', query)
+    if not terms:
+        return queryset.none()
+
+    match = ' '.join('"{}"*'.format(term.replace('"', '""')) for term in terms)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT rowid FROM accounts_user_fts WHERE accounts_user_fts MATCH %s ORDER BY rank LIMIT %s",
+            [match, limit]
+        )
+        ids = [row[0] for row in cursor.fetchall()]
+
+    ranking = Case(
+        *[When(pk=pk, then=Value(len(ids) - position)) for position, pk in enumerate(ids)],
+        default=Value(0),
+        output_field=IntegerField(),
+    ) if ids else Value(0, output_field=IntegerField())
+    return queryset.filter(pk__in=ids).annotate(search_rank=ranking).order_by('-search_rank')
+
+
+def search_users(query, queryset=None, limit=1000):
+    """
+    Ranked user search by phone prefix, name or email.
+    Returns a queryset annotated with `search_rank`, best match first.
+    `limit` caps the candidate set on the SQLite fallback.
+    """
+    from .models import User
+
+    if queryset is None:
+        queryset = User.objects.all()
+
+    query = (query or '').strip()
+    if not query:
+        return queryset
+
+    if _looks_like_phone(query):
+        return _phone_search(queryset, query)
+
+    if connection.vendor == 'postgresql':
+        return _postgres_text_search(queryset, query)
+
+    if connection.vendor == 'sqlite':
+        return _sqlite_text_search(queryset, query, limit)
+
+    return queryset.filter(
+        Q(first_name__icontains=query) |
+        Q(last_name__icontains=query) |
+        Q(email__icontains=query)
+    )
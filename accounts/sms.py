@@ -0,0 +1,189 @@
+"""
+OTP SMS delivery.
+
+Provider calls run on a small per-process thread pool so login views return
+as soon as the job is queued. Each provider keeps a keep-alive HTTP session
+per delivery thread, requests are bounded by timeouts, transient failures are
+retried with exponential backoff and delivery fails over from MSG91 to Twilio.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+OTP_MESSAGE = "Your NISHAD Party verification code is: {otp_code}. This code will expire in 10 minutes. Do not share this with anyone."
+
+
+class SMSDeliveryError(Exception):
+    """Raised when a provider rejects or fails to deliver a message"""
+
+    def __init__(self, message, retryable=True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class SMSProvider:
+    name = 'base'
+
+    def __init__(self):
+        self._local = threading.local()
+
+    @property
+    def session(self):
+        """Keep-alive session reused by every send on the current thread"""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            self._local.session = session
+        return session
+
+    @property
+    def timeout(self):
+        return getattr(settings, 'OTP_SMS_TIMEOUT', (3.05, 10))
+
+    def post(self, url, **kwargs):
+        try:
+            response = self.session.post(url, timeout=self.timeout, **kwargs)
+        except requests.RequestException as e:
+            raise SMSDeliveryError(f"{self.name} request failed: {e}")
+
+        if response.status_code >= 500 or response.status_code == 429:
+            raise SMSDeliveryError(f"{self.name} returned {response.status_code}")
+        if response.status_code >= 400:
+            raise SMSDeliveryError(f"{self.name} rejected message ({response.status_code})", retryable=False)
+        return response
+
+    def send(self, phone_number, otp_code):
+        raise NotImplementedError
+
+    def deliver(self, phone_number, otp_code):
+        """send(), with any other provider error (a body that is not JSON, a broken connection) as SMSDeliveryError"""
+        try:
+            self.send(phone_number, otp_code)
+        except (requests.RequestException, ValueError) as e:
+            raise SMSDeliveryError(f"{self.name} failed: {e}") from e
+
+
+class MSG91Provider(SMSProvider):
+    name = 'msg91'
+
+    @classmethod
+    def is_configured(cls):
+        return bool(getattr(settings, 'MSG91_AUTH_KEY', None))
+
+    def send(self, phone_number, otp_code):
+        payload = {
+            "template_id": getattr(settings, 'MSG91_DEFAULT_TEMPLATE', None),
+            "short_url": "0",
+            "realTimeResponse": "1",
+            "recipients": [
+                {
+                    "mobiles": phone_number.replace('+91', ''),  # Remove country code for MSG91
+                    "message": OTP_MESSAGE.format(otp_code=otp_code),
+                    "otp": otp_code
+                }
+            ]
+        }
+        headers = {
+            "accept": "application/json",
+            "content-type": "application/json",
+            "authkey": settings.MSG91_AUTH_KEY
+        }
+        self.post(settings.MSG91_API_URL, json=payload, headers=headers)
+
+
+class TwilioProvider(SMSProvider):
+    name = 'twilio'
+
+    @classmethod
+    def is_configured(cls):
+        return bool(getattr(settings, 'TWILIO_ACCOUNT_SID', None))
+
+    def send(self, phone_number, otp_code):
+        url = f"{settings.TWILIO_API_URL.rstrip('/')}/2010-04-01/Accounts/{settings.TWILIO_ACCOUNT_SID}/Messages.json"
+        data = {
+            'Body': f"Your NISHAD Party verification code is: {otp_code}. This code will expire in 10 minutes.",
+            'From': settings.TWILIO_PHONE_NUMBER,
+            'To': phone_number if phone_number.startswith('+') else f'+{phone_number}',
+        }
+        response = self.post(url, data=data, auth=(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN))
+        if not response.json().get('sid'):
+            raise SMSDeliveryError("twilio response did not include a message sid")
+
+
+class ConsoleProvider(SMSProvider):
+    name = 'console'
+
+    def send(self, phone_number, otp_code):
+        # For development, just print the OTP
+        print(f"OTP for {phone_number}: {otp_code}")
+
+
+_providers = None
+_providers_lock = threading.Lock()
+
+
+def get_providers():
+    """Configured providers in failover order"""
+    global _providers
+    if _providers is None:
+        with _providers_lock:
+            if _providers is None:
+                providers = [cls() for cls in (MSG91Provider, TwilioProvider) if cls.is_configured()]
+                _providers = providers or [ConsoleProvider()]
+    return _providers
+
+
+def deliver_otp(phone_number, otp_code):
+    """
+    Send an OTP through the provider chain, retrying transient failures.
+    Returns the name of the provider that accepted the message, or None.
+    """
+    max_retries = getattr(settings, 'OTP_SMS_MAX_RETRIES', 2)
+    backoff = getattr(settings, 'OTP_SMS_RETRY_BACKOFF', 0.5)
+
+    for provider in get_providers():
+        for attempt in range(max_retries + 1):
+            try:
+                provider.deliver(phone_number, otp_code)
+                return provider.name
+            except SMSDeliveryError as e:
+                logger.warning("OTP delivery via %s failed (attempt %d): %s", provider.name, attempt + 1, e)
+                if not e.retryable:
+                    break
+                if attempt < max_retries:
+                    time.sleep(backoff * (2 ** attempt))
+
+    logger.error("OTP delivery to %s failed on all providers", phone_number)
+    return None
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    # Created lazily so every gunicorn worker gets its own pool after fork
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'OTP_DELIVERY_WORKERS', 4),
+                    thread_name_prefix='otp-delivery'
+                )
+    return _executor
+
+
+def enqueue_otp(phone_number, otp_code):
+    """Queue an OTP for background delivery and return the future"""
+    return get_executor().submit(deliver_otp, phone_number, otp_code)
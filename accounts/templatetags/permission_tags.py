@@ -1,5 +1,6 @@
 from django import template
 from accounts.models import FeaturePermission
+from accounts.permissions import has_feature, get_feature_snapshot
 
 register = template.Library()
 
@@ -10,7 +11,7 @@ def has_feature_permission(user, feature):
     Template filter to check if user has a specific feature permission.
     Usage: {% if user|has_feature_permission:'ASSET_MANAGEMENT' %}
     """
-    return FeaturePermission.user_has_permission(user, feature)
+    return has_feature(user, feature)
 
 
 @register.filter(name='has_any_permission')
@@ -19,9 +20,7 @@ def has_any_permission(user):
     Template filter to check if user has any active permissions.
     Usage: {% if user|has_any_permission %}
     """
-    if user.user_type == 'ADMINISTRATOR':
-        return True
-    return FeaturePermission.objects.filter(user=user, is_active=True).exists()
+    return bool(get_feature_snapshot(user))
 
 
 @register.filter(name='get_user_features')
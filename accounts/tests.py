@@ -1,3 +1,175 @@
-from django.test import TestCase
+import json
+import threading
+import time
+from collections import defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from urllib.parse import parse_qs
 
-# Create your tests here.
+from django.test import SimpleTestCase, override_settings
+
+from . import sms
+from .utils import queue_otp_sms
+
+TWILIO_SID = 'AC_test'
+
+
+class FakeSMSProviders:
+    """
+    Local HTTP server standing in for MSG91 and Twilio. Responses are
+    scripted per provider as (status, body, delay) and used in order; once a
+    script runs out the provider answers with success. Every request is kept
+    in `requests` for assertions.
+    """
+
+    def __init__(self):
+        self.scripts = defaultdict(deque)
+        self.requests = defaultdict(list)
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                provider = 'msg91' if self.path.startswith('/msg91/') else 'twilio'
+                fake.requests[provider].append({'path': self.path, 'headers': dict(self.headers), 'body': body})
+                status, payload, delay = fake.next_response(provider)
+                time.sleep(delay)
+                try:
+                    self.send_response(status)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # the client timed out first
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f'http://127.0.0.1:{self.server.server_port}'
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def next_response(self, provider):
+        if self.scripts[provider]:
+            return self.scripts[provider].popleft()
+        if provider == 'msg91':
+            return 200, b'{"type": "success"}', 0
+        return 201, b'{"sid": "SM123"}', 0
+
+    def script(self, provider, *responses):
+        for response in responses:
+            status, body = response[:2]
+            delay = response[2] if len(response) > 2 else 0
+            self.scripts[provider].append((status, body if isinstance(body, bytes) else json.dumps(body).encode(), delay))
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class OTPDeliveryTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.providers = FakeSMSProviders()
+        cls.providers.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.providers.stop()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.providers.scripts.clear()
+        self.providers.requests.clear()
+        settings = override_settings(
+            MSG91_AUTH_KEY='msg91-key',
+            MSG91_DEFAULT_TEMPLATE='otp-template',
+            MSG91_API_URL=f'{self.providers.url}/msg91/flow/',
+            TWILIO_ACCOUNT_SID=TWILIO_SID,
+            TWILIO_AUTH_TOKEN='twilio-token',
+            TWILIO_PHONE_NUMBER='+15550000000',
+            TWILIO_API_URL=f'{self.providers.url}/twilio',
+            OTP_SMS_TIMEOUT=(1, 0.5),
+            OTP_SMS_MAX_RETRIES=2,
+            OTP_SMS_RETRY_BACKOFF=0,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        # Providers are built from settings once per process
+        sms._providers = None
+        self.addCleanup(setattr, sms, '_providers', None)
+
+    def deliver(self):
+        with self.assertLogs('accounts.sms', 'WARNING') as logs:
+            provider = sms.deliver_otp('+919876543210', '482913')
+            sms.logger.warning('done')  # assertLogs needs at least one record
+        return provider, logs.output
+
+    def test_sends_through_msg91(self):
+        provider, _ = self.deliver()
+        self.assertEqual(provider, 'msg91')
+        [request] = self.providers.requests['msg91']
+        self.assertEqual(request['headers']['authkey'], 'msg91-key')
+        recipient = json.loads(request['body'])['recipients'][0]
+        self.assertEqual((recipient['mobiles'], recipient['otp']), ('9876543210', '482913'))
+        self.assertFalse(self.providers.requests['twilio'])
+
+    def test_retries_transient_errors(self):
+        self.providers.script('msg91', (503, {}), (429, {}))
+        provider, _ = self.deliver()
+        self.assertEqual(provider, 'msg91')
+        self.assertEqual(len(self.providers.requests['msg91']), 3)
+
+    def test_fails_over_on_rejection_without_retrying(self):
+        self.providers.script('msg91', (401, {'type': 'error'}))
+        provider, _ = self.deliver()
+        self.assertEqual(provider, 'twilio')
+        self.assertEqual(len(self.providers.requests['msg91']), 1)
+        [request] = self.providers.requests['twilio']
+        self.assertEqual(request['path'], f'/twilio/2010-04-01/Accounts/{TWILIO_SID}/Messages.json')
+        self.assertEqual(parse_qs(request['body'].decode())['To'], ['+919876543210'])
+
+    def test_fails_over_after_retries_run_out(self):
+        self.providers.script('msg91', (500, {}), (500, {}), (500, {}))
+        provider, _ = self.deliver()
+        self.assertEqual(provider, 'twilio')
+        self.assertEqual(len(self.providers.requests['msg91']), 3)
+
+    def test_fails_over_on_timeout(self):
+        self.providers.script('msg91', *[(200, {'type': 'success'}, 1)] * 3)
+        provider, logs = self.deliver()
+        self.assertEqual(provider, 'twilio')
+        self.assertTrue(any('request failed' in line for line in logs))
+
+    def test_fails_over_when_provider_is_unreachable(self):
+        with override_settings(MSG91_API_URL='http://127.0.0.1:9/msg91/flow/'):
+            provider, _ = self.deliver()
+        self.assertEqual(provider, 'twilio')
+
+    def test_response_that_is_not_json_is_a_delivery_error(self):
+        self.providers.script('msg91', *[(500, {})] * 3)
+        self.providers.script('twilio', *[(201, b'<html>Service unavailable</html>')] * 3)
+        provider, logs = self.deliver()
+        self.assertIsNone(provider)
+        self.assertEqual(len(self.providers.requests['twilio']), 3)
+        self.assertTrue(any('twilio failed' in line for line in logs))
+        self.assertTrue(any(line.startswith('ERROR') and 'all providers' in line for line in logs))
+
+    def test_response_without_sid_is_retried(self):
+        self.providers.script('msg91', (400, {}))
+        self.providers.script('twilio', (201, {'status': 'queued'}))
+        provider, _ = self.deliver()
+        self.assertEqual(provider, 'twilio')
+        self.assertEqual(len(self.providers.requests['twilio']), 2)
+
+    def test_queue_failure_is_logged(self):
+        with mock.patch('accounts.utils.enqueue_otp', side_effect=RuntimeError('pool shut down')):
+            with self.assertLogs('accounts.utils', 'ERROR') as logs:
+                self.assertFalse(queue_otp_sms('+919876543210', '482913'))
+        self.assertIn('pool shut down', logs.output[0])
@@ -11,10 +11,12 @@ urlpatterns = [
     
     # Admin User Management URLs
     path('admin/users/', views.admin_user_list, name='admin_user_list'),
+    path('admin/users/export/', views.admin_user_export, name='admin_user_export'),
     path('admin/users/<int:user_id>/', views.admin_user_detail, name='admin_user_detail'),
     path('admin/users/<int:user_id>/change-type/', views.admin_change_user_type, name='admin_change_user_type'),
     path('admin/users/<int:user_id>/toggle-status/', views.admin_toggle_user_status, name='admin_toggle_user_status'),
     path('admin/dashboard-content/', views.dashboard_user_management_content, name='dashboard_user_management_content'),
+    path('api/users/autocomplete/', views.user_autocomplete, name='user_autocomplete'),
 
     # Permission Management URLs
     path('admin/permissions/', views.permission_management, name='permission_management'),
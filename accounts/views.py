@@ -8,14 +8,21 @@ from django.utils.decorators import method_decorator
 from django.contrib import messages
 from django.urls import reverse
 from django.utils import timezone
-from django.core.paginator import Paginator
 from django.db.models import Q
 from django.utils.translation import gettext as _
+from django.core.cache import cache
+from django.conf import settings
+import hashlib
 import json
 
 from .models import User, UserProfile, PhoneVerification, USER_TYPE_CHOICES
-from .utils import create_or_update_otp, create_or_update_otp_with_default, send_otp_sms, verify_otp, format_phone_number, format_phone_number_with_country, is_phone_number_valid
+from .utils import create_or_update_otp, create_or_update_otp_with_default, queue_otp_sms, verify_otp, format_phone_number, format_phone_number_with_country, is_phone_number_valid
 from .decorators import admin_or_feature_required
+from .search import search_users
+from .permissions import has_feature
+from core.exports import export_response, export_rows
+from core.pagination import paginate_by_cursor
+from core.ratelimit import ratelimit
 
 class PhoneLoginView(View):
     template_name = 'accounts/phone_login.html'
@@ -25,6 +32,7 @@ class PhoneLoginView(View):
             return redirect('home')
         return render(request, self.template_name)
     
+    @method_decorator(ratelimit('1/m', key='ip_phone', scope='otp_send'))
     def post(self, request):
         phone_number = request.POST.get('phone_number', '').strip()
         country_code = request.POST.get('country_code', '+91').strip()
@@ -43,8 +51,8 @@ class PhoneLoginView(View):
             # For testing purposes, always use default OTP
             otp_code = create_or_update_otp_with_default(formatted_phone)
             
-            # Send OTP via SMS (for testing, this will just print the OTP)
-            if send_otp_sms(formatted_phone, otp_code):
+            # Queue OTP for SMS delivery (for testing, this will just print the OTP)
+            if queue_otp_sms(formatted_phone, otp_code):
                 request.session['phone_number'] = formatted_phone
                 request.session['country_code'] = country_code
                 return JsonResponse({
@@ -88,6 +96,7 @@ class VerifyOTPView(View):
             'phone_number': phone_number
         })
     
+    @method_decorator(ratelimit('10/10m', key='phone', scope='otp_verify'))
     def post(self, request):
         phone_number = request.session.get('phone_number')
         otp_code = request.POST.get('otp_code', '').strip()
@@ -148,6 +157,8 @@ class VerifyOTPView(View):
             }, status=400)
 
 class ResendOTPView(View):
+    # Shares the login scope, so one OTP per phone number and sender per minute
+    @method_decorator(ratelimit('1/m', key='ip_phone', scope='otp_send'))
     def post(self, request):
         phone_number = request.session.get('phone_number')
         
@@ -158,21 +169,9 @@ class ResendOTPView(View):
             }, status=400)
         
         try:
-            # Check if we can send another OTP (rate limiting)
-            recent_otp = PhoneVerification.objects.filter(
-                phone_number=phone_number,
-                created_at__gte=timezone.now() - timezone.timedelta(minutes=1)
-            ).first()
-            
-            if recent_otp:
-                return JsonResponse({
-                    'status': 'error',
-                    'message': 'Please wait 1 minute before requesting another OTP.'
-                }, status=429)
-            
             otp_code = create_or_update_otp(phone_number)
             
-            if send_otp_sms(phone_number, otp_code):
+            if queue_otp_sms(phone_number, otp_code):
                 return JsonResponse({
                     'status': 'success',
                     'message': 'OTP resent successfully'
@@ -238,7 +237,6 @@ def dashboard_view(request):
     Main single-page dashboard view - shows all information on one page
     """
     from django.utils import timezone
-    from django.db.models import Sum
     from decimal import Decimal
 
     context = {
@@ -260,9 +258,9 @@ def dashboard_view(request):
     # Get Donations stats
     try:
         from donations.models import Donation
+        from donations.rollups import donor_totals
         user_donations = Donation.objects.filter(donor=request.user, status='SUCCESS')
-        stats['total_donations'] = user_donations.count()
-        stats['donations_amount'] = user_donations.aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
+        stats['total_donations'], stats['donations_amount'] = donor_totals(request.user)
         context['recent_donations'] = user_donations.order_by('-created_at')[:5]
     except:
         context['recent_donations'] = []
@@ -324,37 +322,34 @@ def logout_view(request):
     return redirect('phone_login')
 
 # Admin User Management Views
-@login_required
-@admin_or_feature_required('USER_MANAGEMENT')
-def admin_user_list(request):
-    """Admin view to manage all users"""
-    
-    # Get search and filter parameters
+def filter_admin_users(request):
+    """Users matching the admin user list filters (search, user_type)"""
     search_query = request.GET.get('search', '')
     user_type_filter = request.GET.get('user_type', '')
     
     # Base queryset
     users = User.objects.select_related('userprofile').exclude(id=request.user.id)
     
-    # Apply filters
-    if search_query:
-        users = users.filter(
-            Q(first_name__icontains=search_query) |
-            Q(last_name__icontains=search_query) |
-            Q(phone_number__icontains=search_query) |
-            Q(email__icontains=search_query)
-        )
-    
     if user_type_filter:
         users = users.filter(user_type=user_type_filter)
     
-    # Order by creation date
-    users = users.order_by('-date_joined')
+    # Indexed, ranked search; otherwise order by creation date
+    if search_query:
+        return search_users(search_query, users)
+    return users.order_by('-date_joined')
+
+@login_required
+@admin_or_feature_required('USER_MANAGEMENT')
+def admin_user_list(request):
+    """Admin view to manage all users"""
+    
+    # Get search and filter parameters
+    search_query = request.GET.get('search', '')
+    user_type_filter = request.GET.get('user_type', '')
+    
+    users = filter_admin_users(request)
     
-    # Paginate
-    paginator = Paginator(users, 20)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginate_by_cursor(request, users, per_page=20)
     
     # Get user type choices for filter dropdown
     user_types = USER_TYPE_CHOICES
@@ -373,7 +368,6 @@ def admin_user_list(request):
         'total_users': total_users_count,
         'active_users': active_users_count,
         'inactive_users': inactive_users_count,
-        'paginator': paginator,
     }
     return render(request, 'accounts/admin_user_list.html', context)
 
@@ -414,6 +408,21 @@ def admin_change_user_type(request, user_id):
     
     return JsonResponse({'status': 'error', 'message': 'Invalid request method'}, status=405)
 
+@login_required
+@admin_or_feature_required('USER_MANAGEMENT')
+def admin_user_export(request):
+    """Stream the filtered user list as CSV"""
+    fields = [
+        ('phone_number', 'Phone'), ('first_name', 'First Name'), ('last_name', 'Last Name'),
+        ('email', 'Email'), ('user_type', 'User Type'), ('constituency', 'Constituency'),
+        ('district', 'District'), ('state', 'State'), ('is_active', 'Active'),
+        ('is_phone_verified', 'Phone Verified'), ('date_joined', 'Joined'),
+        ('userprofile__community_type', 'Community'), ('userprofile__occupation', 'Occupation'),
+        ('userprofile__address', 'Address'), ('userprofile__pincode', 'Pincode'),
+    ]
+    rows = export_rows(filter_admin_users(request), [field for field, _ in fields])
+    return export_response(request, 'users', [label for _, label in fields], rows)
+
 @login_required
 @admin_or_feature_required('USER_MANAGEMENT')
 def admin_user_detail(request, user_id):
@@ -504,9 +513,59 @@ def dashboard_user_management_content(request):
     return render(request, 'accounts/dashboard_content.html', context)
 
 
+# Features whose pages have a user picker; each picker names its feature in the request
+PICKER_FEATURES = {'USER_MANAGEMENT', 'ASSET_MANAGEMENT', 'GATE_PASS'}
+
+
+@login_required
+def user_autocomplete(request):
+    """JSON typeahead used by the user pickers in place of full-table dropdowns"""
+    feature = request.GET.get('feature', '')
+    if feature not in PICKER_FEATURES or not has_feature(request.user, feature):
+        return JsonResponse({'status': 'error', 'message': 'Permission denied'}, status=403)
+
+    query = request.GET.get('q', '').strip()
+    if len(query) < 2:
+        return JsonResponse({'results': []})
+
+    user_types = [t for t in request.GET.get('user_type', '').split(',') if t]
+    exclude_admins = request.GET.get('exclude_admins') == '1'
+    try:
+        limit = max(1, min(int(request.GET.get('limit', 10)), 20))
+    except ValueError:
+        limit = 10
+
+    cache_key = 'user_autocomplete:' + hashlib.md5(
+        f"{query.lower()}|{','.join(user_types)}|{exclude_admins}|{limit}".encode()
+    ).hexdigest()
+    results = cache.get(cache_key)
+
+    if results is None:
+        users = User.objects.filter(is_active=True)
+        if user_types:
+            users = users.filter(user_type__in=user_types)
+        if exclude_admins:
+            users = users.exclude(user_type='ADMINISTRATOR')
+
+        users = search_users(query, users).only(
+            'id', 'first_name', 'last_name', 'phone_number', 'user_type', 'constituency'
+        )[:limit]
+        results = [{
+            'id': user.id,
+            'name': user.get_full_name() or user.phone_number,
+            'phone': user.phone_number,
+            'user_type': user.get_user_type_display(),
+            'constituency': user.constituency,
+        } for user in users]
+        cache.set(cache_key, results, getattr(settings, 'USER_AUTOCOMPLETE_CACHE_TIMEOUT', 30))
+
+    return JsonResponse({'results': results})
+
+
 # Permission Management Views
 from .decorators import admin_required
 from .models import FeaturePermission, FEATURE_CHOICES
+from .permissions import invalidate_user_features
 from django.db.models import Q
 
 @admin_required
@@ -520,19 +579,13 @@ def permission_management(request):
 
     # Apply filters
     if search_query:
-        permissions = permissions.filter(
-            Q(user__first_name__icontains=search_query) |
-            Q(user__last_name__icontains=search_query) |
-            Q(user__phone_number__icontains=search_query)
-        )
+        permissions = permissions.filter(user__in=search_users(search_query))
 
     if feature_filter:
         permissions = permissions.filter(feature=feature_filter)
 
-    # Get users who can be granted permissions (non-admins)
-    available_users = User.objects.exclude(
-        user_type='ADMINISTRATOR'
-    ).order_by('first_name', 'last_name')
+    # Users are picked through the autocomplete endpoint; only the count is shown here
+    available_users_count = User.objects.exclude(user_type='ADMINISTRATOR').count()
 
     # Get all users with permissions for display
     users_with_permissions = User.objects.filter(
@@ -541,7 +594,7 @@ def permission_management(request):
 
     context = {
         'permissions': permissions,
-        'available_users': available_users,
+        'available_users_count': available_users_count,
         'users_with_permissions': users_with_permissions,
         'features': FEATURE_CHOICES,
         'search_query': search_query,
@@ -589,6 +642,9 @@ def grant_permission(request):
                     else:
                         already_exists.append(permission.get_feature_display())
 
+            if granted_count or reactivated_count:
+                invalidate_user_features(user)
+
             # Build success message
             if granted_count > 0:
                 messages.success(request, f'{granted_count} permission(s) granted to {user.get_full_name()}')
@@ -615,6 +671,7 @@ def revoke_permission(request, permission_id):
 
         permission.is_active = False
         permission.save()
+        invalidate_user_features(permission.user_id)
 
         messages.success(request, f'Permission for {feature_name} revoked from {user_name}')
     except FeaturePermission.DoesNotExist:
@@ -634,6 +691,7 @@ def delete_permission(request, permission_id):
         feature_name = permission.get_feature_display()
 
         permission.delete()
+        invalidate_user_features(permission.user_id)
 
         messages.success(request, f'Permission for {feature_name} deleted from {user_name}')
     except FeaturePermission.DoesNotExist:
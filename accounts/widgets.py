@@ -0,0 +1,42 @@
+from django import forms
+from django.template.loader import render_to_string
+
+
+class UserAutocompleteWidget(forms.Widget):
+    """
+    Text input backed by the user autocomplete endpoint instead of a
+    <select> listing every user. Submits the chosen user's id. `feature` is
+    the feature permission of the page using the picker; the endpoint only
+    answers users who have it.
+    """
+
+    def __init__(self, feature, user_types=None, exclude_admins=False, attrs=None):
+        super().__init__(attrs)
+        self.feature = feature
+        self.user_types = user_types or []
+        self.exclude_admins = exclude_admins
+
+    def id_for_label(self, id_):
+        # Labels point at the visible search box, not the hidden id input
+        return f'{id_}_search' if id_ else id_
+
+    def render(self, name, value, attrs=None, renderer=None):
+        from .models import User
+
+        initial_label = ''
+        if value:
+            user = User.objects.filter(pk=value).only('first_name', 'last_name', 'phone_number').first()
+            if user:
+                initial_label = f"{user.get_full_name() or user.phone_number} ({user.phone_number})"
+
+        attrs = self.build_attrs(self.attrs, attrs)
+        return render_to_string('accounts/user_picker.html', {
+            'field_name': name,
+            'picker_id': attrs.get('id', f'id_{name}'),
+            'feature': self.feature,
+            'user_types': ','.join(self.user_types),
+            'exclude_admins': self.exclude_admins,
+            'required': self.is_required,
+            'initial_id': value or '',
+            'initial_label': initial_label,
+        })
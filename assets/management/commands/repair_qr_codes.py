@@ -0,0 +1,37 @@
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from assets.models import Asset, GatePass
+from core.qr import qr_name, store
+
+
+class Command(BaseCommand):
+    help = 'Draw the QR images of assets and gate passes whose image is missing from storage'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only count the missing images')
+
+    def handle(self, *args, **options):
+        querysets = [
+            ('asset', Asset.objects.exclude(qr_code='')),
+            ('gate pass', GatePass.objects.exclude(qr_code='').select_related('event', 'attendee')),
+        ]
+        for label, queryset in querysets:
+            missing = renamed = 0
+            for obj in queryset.exclude(qr_code__isnull=True).iterator(chunk_size=500):
+                if default_storage.exists(obj.qr_code.name):
+                    continue
+                missing += 1
+                if options['dry_run']:
+                    continue
+                payload = obj.qr_payload()
+                name = qr_name(payload, border=5)
+                store(payload, border=5)
+                if name != obj.qr_code.name:
+                    # Edited since the name was set, so the old payload is gone; draw the current one
+                    type(obj).objects.filter(pk=obj.pk).update(qr_code=name)
+                    renamed += 1
+            if options['dry_run']:
+                self.stdout.write(f'{missing} {label} QR images are missing')
+            else:
+                self.stdout.write(self.style.SUCCESS(f'Drew {missing} missing {label} QR images ({renamed} renamed)'))
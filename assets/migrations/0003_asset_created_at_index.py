@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-17 04:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assets', '0002_remove_assetcheckout_is_overdue_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='asset',
+            index=models.Index(fields=['created_at', 'id'], name='assets_asset_created_at'),
+        ),
+    ]
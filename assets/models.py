@@ -2,9 +2,8 @@ from django.db import models
 from django.conf import settings
 from django.utils import timezone
 import uuid
-import qrcode
-from io import BytesIO
-from django.core.files import File
+from core.qr import qr_name, queue_qr
+from core.sequences import next_value, last_number
 
 ASSET_TYPE_CHOICES = [
     ('VEHICLE', 'Vehicle'),
@@ -82,29 +81,30 @@ class Asset(models.Model):
     def save(self, *args, **kwargs):
         if not self.asset_code:
             year = timezone.now().year
-            count = Asset.objects.filter(created_at__year=year).count() + 1
-            self.asset_code = f"ASSET{year}{count:05d}"
+            prefix = f"ASSET{year}"
+            count = next_value('asset_code', str(year),
+                               initial=lambda: last_number(Asset.objects, 'asset_code', prefix))
+            self.asset_code = f"{prefix}{count:05d}"
         
-        # Generate QR code
+        # QR image name is a hash of its content; the image itself is drawn after commit
         if not self.qr_code:
-            qr_data = f"Asset: {self.name} | Code: {self.asset_code} | Location: {self.current_location}"
-            qr = qrcode.QRCode(version=1, box_size=10, border=5)
-            qr.add_data(qr_data)
-            qr.make(fit=True)
-            qr_image = qr.make_image(fill_color="black", back_color="white")
-            
-            buffer = BytesIO()
-            qr_image.save(buffer, format='PNG')
-            file_name = f"asset_qr_{self.asset_code}.png"
-            self.qr_code.save(file_name, File(buffer), save=False)
+            self.qr_code.name = qr_name(self.qr_payload(), border=5)
+            queue_qr(self.qr_payload(), border=5)
         
         super().save(*args, **kwargs)
     
+    def qr_payload(self):
+        return f"Asset: {self.name} | Code: {self.asset_code} | Location: {self.current_location}"
+    
     def __str__(self):
         return f"{self.name} ({self.asset_code})"
     
     class Meta:
         ordering = ['name']
+        indexes = [
+            # Keyset pagination of the asset list, newest first (core.pagination)
+            models.Index(fields=['created_at', 'id'], name='assets_asset_created_at'),
+        ]
 
 class AssetCheckout(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -242,21 +242,16 @@ class GatePass(models.Model):
         if not self.pass_code:
             self.pass_code = f"GP{timezone.now().strftime('%Y%m%d')}{uuid.uuid4().hex[:6].upper()}"
         
-        # Generate QR code
+        # QR image name is a hash of its content; the image itself is drawn after commit
         if not self.qr_code:
-            qr_data = f"Gate Pass: {self.pass_code} | Event: {self.event.title} | Attendee: {self.attendee.full_name} | Access: {self.access_level}"
-            qr = qrcode.QRCode(version=1, box_size=10, border=5)
-            qr.add_data(qr_data)
-            qr.make(fit=True)
-            qr_image = qr.make_image(fill_color="black", back_color="white")
-            
-            buffer = BytesIO()
-            qr_image.save(buffer, format='PNG')
-            file_name = f"gate_pass_{self.pass_code}.png"
-            self.qr_code.save(file_name, File(buffer), save=False)
+            self.qr_code.name = qr_name(self.qr_payload(), border=5)
+            queue_qr(self.qr_payload(), border=5)
         
         super().save(*args, **kwargs)
     
+    def qr_payload(self):
+        return f"Gate Pass: {self.pass_code} | Event: {self.event.title} | Attendee: {self.attendee.full_name} | Access: {self.access_level}"
+    
     @property
     def is_valid(self):
         now = timezone.now()
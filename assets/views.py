@@ -5,12 +5,12 @@ from django.http import JsonResponse
 from django.utils import timezone
 from django.utils.translation import gettext as _
 from django.db import models
-from django.core.paginator import Paginator
 from datetime import timedelta
 
 from .models import Asset, AssetCheckout, AssetMaintenance
 from accounts.models import User
 from accounts.decorators import admin_or_feature_required
+from core.pagination import paginate_by_cursor
 from django.forms import ModelForm
 
 def admin_required(user):
@@ -89,9 +89,7 @@ def asset_list(request):
                 models.Q(serial_number__icontains=search_query)
             )
         
-        paginator = Paginator(assets, 20)
-        page = request.GET.get('page')
-        assets = paginator.get_page(page)
+        assets = paginate_by_cursor(request, assets, per_page=20)
         
         context = {
             'assets': assets,
@@ -159,7 +157,6 @@ def assign_asset(request):
     
     # GET request - show assignment form
     available_assets = Asset.objects.filter(status='AVAILABLE')
-    active_users = User.objects.filter(is_active=True).exclude(user_type='ADMINISTRATOR')
     
     # Check if specific asset is requested
     selected_asset_id = request.GET.get('asset')
@@ -172,7 +169,6 @@ def assign_asset(request):
     
     context = {
         'available_assets': available_assets,
-        'active_users': active_users,
         'selected_asset': selected_asset,
     }
     return render(request, 'assets/assign_asset.html', context)
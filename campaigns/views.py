@@ -10,6 +10,7 @@ from collections import defaultdict
 
 from .models import Event, EventAttendance, Campaign
 from accounts.models import User
+from core.pagination import paginate_by_cursor
 
 def admin_required(user):
     """Check if user is an administrator"""
@@ -88,7 +89,7 @@ def events_list(request):
             title__icontains=search
         )
     
-    events = events.order_by('date_time')
+    events = paginate_by_cursor(request, events.order_by('date_time'), per_page=12)
     
     # Get filter options
     event_types = Event._meta.get_field('event_type').choices
@@ -191,8 +192,9 @@ def my_events(request):
         attendee=request.user
     ).select_related('event', 'event__campaign').order_by('-event__date_time')
     
-    upcoming = attendances.filter(event__date_time__gte=timezone.now())
-    past = attendances.filter(event__date_time__lt=timezone.now())
+    now = timezone.now()
+    upcoming = paginate_by_cursor(request, attendances.filter(event__date_time__gte=now), per_page=12, param='upcoming')
+    past = paginate_by_cursor(request, attendances.filter(event__date_time__lt=now), per_page=20, param='past')
     
     context = {
         'upcoming_events': upcoming,
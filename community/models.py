@@ -1,6 +1,7 @@
 from django.db import models
 from django.conf import settings
 from django.utils import timezone
+from core.sequences import next_value, last_number
 
 SCHEME_TYPE_CHOICES = [
     ('FISHING', 'Fishing Related'),
@@ -69,8 +70,12 @@ class GovernmentScheme(models.Model):
     def save(self, *args, **kwargs):
         if not self.scheme_code:
             scheme_type_code = self.scheme_type[:3].upper()
-            count = GovernmentScheme.objects.filter(scheme_type=self.scheme_type).count() + 1
-            self.scheme_code = f"SCHEME_{scheme_type_code}_{count:05d}"
+            prefix = f"SCHEME_{scheme_type_code}_"
+            # Keyed by the code prefix, so scheme types sharing their first
+            # three letters draw from one series instead of colliding
+            count = next_value('scheme_code', scheme_type_code,
+                               initial=lambda: last_number(GovernmentScheme.objects, 'scheme_code', prefix))
+            self.scheme_code = f"{prefix}{count:05d}"
         super().save(*args, **kwargs)
     
     def __str__(self):
@@ -100,8 +105,10 @@ class SchemeApplication(models.Model):
     def save(self, *args, **kwargs):
         if not self.application_id:
             year = timezone.now().year
-            count = SchemeApplication.objects.filter(created_at__year=year).count() + 1
-            self.application_id = f"APP{year}{count:06d}"
+            prefix = f"APP{year}"
+            count = next_value('scheme_application', str(year),
+                               initial=lambda: last_number(SchemeApplication.objects, 'application_id', prefix))
+            self.application_id = f"{prefix}{count:06d}"
         super().save(*args, **kwargs)
     
     def __str__(self):
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import SiteConfiguration, AuditLog, YouTubeVideo
+from .models import SiteConfiguration, AuditLog, YouTubeVideo, IDSequence
 
 @admin.register(SiteConfiguration)
 class SiteConfigurationAdmin(admin.ModelAdmin):
@@ -19,6 +19,13 @@ class AuditLogAdmin(admin.ModelAdmin):
     search_fields = ['user__username', 'action', 'model_name', 'object_id']
     readonly_fields = ['user', 'action', 'model_name', 'object_id', 'changes', 'ip_address', 'user_agent', 'timestamp']
 
+@admin.register(IDSequence)
+class IDSequenceAdmin(admin.ModelAdmin):
+    list_display = ['name', 'period', 'last_value', 'updated_at']
+    list_filter = ['name']
+    search_fields = ['name', 'period']
+    readonly_fields = ['updated_at']
+
 @admin.register(YouTubeVideo)
 class YouTubeVideoAdmin(admin.ModelAdmin):
     list_display = ['title', 'is_active', 'is_featured', 'display_order', 'created_at']
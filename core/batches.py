@@ -0,0 +1,47 @@
+"""
+Batch jobs on a pool of worker processes.
+
+Management commands that render many files (receipts, tax statements,
+membership cards) split the work into batches and hand them to a process
+pool:
+
+    for rendered, failed in run_in_batches(ids, render_batch, batch_size=200, workers=8):
+        ...
+
+Workers are spawned, so each one sets Django up from scratch instead of
+inheriting the parent's open database connection through fork. Only a
+bounded number of batches is in flight at a time, so the items can come from
+a lazy queryset iterator of any size.
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import islice
+
+import django
+
+
+def batched(items, size):
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def run_in_batches(items, task, batch_size, workers, prepare=None):
+    """
+    Call `task(batch)` in a worker process for each batch of `batch_size`
+    items and yield the results as they finish (not in order). `task` must
+    be picklable (a module-level function or a functools.partial of one).
+    `prepare`, if given, is applied to each batch in this process before it
+    is submitted.
+    """
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=django.setup) as pool:
+        pending = set()
+        for batch in batched(items, batch_size):
+            if len(pending) >= workers * 2:
+                done = next(as_completed(pending))
+                pending.remove(done)
+                yield done.result()
+            pending.add(pool.submit(task, prepare(batch) if prepare else batch))
+        for done in as_completed(pending):
+            yield done.result()
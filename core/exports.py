@@ -0,0 +1,94 @@
+"""
+Streaming CSV exports.
+
+Rows are pulled from the database with QuerySet.iterator(chunk_size), which
+uses a server-side cursor on PostgreSQL, and written out in ~64KB pieces
+through a StreamingHttpResponse, so memory stays flat however many rows an
+export has. Add ?format=gz to get the same CSV gzip-compressed.
+"""
+import csv
+import re
+import zlib
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+FLUSH_BYTES = 64 * 1024
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+NUMBER_RE = re.compile(r'^[+-]?[\d.,\s]+$')
+
+
+class _Buffer:
+    """File-like sink for csv.writer that hands back what was written"""
+
+    def __init__(self):
+        self.parts = []
+        self.size = 0
+
+    def write(self, value):
+        self.parts.append(value)
+        self.size += len(value)
+
+    def drain(self):
+        data = ''.join(self.parts).encode('utf-8')
+        self.parts = []
+        self.size = 0
+        return data
+
+
+def _safe(value):
+    # Keep spreadsheet apps from evaluating user-entered text as a formula
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES) and not NUMBER_RE.match(value):
+        return "'" + value
+    return value
+
+
+def iter_csv(header, rows):
+    """Yield CSV-encoded bytes for the header and rows in ~64KB pieces"""
+    buffer = _Buffer()
+    writer = csv.writer(buffer)
+    # BOM so Excel opens Hindi names as UTF-8
+    buffer.write('\ufeff')
+    writer.writerow(header)
+    for row in rows:
+        writer.writerow([_safe(value) for value in row])
+        if buffer.size >= FLUSH_BYTES:
+            yield buffer.drain()
+    yield buffer.drain()
+
+
+def iter_gzip(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 writes a gzip header
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_rows(queryset, fields):
+    """Stream tuples of `fields` from the queryset over a server-side cursor"""
+    chunk_size = getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+    return queryset.values_list(*fields).iterator(chunk_size=chunk_size)
+
+
+def export_response(request, name, header, rows):
+    """
+    StreamingHttpResponse with the rows as a CSV download, gzipped when the
+    request asks for ?format=gz.
+    """
+    filename = f"{name}-{timezone.now():%Y%m%d-%H%M}.csv"
+    body = iter_csv(header, rows)
+
+    if request.GET.get('format') == 'gz':
+        response = StreamingHttpResponse(iter_gzip(body), content_type='application/gzip')
+        filename += '.gz'
+    else:
+        response = StreamingHttpResponse(body, content_type='text/csv; charset=utf-8')
+
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    # Tell nginx to pass chunks straight through instead of spooling the file
+    response['X-Accel-Buffering'] = 'no'
+    response['Cache-Control'] = 'no-store'
+    return response
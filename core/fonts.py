@@ -0,0 +1,36 @@
+"""
+TrueType fonts for documents drawn with Pillow (receipts, statements, cards).
+
+DejaVu is used by default. Set RECEIPT_FONT_PATH / RECEIPT_BOLD_FONT_PATH to
+a font covering Devanagari to print Hindi names. Loaded fonts are kept per
+process.
+"""
+from django.conf import settings
+from PIL import ImageFont
+
+FONT_CANDIDATES = [
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
+    '/usr/share/fonts/dejavu/DejaVuSans.ttf',
+]
+BOLD_FONT_CANDIDATES = [
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf',
+    '/usr/share/fonts/dejavu/DejaVuSans-Bold.ttf',
+]
+
+_fonts = {}
+
+
+def get_font(size, bold=False):
+    key = (size, bold)
+    if key not in _fonts:
+        configured = getattr(settings, 'RECEIPT_BOLD_FONT_PATH' if bold else 'RECEIPT_FONT_PATH', None)
+        candidates = ([configured] if configured else []) + (BOLD_FONT_CANDIDATES if bold else FONT_CANDIDATES)
+        for path in candidates:
+            try:
+                _fonts[key] = ImageFont.truetype(path, size)
+                break
+            except OSError:
+                continue
+        else:
+            _fonts[key] = ImageFont.load_default()
+    return _fonts[key]
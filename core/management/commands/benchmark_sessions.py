@@ -0,0 +1,39 @@
+from django.contrib.sessions.backends.db import SessionStore as DBStore
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from core.sessions import SessionStore as CachedStore
+
+
+class Command(BaseCommand):
+    help = 'Compare database queries per request for the db and cache-first session backends'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=100, help='Simulated requests per backend')
+
+    def simulate(self, store_class, requests):
+        """Replay what SessionMiddleware does: read on every request, write on ~1 in 10"""
+        session = store_class()
+        session['_auth_user_id'] = '1'
+        session['django_language'] = 'hi'
+        session.save()
+        session_key = session.session_key
+
+        with CaptureQueriesContext(connection) as ctx:
+            for i in range(requests):
+                session = store_class(session_key)
+                session.get('_auth_user_id')
+                if i % 10 == 0:
+                    # Language switch / login style write with unchanged data
+                    session['django_language'] = 'hi'
+                    session.save()
+
+        store_class(session_key).delete()
+        return len(ctx.captured_queries)
+
+    def handle(self, *args, **options):
+        requests = options['requests']
+        for label, store_class in (('db', DBStore), ('cache-first', CachedStore)):
+            queries = self.simulate(store_class, requests)
+            self.stdout.write(f'{label:12} {queries:6d} queries / {requests} requests ({queries / requests:.2f} per request)')
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from core.sessions import SessionStore
+
+
+class Command(BaseCommand):
+    help = 'Incrementally delete expired sessions in bounded batches (run from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows deleted per statement')
+        parser.add_argument('--max-batches', type=int, default=None, help='Stop after this many batches')
+        parser.add_argument('--sleep', type=float, default=0.05, help='Seconds to pause between batches')
+
+    def handle(self, *args, **options):
+        deleted = SessionStore.clear_expired(
+            batch_size=options['batch_size'],
+            max_batches=options['max_batches'],
+            pause=options['sleep']
+        )
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired sessions'))
@@ -0,0 +1,33 @@
+from django.conf import settings
+
+from .ratelimit import check_rate_limit, rate_limited_response
+
+
+class RateLimitMiddleware:
+    """
+    Throttle requests by path prefix before they reach any view.
+    Rules come from settings.RATE_LIMIT_RULES, e.g.
+        {'path': '/accounts/', 'rate': '60/m', 'key': 'ip', 'methods': ['POST']}
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.rules = getattr(settings, 'RATE_LIMIT_RULES', [])
+
+    def __call__(self, request):
+        for rule in self.rules:
+            if not request.path.startswith(rule['path']):
+                continue
+            methods = rule.get('methods')
+            if methods and request.method not in methods:
+                continue
+            retry_after = check_rate_limit(
+                request,
+                f"path:{rule['path']}",
+                rule['rate'],
+                rule.get('key', 'ip')
+            )
+            if retry_after:
+                return rate_limited_response(request, retry_after)
+
+        return self.get_response(request)
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-17 03:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_youtubevideo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IDSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50)),
+                ('period', models.CharField(blank=True, max_length=20)),
+                ('last_value', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['name', 'period'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='idsequence',
+            constraint=models.UniqueConstraint(fields=('name', 'period'), name='core_idsequence_name_period'),
+        ),
+    ]
@@ -32,6 +32,22 @@ class AuditLog(models.Model):
     class Meta:
         ordering = ['-timestamp']
 
+class IDSequence(models.Model):
+    """Last number handed out for a named, per-period ID series (see core.sequences)"""
+    name = models.CharField(max_length=50)
+    period = models.CharField(max_length=20, blank=True)
+    last_value = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} {self.period}: {self.last_value}"
+
+    class Meta:
+        ordering = ['name', 'period']
+        constraints = [
+            models.UniqueConstraint(fields=['name', 'period'], name='core_idsequence_name_period'),
+        ]
+
 class YouTubeVideo(models.Model):
     title = models.CharField(max_length=200, help_text="Video title")
     youtube_url = models.URLField(help_text="Full YouTube video URL (e.g., https://www.youtube.com/watch?v=VIDEO_ID)")
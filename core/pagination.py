@@ -0,0 +1,196 @@
+"""
+Keyset (cursor) pagination for list views.
+
+Paginator counts the whole queryset and then skips rows with OFFSET, so page
+500 reads 500 pages of rows. Here a page is instead fetched with a WHERE on
+the ordering columns of the last row seen, e.g.
+    (created_at, id) < (:created_at, :id) ORDER BY created_at DESC, id DESC
+so every page costs the same as the first, given an index on the ordering.
+There is no total and no jumping to page N: views get next/previous links
+carrying an opaque cursor, and can ask for a count separately when they need
+one.
+
+    page = paginate_by_cursor(request, Donation.objects.order_by('-created_at'))
+    {% include "core/cursor_pagination.html" %}
+
+The queryset's ordering (field names or annotations, '-' for descending)
+must be on non-null values; the primary key is appended as a tie-breaker.
+"""
+import base64
+import binascii
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+def _ordering(queryset):
+    ordering = list(queryset.query.order_by or queryset.model._meta.ordering)
+    if not ordering:
+        raise ValueError("Cursor pagination needs an ordered queryset")
+    if any(not isinstance(field, str) or field == '?' for field in ordering):
+        raise ValueError("Cursor pagination only supports ordering by field names")
+    if ordering[-1].lstrip('-') not in ('pk', queryset.model._meta.pk.name):
+        ordering.append('-pk' if ordering[-1].startswith('-') else 'pk')
+    return ordering
+
+
+def _field(model, path):
+    """Model field at the end of a lookup path such as 'event__date_time', or None for annotations"""
+    field = None
+    for name in path.split('__'):
+        if name == 'pk':
+            field = model._meta.pk
+        else:
+            try:
+                field = model._meta.get_field(name)
+            except FieldDoesNotExist:
+                return None
+        if field.is_relation and field.related_model is not None:
+            model = field.related_model
+    return field
+
+
+def _value(row, path):
+    for name in path.split('__'):
+        row = getattr(row, name)
+    if hasattr(row, 'pk') and hasattr(row, '_meta'):
+        row = row.pk
+    return row
+
+
+def encode_cursor(direction, values):
+    raw = json.dumps([direction, values], default=str, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, model, ordering):
+    """(direction, values) from a cursor, or None if it is missing or invalid"""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        direction, values = json.loads(raw)
+    except (binascii.Error, ValueError, TypeError):
+        return None
+    if direction not in (NEXT, PREVIOUS) or not isinstance(values, list) or len(values) != len(ordering):
+        return None
+
+    parsed = []
+    for spec, value in zip(ordering, values):
+        field = _field(model, spec.lstrip('-'))
+        if field is not None:
+            try:
+                value = (field.target_field if field.is_relation else field).to_python(value)
+            except ValidationError:
+                return None
+        parsed.append(value)
+    return direction, parsed
+
+
+def _after(ordering, values, reverse=False):
+    """
+    Q for rows after `values` in `ordering`:
+    (a > x) OR (a = x AND b > y) OR ... with < for descending columns.
+    """
+    condition = Q()
+    equal = {}
+    for spec, value in zip(ordering, values):
+        name = spec.lstrip('-')
+        descending = spec.startswith('-') != reverse
+        condition |= Q(**equal, **{f'{name}__{"lt" if descending else "gt"}': value})
+        equal[name] = value
+    return condition
+
+
+class CursorPage:
+    """One page of results with next/previous cursor links"""
+
+    def __init__(self, object_list, request, param, next_cursor=None, previous_cursor=None, count=None):
+        self.object_list = object_list
+        self.request = request
+        self.param = param
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.count = count
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    def _url(self, cursor):
+        query = self.request.GET.copy()
+        query.pop('page', None)
+        query[self.param] = cursor
+        return f'?{query.urlencode()}'
+
+    @property
+    def next_url(self):
+        return self._url(self.next_cursor) if self.has_next else None
+
+    @property
+    def previous_url(self):
+        return self._url(self.previous_cursor) if self.has_previous else None
+
+    @property
+    def first_url(self):
+        query = self.request.GET.copy()
+        query.pop('page', None)
+        query.pop(self.param, None)
+        return f'?{query.urlencode()}'
+
+
+def paginate_by_cursor(request, queryset, per_page=20, param='cursor', with_count=False):
+    """
+    Return the CursorPage of `queryset` selected by request.GET[param].
+    An invalid cursor falls back to the first page. with_count=True adds a
+    COUNT(*) of the whole queryset as page.count.
+    """
+    ordering = _ordering(queryset)
+    cursor = decode_cursor(request.GET.get(param), queryset.model, ordering)
+    ordered = queryset.order_by(*ordering)
+
+    if cursor is None:
+        rows = list(ordered[:per_page + 1])
+        has_more, has_before = len(rows) > per_page, False
+        rows = rows[:per_page]
+    elif cursor[0] == NEXT:
+        rows = list(ordered.filter(_after(ordering, cursor[1]))[:per_page + 1])
+        has_more, has_before = len(rows) > per_page, True
+        rows = rows[:per_page]
+    else:
+        # Walk backwards from the cursor, then put the page back in order
+        backwards = [spec[1:] if spec.startswith('-') else f'-{spec}' for spec in ordering]
+        rows = list(queryset.order_by(*backwards).filter(_after(ordering, cursor[1], reverse=True))[:per_page + 1])
+        has_more, has_before = True, len(rows) > per_page
+        rows = rows[:per_page][::-1]
+
+    def cursor_for(direction, row):
+        return encode_cursor(direction, [_value(row, spec.lstrip('-')) for spec in ordering])
+
+    next_cursor = cursor_for(NEXT, rows[-1]) if rows and has_more else None
+    previous_cursor = cursor_for(PREVIOUS, rows[0]) if rows and has_before else None
+    count = queryset.count() if with_count else None
+    return CursorPage(rows, request, param, next_cursor, previous_cursor, count)
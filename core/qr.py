@@ -0,0 +1,127 @@
+"""
+Content-addressed QR code images.
+
+Each image is stored once in media storage as qr/<aa>/<sha256>.png. The hash
+covers the payload and drawing options, so the name is known before anything
+is drawn. Pages link to the image by URL and the web server serves it from
+MEDIA_ROOT like any other upload, with a name that never changes content.
+Each process remembers the names it has already stored and the PNGs it has
+recently drawn (LRUs), so showing a payload again costs no rendering and no
+storage round trip.
+
+Images are drawn straight from the QR module matrix with Pillow, using one
+reusable encoder per thread. Models set the name in save() and call
+queue_qr(), which draws and stores the image on a small thread pool after the
+transaction commits. If that never happens (the process died first), the
+repair_qr_codes command draws the images that are missing from storage.
+
+    url = qr_url(f"UPI://pay?...")
+"""
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from io import BytesIO
+
+import qrcode
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+QR_DIR = 'qr'
+ERROR_CORRECT_L = qrcode.constants.ERROR_CORRECT_L
+ERROR_CORRECT_M = qrcode.constants.ERROR_CORRECT_M
+
+_local = threading.local()
+
+
+def _encoder(error_correction):
+    encoders = getattr(_local, 'encoders', None)
+    if encoders is None:
+        encoders = _local.encoders = {}
+    if error_correction not in encoders:
+        encoders[error_correction] = qrcode.QRCode(error_correction=error_correction)
+    return encoders[error_correction]
+
+
+def _matrix(payload, border, error_correction):
+    qr = _encoder(error_correction)
+    qr.clear()
+    # Fit each payload from the smallest version, not the previous payload's
+    qr.version = None
+    qr.border = border
+    qr.add_data(payload)
+    qr.make(fit=True)
+    return qr.get_matrix()
+
+
+def qr_image(payload, box_size=10, border=4, error_correction=ERROR_CORRECT_M):
+    """Black and white PIL image of the payload's QR code"""
+    matrix = _matrix(payload, border, error_correction)
+    size = len(matrix)
+    image = Image.new('1', (size, size))
+    image.putdata([0 if dark else 255 for row in matrix for dark in row])
+    return image.resize((size * box_size, size * box_size), Image.NEAREST)
+
+
+@lru_cache(maxsize=256)
+def render_png(payload, box_size=10, border=4, error_correction=ERROR_CORRECT_M):
+    buffer = BytesIO()
+    qr_image(payload, box_size, border, error_correction).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def qr_name(payload, box_size=10, border=4, error_correction=ERROR_CORRECT_M):
+    """Storage name of the payload's image (no rendering)"""
+    digest = hashlib.sha256(f'{box_size}|{border}|{error_correction}|{payload}'.encode()).hexdigest()
+    return f'{QR_DIR}/{digest[:2]}/{digest}.png'
+
+
+@lru_cache(maxsize=1024)
+def store(payload, box_size=10, border=4, error_correction=ERROR_CORRECT_M):
+    """Make sure the payload's image is in storage and return its name"""
+    name = qr_name(payload, box_size, border, error_correction)
+    if not default_storage.exists(name):
+        saved = default_storage.save(name, ContentFile(render_png(payload, box_size, border, error_correction)))
+        if saved != name:
+            # Another process stored the same image first; storage kept both
+            default_storage.delete(saved)
+    return name
+
+
+def qr_url(payload, box_size=10, border=4, error_correction=ERROR_CORRECT_M):
+    return default_storage.url(store(payload, box_size, border, error_correction))
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    # Created lazily so every gunicorn worker gets its own pool after fork
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'QR_RENDER_WORKERS', 1),
+                    thread_name_prefix='qr-render'
+                )
+    return _executor
+
+
+def _store_quietly(payload, options):
+    try:
+        store(payload, **options)
+    except Exception:
+        logger.exception("Storing QR image %s failed", qr_name(payload, **options))
+
+
+def queue_qr(payload, **options):
+    """Store the payload's image in the background once the current transaction commits"""
+    transaction.on_commit(lambda: get_executor().submit(_store_quietly, payload, options))
@@ -0,0 +1,187 @@
+"""
+Sliding-window rate limiting backed by the shared cache.
+
+Each (scope, identifier) pair keeps one counter per fixed window. The request
+count is estimated from the current window plus the previous one weighted by
+how much of it still overlaps the sliding window, so bursts at a window
+boundary are not let through twice. Counters are bumped with atomic cache
+increments, which means throttled traffic never reaches the database. A
+rejected request is taken back out of the count, so a client that keeps
+retrying is let in again once its window has passed.
+
+The client address comes from X-Real-IP only when the connection comes from
+one of settings.TRUSTED_PROXIES (nginx). Anyone else could set the header to
+pick a fresh address for every request.
+"""
+import ipaddress
+import math
+import re
+import time
+from functools import lru_cache, wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, JsonResponse
+
+RATE_RE = re.compile(r'^(\d+)/(\d*)([smhd])$')
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """Parse '5/m', '20/10m' or '100/h' into (limit, window_seconds)"""
+    match = RATE_RE.match(rate)
+    if not match:
+        raise ValueError(f"Invalid rate: {rate}")
+    limit, multiplier, period = match.groups()
+    return int(limit), int(multiplier or 1) * PERIODS[period]
+
+
+@lru_cache(maxsize=8)
+def _proxy_networks(proxies):
+    return [ipaddress.ip_network(proxy, strict=False) for proxy in proxies]
+
+
+def _is_trusted_proxy(address):
+    networks = _proxy_networks(tuple(getattr(settings, 'TRUSTED_PROXIES', ())))
+    if not networks:
+        return False
+    try:
+        address = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(address in network for network in networks)
+
+
+def get_client_ip(request):
+    remote_addr = request.META.get('REMOTE_ADDR', '')
+    real_ip = request.META.get('HTTP_X_REAL_IP', '').strip()
+    # nginx overwrites X-Real-IP with the connecting address; from anywhere else it is client-controlled
+    if real_ip and _is_trusted_proxy(remote_addr):
+        return real_ip
+    return remote_addr
+
+
+def _phone_key(request):
+    phone_number = request.POST.get('phone_number', '').strip()
+    if phone_number:
+        country_code = request.POST.get('country_code', '').strip()
+        return ''.join(filter(str.isdigit, country_code + phone_number))
+    return request.session.get('phone_number') if hasattr(request, 'session') else None
+
+
+def _ip_phone_key(request):
+    # Per sender and number, so nobody can use up a number's allowance for its owner
+    phone = _phone_key(request)
+    return f"{get_client_ip(request)}:{phone}" if phone else None
+
+
+def _user_key(request):
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return str(user.pk)
+    return None
+
+
+KEY_FUNCTIONS = {
+    'ip': get_client_ip,
+    'user': _user_key,
+    'phone': _phone_key,
+    'ip_phone': _ip_phone_key,
+}
+
+
+def _count(scope, identifier, limit, window):
+    """Count one request. Returns (seconds to wait or 0, the counter it was added to)."""
+    now = time.time()
+    current_window = int(now // window)
+    elapsed = now - current_window * window
+
+    current_key = f"rl:{scope}:{identifier}:{current_window}"
+    previous_key = f"rl:{scope}:{identifier}:{current_window - 1}"
+
+    # Counters live for two windows so the next window can still weight this one
+    cache.add(current_key, 0, window * 2)
+    try:
+        current = cache.incr(current_key)
+    except ValueError:
+        cache.set(current_key, 1, window * 2)
+        current = 1
+    previous = cache.get(previous_key, 0)
+
+    weight = (window - elapsed) / window
+    if previous * weight + current <= limit:
+        return 0, current_key
+
+    if current > limit or not previous:
+        return max(1, math.ceil(window - elapsed)), current_key
+
+    # Wait until enough of the previous window has slid out to admit one more request
+    allowed_previous = max(limit - current, 0)
+    wait = window * (1 - allowed_previous / previous) - elapsed
+    return max(1, math.ceil(wait)), current_key
+
+
+def _uncount(counter_key):
+    try:
+        cache.decr(counter_key)
+    except ValueError:
+        pass  # expired meanwhile
+
+
+def check_rate_limit(request, scope, rate, key='ip'):
+    """
+    Apply a rate to the request for every key in `key` (name, callable or tuple).
+    Returns seconds to wait, or 0 if the request is allowed. A request
+    rejected under any key is counted under none of them.
+    """
+    limit, window = parse_rate(rate)
+    keys = key if isinstance(key, (list, tuple)) else (key,)
+
+    retry_after = 0
+    counted = []
+    for key_func in keys:
+        name = key_func if isinstance(key_func, str) else key_func.__name__
+        if isinstance(key_func, str):
+            key_func = KEY_FUNCTIONS[key_func]
+        identifier = key_func(request)
+        if not identifier:
+            continue
+        wait, counter_key = _count(f"{scope}:{name}", identifier, limit, window)
+        retry_after = max(retry_after, wait)
+        counted.append(counter_key)
+    if retry_after:
+        for counter_key in counted:
+            _uncount(counter_key)
+    return retry_after
+
+
+def rate_limited_response(request, retry_after):
+    """429 response with Retry-After, JSON for AJAX callers"""
+    message = f'Too many requests. Please try again in {retry_after} seconds.'
+    if request.headers.get('x-requested-with') == 'XMLHttpRequest' or \
+       'application/json' in request.headers.get('accept', ''):
+        response = JsonResponse({'status': 'error', 'message': message}, status=429)
+    else:
+        response = HttpResponse(message, status=429, content_type='text/plain')
+    response['Retry-After'] = str(retry_after)
+    return response
+
+
+def ratelimit(rate, key='ip', scope=None, methods=('POST',)):
+    """
+    Decorator to throttle a view.
+    Usage: @ratelimit('5/10m', key=('ip', 'phone'))
+    For class-based views wrap it with method_decorator.
+    """
+    def decorator(view_func):
+        view_scope = scope or f"{view_func.__module__}.{view_func.__qualname__}"
+
+        @wraps(view_func)
+        def wrapped_view(request, *args, **kwargs):
+            if methods is None or request.method in methods:
+                retry_after = check_rate_limit(request, view_scope, rate, key)
+                if retry_after:
+                    return rate_limited_response(request, retry_after)
+            return view_func(request, *args, **kwargs)
+        return wrapped_view
+    return decorator
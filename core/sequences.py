@@ -0,0 +1,113 @@
+"""
+Human-readable ID allocation.
+
+Receipt, membership, asset, scheme and gate pass numbers come from named
+counters in core.IDSequence, one row per (name, period), e.g.
+('donation_receipt', '202610'). A process reserves a block of numbers with a
+single UPDATE ... SET last_value = last_value + block, which row-locks the
+counter so concurrent workers can never get the same block. Numbers are then
+handed out from memory until the block is used up.
+
+Allocation cost does not depend on table size. The trade-off of blocks larger
+than 1 is that numbers can be skipped (a worker exits with part of its block
+unused) and are not strictly in creation order across workers.
+
+The first allocation in a new period seeds the counter from `initial`, so
+series that already have rows in the table carry on from the highest number.
+"""
+import threading
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.db.models.functions import Length
+from django.utils import timezone
+
+from .models import IDSequence
+
+_blocks = {}
+_lock = threading.Lock()
+
+
+def _block_size(name):
+    sizes = getattr(settings, 'ID_SEQUENCE_BLOCK_SIZES', {})
+    return sizes.get(name, getattr(settings, 'ID_SEQUENCE_BLOCK_SIZE', 10))
+
+
+def _reserve(name, period, size, initial):
+    """Reserve `size` numbers in the database; returns the last one reserved"""
+    counter = IDSequence.objects.filter(name=name, period=period)
+    for _ in range(2):
+        with transaction.atomic():
+            if counter.update(last_value=F('last_value') + size, updated_at=timezone.now()):
+                return counter.values_list('last_value', flat=True).get()
+            try:
+                with transaction.atomic():
+                    start = initial() if initial else 0
+                    IDSequence.objects.create(name=name, period=period, last_value=start + size)
+                    return start + size
+            except IntegrityError:
+                # Another worker created the counter first; take the UPDATE path
+                continue
+    raise RuntimeError(f"Could not allocate from sequence {name} {period}")
+
+
+def next_value(name, period='', initial=None):
+    """
+    Next number in the `name` series for `period`.
+    `initial` is a callable returning the last number already in use; it is
+    only called when the counter for this period does not exist yet.
+    """
+    key = (name, period)
+    with _lock:
+        current, last = _blocks.get(key, (0, 0))
+        if current < last:
+            _blocks[key] = (current + 1, last)
+            return current + 1
+
+        size = _block_size(name)
+        last = _reserve(name, period, size, initial)
+        first = last - size + 1
+
+    # The reservation only counts once it commits. If a surrounding
+    # transaction rolls back, the counter goes back too, so the rest of the
+    # block must not be handed out.
+    if size > 1:
+        transaction.on_commit(lambda: _store_block(key, first, last))
+    return first
+
+
+def reserve_values(name, count, period='', initial=None):
+    """
+    Reserve `count` consecutive numbers in one counter update, for bulk
+    inserts. Bypasses the per-process block cache.
+    """
+    if count <= 0:
+        return range(0)
+    last = _reserve(name, period, count, initial)
+    return range(last - count + 1, last + 1)
+
+
+def _store_block(key, first, last):
+    with _lock:
+        current, held = _blocks.get(key, (0, 0))
+        if held < last:
+            _blocks[key] = (first, last)
+
+
+def last_number(queryset, field, prefix):
+    """
+    Highest numeric suffix among `field` values starting with `prefix`.
+    Used to seed a new counter from rows created before it existed.
+    """
+    value = queryset.filter(**{f'{field}__startswith': prefix}).order_by(
+        Length(field).desc(), f'-{field}'
+    ).values_list(field, flat=True).first()
+    suffix = value[len(prefix):] if value else ''
+    return int(suffix) if suffix.isdigit() else 0
+
+
+def reset_blocks():
+    """Forget reserved blocks held by this process"""
+    with _lock:
+        _blocks.clear()
@@ -0,0 +1,146 @@
+"""
+Cache-first session backend.
+
+Sessions are read from the cache and only fall back to django_session on a
+miss. Saves always refresh the cache, but the database row is written only
+when the session data actually changed or its stored expiry is getting close,
+so a request that merely touches the session costs no database query. The
+cache entry never outlives the row, and a row deleted while its session is
+still cached (not flushed) is written again on the next save.
+
+The cache must be shared by every worker (settings.REDIS_URL), otherwise a
+worker could keep serving a session another worker has changed or flushed.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.contrib.sessions.backends.base import UpdateError
+from django.contrib.sessions.backends.db import SessionStore as DBStore
+from django.contrib.sessions.models import Session
+from django.core.cache import caches
+from django.utils import timezone
+
+KEY_PREFIX = 'core.sessions.'
+
+
+class SessionStore(DBStore):
+    cache_key_prefix = KEY_PREFIX
+
+    def __init__(self, session_key=None):
+        self._cache = caches[settings.SESSION_CACHE_ALIAS]
+        self._loaded_digest = None
+        self._db_expiry = None
+        super().__init__(session_key)
+
+    @property
+    def cache_key(self):
+        return self.cache_key_prefix + self._get_or_create_session_key()
+
+    def _digest(self, data):
+        return hashlib.md5(self.serializer().dumps(data)).hexdigest()
+
+    def load(self):
+        try:
+            entry = self._cache.get(self.cache_key)
+        except Exception:
+            # Some backends (e.g. memcache) raise an exception on invalid
+            # cache keys. If this happens, reset the session.
+            entry = None
+
+        if entry is not None:
+            self._loaded_digest = entry['digest']
+            self._db_expiry = entry['db_expiry']
+            return entry['data']
+
+        s = self._get_session_from_db()
+        if s is None:
+            self._session_key = None
+            return {}
+
+        data = self.decode(s.session_data)
+        self._loaded_digest = self._digest(data)
+        self._db_expiry = s.expire_date.timestamp()
+        self._set_cache(data, self.get_expiry_age(expiry=s.expire_date))
+        return data
+
+    def _set_cache(self, data, timeout):
+        self._cache.set(self.cache_key, {
+            'data': data,
+            'digest': self._loaded_digest,
+            'db_expiry': self._db_expiry,
+        }, timeout)
+
+    def _db_write_needed(self, digest, must_create):
+        if must_create or self._db_expiry is None or digest != self._loaded_digest:
+            return True
+        # Refresh the row once less than this share of its lifetime remains
+        ratio = getattr(settings, 'SESSION_DB_REFRESH_RATIO', 0.5)
+        return self._db_expiry - time.time() < self.get_expiry_age() * ratio
+
+    def save(self, must_create=False):
+        if self.session_key is None:
+            return self.create()
+
+        data = self._get_session(no_load=must_create)
+        digest = self._digest(data)
+        if self._db_write_needed(digest, must_create):
+            try:
+                super().save(must_create=must_create)
+            except UpdateError:
+                # The row is gone. A flush drops the cache entry too, so one
+                # that is still cached was deleted behind our back; write it again.
+                if self.cache_key not in self._cache:
+                    raise
+                super().save(must_create=True)
+            self._db_expiry = self.get_expiry_date().timestamp()
+        self._loaded_digest = digest
+        # Never cached for longer than the row lives, or the session would
+        # outlive the row once the expired row is swept
+        self._set_cache(data, min(self.get_expiry_age(), int(self._db_expiry - time.time())))
+
+    def exists(self, session_key):
+        return (self.cache_key_prefix + session_key) in self._cache or super().exists(session_key)
+
+    def delete(self, session_key=None):
+        super().delete(session_key)
+        if session_key is None:
+            if self.session_key is None:
+                return
+            session_key = self.session_key
+        self._cache.delete(self.cache_key_prefix + session_key)
+
+    def flush(self):
+        """
+        Remove the current session data from the database and regenerate the
+        key.
+        """
+        self.clear()
+        self.delete(self.session_key)
+        self._session_key = None
+
+    @classmethod
+    def clear_expired(cls, batch_size=1000, max_batches=None, pause=0):
+        """
+        Delete expired rows in primary-key batches so no single statement
+        holds locks on a large part of django_session.
+        Returns the number of rows deleted.
+        """
+        total = 0
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            keys = list(Session.objects.filter(
+                expire_date__lt=timezone.now()
+            ).values_list('session_key', flat=True)[:batch_size])
+            if not keys:
+                break
+
+            deleted, _ = Session.objects.filter(session_key__in=keys).delete()
+            total += deleted
+            batches += 1
+
+            if len(keys) < batch_size:
+                break
+            if pause:
+                time.sleep(pause)
+        return total
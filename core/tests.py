@@ -1,3 +1,54 @@
-from django.test import TestCase
+import time
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.sessions.backends.base import UpdateError
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from .sessions import SessionStore
+
+
+@override_settings(SESSION_COOKIE_AGE=3600, SESSION_DB_REFRESH_RATIO=0.5)
+class SessionStoreTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.session = SessionStore()
+        self.session['cart'] = 1
+        self.session.create()
+
+    def reload(self):
+        return SessionStore(self.session.session_key)
+
+    def test_touch_is_served_from_cache(self):
+        session = self.reload()
+        self.assertEqual(session['cart'], 1)
+        with self.assertNumQueries(0):
+            session.save()
+
+    def test_cache_does_not_outlive_the_row(self):
+        session = self.reload()
+        self.assertEqual(session['cart'], 1)
+        later = time.time() + 1000
+        with mock.patch('core.sessions.time.time', return_value=later), \
+                mock.patch.object(session._cache, 'set') as cache_set:
+            session.save()
+        # The row was not written, so the entry may only live as long as the row does
+        self.assertLessEqual(cache_set.call_args.args[2], 3600 - 1000)
+
+    def test_row_deleted_while_cached_is_written_again(self):
+        Session.objects.filter(session_key=self.session.session_key).delete()
+        session = self.reload()
+        session['cart'] = 2
+        session.save()
+        row = Session.objects.get(session_key=self.session.session_key)
+        self.assertEqual(session.decode(row.session_data)['cart'], 2)
+
+    def test_flushed_session_is_not_written_again(self):
+        session = self.reload()
+        self.assertEqual(session['cart'], 1)
+        self.reload().delete()
+        session['cart'] = 2
+        with self.assertRaises(UpdateError):
+            session.save()
+        self.assertFalse(Session.objects.exists())
@@ -475,9 +475,9 @@ def main_dashboard_view(request):
     # Get Donations stats
     try:
         from donations.models import Donation
+        from donations.rollups import donor_totals
         user_donations = Donation.objects.filter(donor=request.user, status='SUCCESS')
-        stats['total_donations'] = user_donations.count()
-        stats['donations_amount'] = user_donations.aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
+        stats['total_donations'], stats['donations_amount'] = donor_totals(request.user)
         context['recent_donations'] = user_donations.order_by('-created_at')[:5]
     except:
         context['recent_donations'] = []
@@ -485,7 +485,10 @@ def main_dashboard_view(request):
     # Get Membership stats
     try:
         from membership.models import Membership
-        stats['total_members'] = Membership.objects.filter(is_active=True, verification_status='APPROVED').count()
+        # Indexed range on active memberships; also right on days the expiry sweep has not run yet
+        stats['total_members'] = Membership.objects.filter(
+            is_active=True, verification_status='APPROVED', end_date__gte=timezone.localdate()
+        ).count()
         # New members this month
         stats['new_members'] = Membership.objects.filter(
             created_at__gte=timezone.now().replace(day=1)
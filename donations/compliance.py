@@ -0,0 +1,137 @@
+"""
+Election Commission contribution report (Form 24A).
+
+Successful donations in a financial year are streamed over a server-side
+cursor, ordered by donor (resolved DonorIdentity, keyed by its PAN when it
+has one, else the typed PAN, else phone), with their DonationCompliance row
+joined in. One pass groups each donor's contributions as they arrive. Only
+the current donor's rows are held in memory, so a full year needs the same
+memory as a day. Donors whose total for the year is more than
+EC_CONTRIBUTION_THRESHOLD are written out, and their donations can be flagged
+as reported in batches while the file is written.
+"""
+from datetime import datetime
+from itertools import groupby
+
+from django.conf import settings
+from django.db.models import Case, CharField, F, Q, Value, When
+from django.db.models.functions import Cast, Concat, Upper
+from django.utils import timezone
+from openpyxl import Workbook
+
+from core.exports import iter_csv
+from .models import PAYMENT_METHOD_CHOICES, Donation, DonationCompliance
+
+EC_REPORT_HEADER = [
+    'S.No.', 'Name of Contributor', 'Address of Contributor', 'PAN', 'Phone',
+    'Mode of Contribution', 'Transaction / Cheque Reference', 'Amount (Rs.)',
+    'Date of Contribution', 'Receipt Number', 'PAN Verified', 'Total Contribution in Year (Rs.)',
+]
+
+FIELDS = [
+    'donor_key', 'pk', 'donor_name', 'donor_address', 'donor_pan', 'donor_phone', 'payment_method',
+    'razorpay_payment_id', 'amount', 'created_at', 'receipt_number', 'donationcompliance__pan_verified',
+]
+
+PAYMENT_METHODS = dict(PAYMENT_METHOD_CHOICES)
+
+
+def financial_year_bounds(start_year):
+    """Start and end (exclusive) of the April-March financial year beginning in `start_year`"""
+    start = timezone.make_aware(datetime(start_year, 4, 1))
+    end = timezone.make_aware(datetime(start_year + 1, 4, 1))
+    return start, end
+
+
+def contributions(start, end):
+    """Successful donations in [start, end), ordered so each donor's rows are adjacent"""
+    return Donation.objects.filter(
+        status='SUCCESS', created_at__gte=start, created_at__lt=end
+    ).annotate(
+        # An identity never spans two PANs, so all of a donor's gifts, with and without the PAN
+        # typed, share its key. Donations not resolved yet fall back to the typed PAN, then the phone.
+        donor_key=Case(
+            When(donor_identity__pan__gt='', then=Concat(Value('P'), Upper('donor_identity__pan'))),
+            When(donor_identity__isnull=False, then=Concat(Value('I'), Cast('donor_identity_id', CharField()))),
+            When(~Q(donor_pan=''), then=Concat(Value('P'), Upper('donor_pan'))),
+            default=Concat(Value('T'), F('donor_phone')),
+        )
+    ).order_by('donor_key', 'created_at', 'pk')
+
+
+def iter_report_rows(start, end, threshold=None, stats=None, on_reported=None):
+    """
+    Yield EC report rows for donors above the threshold. `stats` (a dict)
+    collects donor/contribution/amount counts; `on_reported` is called with
+    the donation ids of each reported donor.
+    """
+    if threshold is None:
+        threshold = getattr(settings, 'EC_CONTRIBUTION_THRESHOLD', 20000)
+    stats = {} if stats is None else stats
+    stats.update(donors=0, contributions=0, amount=0)
+
+    chunk_size = getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+    rows = contributions(start, end).values_list(*FIELDS).iterator(chunk_size=chunk_size)
+    for _, group in groupby(rows, key=lambda row: row[0]):
+        group = list(group)
+        total = sum(row[8] for row in group)
+        if total <= threshold:
+            continue
+
+        stats['donors'] += 1
+        stats['contributions'] += len(group)
+        stats['amount'] += total
+        for (_, pk, name, address, pan, phone, method, payment_id, amount,
+             created_at, receipt_number, pan_verified) in group:
+            yield [
+                stats['donors'], name, address, pan.upper(), phone, PAYMENT_METHODS.get(method, method),
+                payment_id, amount, timezone.localtime(created_at).strftime('%d-%m-%Y'),
+                receipt_number, 'Yes' if pan_verified else 'No', total,
+            ]
+        if on_reported:
+            on_reported([row[1] for row in group])
+
+
+class ReportedMarker:
+    """Flags donations as reported to the Election Commission, a batch at a time"""
+
+    def __init__(self, reference='', batch_size=2000):
+        self.reference = reference
+        self.batch_size = batch_size
+        self.reported_at = timezone.now()
+        self.pending = []
+        self.marked = 0
+
+    def __call__(self, donation_ids):
+        self.pending.extend(donation_ids)
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        # Donations without a compliance row get one first
+        DonationCompliance.objects.bulk_create(
+            [DonationCompliance(donation_id=pk) for pk in self.pending], ignore_conflicts=True
+        )
+        changes = {'election_commission_reported': True, 'ec_report_date': self.reported_at, 'updated_at': self.reported_at}
+        if self.reference:
+            changes['ec_reference_number'] = self.reference
+        self.marked += DonationCompliance.objects.filter(donation_id__in=self.pending).update(**changes)
+        self.pending = []
+
+
+def write_csv(path, rows):
+    with open(path, 'wb') as output:
+        for chunk in iter_csv(EC_REPORT_HEADER, rows):
+            output.write(chunk)
+
+
+def write_xlsx(path, rows, title='Form 24A'):
+    # write_only mode streams rows to disk instead of building the sheet in memory
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title)
+    sheet.append(EC_REPORT_HEADER)
+    for row in rows:
+        sheet.append(row)
+    workbook.save(path)
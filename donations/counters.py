@@ -0,0 +1,121 @@
+"""
+Campaign raised totals.
+
+A campaign's total is the sum of its CampaignTotalShard rows. Each successful
+donation adds its amount to one randomly chosen shard with an atomic F()
+increment, so there is no read-modify-write and concurrent donors to the same
+campaign mostly lock different rows. Reads sum the shards and cache the result
+for CAMPAIGN_TOTAL_CACHE_TIMEOUT seconds.
+
+The shards are a running tally, seeded from the campaign's raised_amount when
+they were introduced. Part of that seed was raised outside the site or before
+donations were linked to campaigns, and is kept as opening_amount.
+reconcile_campaign_totals() compares the shards with opening_amount plus the
+campaign's successful Donation rows, and folds only the difference into shard
+0. Money with no Donation row is never wiped.
+"""
+import random
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F, DecimalField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import CampaignTotalShard, Donation, DonationCampaign
+
+ZERO = Decimal('0.00')
+
+
+def _shard_count():
+    return getattr(settings, 'CAMPAIGN_COUNTER_SHARDS', 8)
+
+
+def _cache_key(campaign_id):
+    return f"campaign_total:{campaign_id}"
+
+
+def add_to_campaign(campaign_id, amount, shard=None):
+    """Atomically add `amount` (may be negative) to one of the campaign's shards"""
+    if shard is None:
+        shard = random.randrange(_shard_count())
+    counter = CampaignTotalShard.objects.filter(campaign_id=campaign_id, shard=shard)
+    if counter.update(amount=F('amount') + amount):
+        return
+    try:
+        with transaction.atomic():
+            CampaignTotalShard.objects.create(campaign_id=campaign_id, shard=shard, amount=amount)
+    except IntegrityError:
+        # Created concurrently by another donation
+        counter.update(amount=F('amount') + amount)
+
+
+def _timeout():
+    return getattr(settings, 'CAMPAIGN_TOTAL_CACHE_TIMEOUT', 5)
+
+
+def campaign_totals(campaign_ids):
+    """Raised totals for several campaigns: one cache round trip, one query for misses"""
+    campaign_ids = list(campaign_ids)
+    cached = cache.get_many([_cache_key(pk) for pk in campaign_ids])
+    totals = {pk: cached[_cache_key(pk)] for pk in campaign_ids if _cache_key(pk) in cached}
+
+    missing = [pk for pk in campaign_ids if pk not in totals]
+    if missing:
+        sums = dict(CampaignTotalShard.objects.filter(
+            campaign_id__in=missing
+        ).values('campaign_id').annotate(total=Sum('amount')).values_list('campaign_id', 'total'))
+        fresh = {pk: sums.get(pk) or ZERO for pk in missing}
+        cache.set_many({_cache_key(pk): total for pk, total in fresh.items()}, _timeout())
+        totals.update(fresh)
+    return totals
+
+
+def campaign_total(campaign_id):
+    return campaign_totals([campaign_id])[campaign_id]
+
+
+def attach_totals(campaigns):
+    """Preload current_raised on a list of campaigns for templates"""
+    campaigns = list(campaigns)
+    totals = campaign_totals(campaign.pk for campaign in campaigns)
+    for campaign in campaigns:
+        campaign._current_raised = totals[campaign.pk]
+    return campaigns
+
+
+def reconcile_campaign_totals(campaigns=None):
+    """
+    Recompute each campaign's total (opening_amount plus successful donations)
+    and add the difference to the shards if they drifted. Also stores the
+    total in raised_amount. Returns a list of (campaign_id, shard_total,
+    expected_total) for campaigns that needed a repair.
+    """
+    money = DecimalField(max_digits=12, decimal_places=2)
+    donated = Donation.objects.filter(
+        campaign=OuterRef('pk'), status='SUCCESS'
+    ).values('campaign').annotate(total=Sum('amount')).values('total')
+    sharded = CampaignTotalShard.objects.filter(
+        campaign=OuterRef('pk')
+    ).values('campaign').annotate(total=Sum('amount')).values('total')
+
+    if campaigns is None:
+        campaigns = DonationCampaign.objects.all()
+
+    # Both sums come from one statement, so they see the same snapshot
+    rows = campaigns.annotate(
+        donated_total=Coalesce(Subquery(donated, output_field=money), Value(ZERO), output_field=money),
+        shard_total=Coalesce(Subquery(sharded, output_field=money), Value(ZERO), output_field=money),
+    ).values_list('pk', 'raised_amount', 'opening_amount', 'donated_total', 'shard_total')
+
+    repaired = []
+    for pk, raised_amount, opening_amount, donated_total, shard_total in rows:
+        expected = opening_amount + donated_total
+        if expected != shard_total:
+            add_to_campaign(pk, expected - shard_total, shard=0)
+            repaired.append((pk, shard_total, expected))
+        if raised_amount != expected:
+            DonationCampaign.objects.filter(pk=pk).update(raised_amount=expected)
+        cache.delete(_cache_key(pk))
+    return repaired
@@ -0,0 +1,310 @@
+"""
+Donor identity resolution.
+
+Donations only carry what the donor typed (name, email, phone, PAN) plus the
+user account when they were logged in, so one person shows up as many
+donors. Each donation is reduced to blocking keys. An anonymous donation is
+keyed by its valid PAN, the last 10 digits of its phone number and its
+lowercased email. A signed-in donation is keyed by the user id and the
+account's verified phone number only: what a signed-in donor types into the
+form is unverified and must not pull their gifts into someone else's
+identity. Donations sharing a key are clustered with union-find into a
+DonorIdentity, except that two clusters holding different valid PANs are
+never joined. DonorIdentityKey maps every key to its identity under a unique
+index, so finding a donor is an indexed lookup per key.
+
+New donations are resolved as they are saved (Donation.save), and
+resolve_donor_identities picks up rows written in bulk. When a donation
+links two existing identities they are merged. DonorIdentity keeps a
+running total of successful donations, updated by rollups together with the
+other donor totals. Donor leaderboards are keyed by identity, so they follow
+resolutions and merges.
+"""
+import re
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, IntegerField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from accounts.models import User
+from accounts.search import normalize_phone
+from . import leaderboards
+from .models import Donation, DonorIdentity, DonorIdentityKey
+
+PAN_RE = re.compile(r'^[A-Z]{5}[0-9]{4}[A-Z]$')
+PHONE_KEY_DIGITS = 10
+
+# Fields resolve_identities needs from each donation
+DONATION_FIELDS = ['pk', 'donor_id', 'donor_name', 'donor_email', 'donor_phone', 'donor_pan', 'status', 'amount']
+
+
+def normalize_pan(value):
+    value = (value or '').strip().upper()
+    return value if PAN_RE.match(value) else ''
+
+
+def normalize_email(value):
+    value = (value or '').strip().lower()
+    return value if '@' in value else ''
+
+
+def phone_key(value):
+    # Last 10 digits, so +91 98765 43210, 098765 43210 and 9876543210 match
+    digits = normalize_phone(value)
+    return digits[-PHONE_KEY_DIGITS:] if len(digits) >= PHONE_KEY_DIGITS else ''
+
+
+def blocking_keys(user_id=None, pan='', phone='', email=''):
+    keys = []
+    if user_id:
+        keys.append(('USER', str(user_id)))
+    for kind, value in (('PAN', normalize_pan(pan)), ('PHONE', phone_key(phone)), ('EMAIL', normalize_email(email))):
+        if value:
+            keys.append((kind, value))
+    return keys
+
+
+def _account_phones(user_ids):
+    """Verified phone numbers of the given accounts"""
+    return dict(User.objects.filter(pk__in=user_ids, is_phone_verified=True).values_list('pk', 'phone_number'))
+
+
+def _donation_keys(donation, account_phones):
+    if donation.donor_id:
+        return blocking_keys(donation.donor_id, phone=account_phones.get(donation.donor_id, ''))
+    return blocking_keys(pan=donation.donor_pan, phone=donation.donor_phone, email=donation.donor_email)
+
+
+def _key_filter(keys):
+    values = defaultdict(set)
+    for kind, value in keys:
+        values[kind].add(value)
+    condition = Q(pk__in=[])
+    for kind, kind_values in values.items():
+        condition |= Q(kind=kind, value__in=kind_values)
+    return condition
+
+
+def _existing_keys(keys):
+    if not keys:
+        return {}
+    return {
+        (kind, value): identity_id
+        for kind, value, identity_id in DonorIdentityKey.objects.filter(
+            _key_filter(keys)
+        ).values_list('kind', 'value', 'identity_id')
+    }
+
+
+class UnionFind:
+    """Union-find whose sets carry at most one PAN; sets with different PANs are never joined"""
+
+    def __init__(self):
+        self.parent = {}
+        self.pan = {}
+
+    def add(self, node, pan=''):
+        root = self.find(node)
+        if pan and not self.pan.get(root):
+            self.pan[root] = pan
+        return root
+
+    def find(self, node):
+        parent = self.parent.setdefault(node, node)
+        if parent != node:
+            parent = self.parent[node] = self.find(parent)
+        return parent
+
+    def union(self, a, b):
+        """Join the sets of `a` and `b`. Returns False if their PANs differ."""
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a == root_b:
+            return True
+        pan_a, pan_b = self.pan.get(root_a, ''), self.pan.get(root_b, '')
+        if pan_a and pan_b and pan_a != pan_b:
+            return False
+        self.parent[root_b] = root_a
+        if pan_b and not pan_a:
+            self.pan[root_a] = pan_b
+        return True
+
+
+def find_identities(user=None, pan='', phone='', email=''):
+    """Identities matching any of the given donor details (indexed key lookups)"""
+    keys = blocking_keys(getattr(user, 'pk', None), pan, phone, email)
+    if not keys:
+        return DonorIdentity.objects.none()
+    return DonorIdentity.objects.filter(
+        pk__in=DonorIdentityKey.objects.filter(_key_filter(keys)).values('identity_id')
+    )
+
+
+def donor_summary(user=None, pan='', phone='', email=''):
+    """(count, amount) of successful donations across the matching identities"""
+    summary = find_identities(user, pan, phone, email).aggregate(
+        count=Coalesce(Sum('donation_count'), Value(0)), amount=Sum('amount')
+    )
+    return summary['count'], summary['amount'] or 0
+
+
+def _add_totals(identity_id, count, amount):
+    if count or amount:
+        DonorIdentity.objects.filter(pk=identity_id).update(
+            donation_count=F('donation_count') + count, amount=F('amount') + amount
+        )
+
+
+def merge_identities(winner_id, loser_ids):
+    """Fold `loser_ids` into `winner_id`: donations, keys and totals"""
+    loser_ids = [pk for pk in set(loser_ids) if pk != winner_id]
+    if not loser_ids:
+        return
+    with transaction.atomic():
+        losers = list(DonorIdentity.objects.select_for_update().filter(pk__in=loser_ids).order_by('pk'))
+        Donation.objects.filter(donor_identity_id__in=loser_ids).update(donor_identity_id=winner_id)
+        DonorIdentityKey.objects.filter(identity_id__in=loser_ids).update(identity_id=winner_id)
+        _add_totals(winner_id, sum(i.donation_count for i in losers), sum(i.amount for i in losers))
+        pan = next((i.pan for i in losers if i.pan), '')
+        if pan:
+            DonorIdentity.objects.filter(pk=winner_id, pan='').update(pan=pan)
+        DonorIdentity.objects.filter(pk__in=loser_ids).delete()
+        leaderboards.merge_donors(winner_id, loser_ids)
+
+
+def resolve_identities(donations):
+    """
+    Cluster `donations` (which have no identity yet) with each other and with
+    existing identities, and store the result. Returns the number of new
+    identities created.
+    """
+    donations = list(donations)
+    if not donations:
+        return 0
+
+    account_phones = _account_phones({d.donor_id for d in donations if d.donor_id})
+    keys = {donation.pk: _donation_keys(donation, account_phones) for donation in donations}
+    all_keys = {key for donation_keys in keys.values() for key in donation_keys}
+
+    with transaction.atomic():
+        existing = _existing_keys(all_keys)
+        identity_pans = dict(DonorIdentity.objects.filter(
+            pk__in=set(existing.values())
+        ).values_list('pk', 'pan'))
+
+        # Stored keys belong to their identity; new donations then join what they can
+        uf = UnionFind()
+        for key, identity_id in existing.items():
+            uf.add(('i', identity_id), identity_pans.get(identity_id, ''))
+            uf.union(('i', identity_id), ('k',) + key)
+        for donation in donations:
+            uf.add(('d', donation.pk), normalize_pan(donation.donor_pan))
+            for key in keys[donation.pk]:
+                uf.union(('k',) + key, ('d', donation.pk))
+
+        clusters = defaultdict(lambda: {'donations': [], 'identities': set(), 'keys': set()})
+        for donation in donations:
+            clusters[uf.find(('d', donation.pk))]['donations'].append(donation)
+        # A key refused by a PAN conflict stays with the set it joined first
+        for key in all_keys:
+            root = uf.find(('k',) + key)
+            if root in clusters:
+                clusters[root]['keys'].add(key)
+        for identity_id in set(existing.values()):
+            root = uf.find(('i', identity_id))
+            if root in clusters:
+                clusters[root]['identities'].add(identity_id)
+        for root, cluster in clusters.items():
+            cluster['pan'] = uf.pan.get(root, '')
+        clusters = list(clusters.values())
+
+        # Clusters without an identity get a new one carrying their totals
+        new = [cluster for cluster in clusters if not cluster['identities']]
+        identities = DonorIdentity.objects.bulk_create([
+            _new_identity(cluster['donations']) for cluster in new
+        ], batch_size=1000)
+        for cluster, identity in zip(new, identities):
+            cluster['identity'] = identity.pk
+
+        for cluster in clusters:
+            if cluster['identities']:
+                cluster['identity'] = min(cluster['identities'])
+                merge_identities(cluster['identity'], cluster['identities'])
+                successful = [d for d in cluster['donations'] if d.status == 'SUCCESS']
+                _add_totals(cluster['identity'], len(successful), sum(d.amount for d in successful))
+                pan = next((normalize_pan(d.donor_pan) for d in cluster['donations'] if normalize_pan(d.donor_pan)), '')
+                if pan:
+                    DonorIdentity.objects.filter(pk=cluster['identity'], pan='').update(pan=pan)
+
+        DonorIdentityKey.objects.bulk_create([
+            DonorIdentityKey(kind=kind, value=value, identity_id=cluster['identity'])
+            for cluster in clusters for kind, value in cluster['keys'] if (kind, value) not in existing
+        ], batch_size=1000, ignore_conflicts=True)
+
+        # A concurrent resolver may have claimed a key first; join its identity unless the PANs differ
+        claimed = _existing_keys(all_keys)
+        for cluster in clusters:
+            owners = {claimed[key] for key in cluster['keys'] if key in claimed} - {cluster['identity']}
+            if not owners:
+                continue
+            owner_pans = dict(DonorIdentity.objects.filter(pk__in=owners).values_list('pk', 'pan'))
+            pans = {pan for pan in owner_pans.values() if pan} | ({cluster['pan']} if cluster['pan'] else set())
+            if len(pans) <= 1:
+                winner = min(owners | {cluster['identity']})
+                merge_identities(winner, owners | {cluster['identity']})
+                cluster['identity'] = winner
+
+        assigned = []
+        for cluster in clusters:
+            for donation in cluster['donations']:
+                donation.donor_identity_id = cluster['identity']
+                assigned.append(donation)
+        Donation.objects.bulk_update(assigned, ['donor_identity'], batch_size=1000)
+        # Their constituency was counted when they succeeded; donor boards needed the identity
+        leaderboards.add_donations([d for d in assigned if d.status == 'SUCCESS'], leaderboards.donor_entries)
+    return len(new)
+
+
+def _new_identity(donations):
+    first = donations[0]
+    successful = [d for d in donations if d.status == 'SUCCESS']
+    return DonorIdentity(
+        name=first.donor_name[:100],
+        pan=next((normalize_pan(d.donor_pan) for d in donations if normalize_pan(d.donor_pan)), ''),
+        phone=first.donor_phone[:15],
+        email=normalize_email(first.donor_email),
+        donation_count=len(successful),
+        amount=sum((d.amount for d in successful), 0),
+    )
+
+
+def resolve_pending(chunk_size=5000):
+    """Resolve donations without an identity, a chunk at a time. Yields (donations, new identities) per chunk."""
+    while True:
+        chunk = list(Donation.objects.filter(donor_identity__isnull=True).only(*DONATION_FIELDS[1:]).order_by('pk')[:chunk_size])
+        if not chunk:
+            return
+        yield len(chunk), resolve_identities(chunk)
+
+
+def reset_identities():
+    """Forget every identity so resolve_pending re-clusters all donations from scratch"""
+    with transaction.atomic():
+        Donation.objects.exclude(donor_identity=None).update(donor_identity=None)
+        DonorIdentityKey.objects.all().delete()
+        DonorIdentity.objects.all().delete()
+
+
+def rebuild_identity_totals():
+    """Recompute every identity's donation count and amount from its successful donations"""
+    successful = Donation.objects.filter(donor_identity=OuterRef('pk'), status='SUCCESS').values('donor_identity')
+    return DonorIdentity.objects.update(
+        donation_count=Coalesce(
+            Subquery(successful.annotate(n=Count('pk')).values('n'), output_field=IntegerField()), Value(0)
+        ),
+        amount=Coalesce(
+            Subquery(successful.annotate(total=Sum('amount')).values('total'),
+                     output_field=DecimalField(max_digits=14, decimal_places=2)),
+            Value(0), output_field=DecimalField(max_digits=14, decimal_places=2)
+        ),
+    )
@@ -0,0 +1,249 @@
+"""
+Donation leaderboards.
+
+A leaderboard (scope) ranks members by amount raised: 'constituencies' ranks
+constituencies by all successful donations, 'donors' ranks donor identities,
+and 'donors:campaign:<id>' ranks a campaign's donors. Anonymous donations
+count towards their constituency but never towards a donor board, so no name
+is shown next to money given anonymously.
+
+LeaderboardEntry keeps one running total per (scope, member). Rollups update
+it in the same transaction as the donation's status, and an index on
+(scope, score) makes the top N a short range scan. When the cache is Redis,
+each scope is also mirrored into a sorted set: ZINCRBY after commit and
+ZREVRANGE to read, both O(log n). A missing set is loaded from the table on
+its next read. Sets expire after LEADERBOARD_CACHE_TIMEOUT, which also limits
+how long an update lost to a Redis error can show. Without Redis, or while it
+is unreachable, reads use the table. rebuild_leaderboards recomputes
+everything from donations.
+"""
+import logging
+import uuid
+from collections import Counter, namedtuple
+from decimal import Decimal
+from itertools import chain, islice
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Max, Sum
+from redis.exceptions import RedisError
+
+from .models import Donation, LeaderboardEntry
+
+logger = logging.getLogger(__name__)
+
+CONSTITUENCIES = 'constituencies'
+DONORS = 'donors'
+KEY_PREFIX = 'leaderboard:'
+LOAD_CHUNK_SIZE = 5000
+CENTS = Decimal('0.01')
+
+Standing = namedtuple('Standing', 'rank member label amount')
+
+# Only add to sets that are loaded; a missing set is loaded in full on its next read
+INCREMENT_IF_LOADED = """
+if redis.call('exists', KEYS[1]) == 1 then
+    return redis.call('zincrby', KEYS[1], ARGV[1], ARGV[2])
+end
+"""
+
+
+def campaign_donors(campaign_id):
+    return f'{DONORS}:campaign:{campaign_id}'
+
+
+def _key(scope):
+    return KEY_PREFIX + scope
+
+
+def _timeout():
+    return getattr(settings, 'LEADERBOARD_CACHE_TIMEOUT', 3600)
+
+
+def _redis():
+    """Raw client for the default cache when it is django-redis, else None"""
+    if 'django_redis' not in settings.CACHES['default']['BACKEND']:
+        return None
+    from django_redis import get_redis_connection
+    return get_redis_connection('default')
+
+
+def donor_entries(donation):
+    """(scope, member, label) of the donor boards a successful donation counts towards"""
+    if donation.anonymous or not donation.donor_identity_id:
+        return
+    member = str(donation.donor_identity_id)
+    yield DONORS, member, donation.donor_name
+    if donation.campaign_id:
+        yield campaign_donors(donation.campaign_id), member, donation.donor_name
+
+
+def donation_entries(donation):
+    """(scope, member, label) of every board a successful donation counts towards"""
+    if donation.constituency:
+        yield CONSTITUENCIES, donation.constituency, donation.constituency
+    yield from donor_entries(donation)
+
+
+def apply_deltas(deltas, labels=None):
+    """
+    Add {(scope, member): amount} to the boards, in the caller's transaction.
+    `labels` names members that may be new. Sorted sets follow on commit.
+    """
+    deltas = {key: amount for key, amount in deltas.items() if amount}
+    if not deltas:
+        return
+    labels = labels or {}
+    for (scope, member), amount in deltas.items():
+        entry = LeaderboardEntry.objects.filter(scope=scope, member=member)
+        if entry.update(score=F('score') + amount):
+            continue
+        try:
+            with transaction.atomic():
+                LeaderboardEntry.objects.create(
+                    scope=scope, member=member, label=labels.get((scope, member), '')[:100], score=amount
+                )
+        except IntegrityError:
+            # Another donation created it first
+            entry.update(score=F('score') + amount)
+    transaction.on_commit(lambda: _increment_sets(deltas))
+
+
+def add_donations(donations, entries=donation_entries):
+    """Count successful donations (e.g. ones that just got a donor identity) on their boards"""
+    deltas, labels = Counter(), {}
+    for donation in donations:
+        for scope, member, label in entries(donation):
+            deltas[scope, member] += donation.amount
+            labels.setdefault((scope, member), label)
+    apply_deltas(deltas, labels)
+
+
+def merge_donors(winner_id, loser_ids):
+    """Fold the donor board scores of merged identities into the surviving one"""
+    losers = [str(pk) for pk in loser_ids if pk != winner_id]
+    rows = LeaderboardEntry.objects.filter(scope__startswith=DONORS, member__in=losers)
+    deltas, labels, scopes = Counter(), {}, set()
+    for scope, label, score in rows.values_list('scope', 'label', 'score'):
+        deltas[scope, str(winner_id)] += score
+        labels.setdefault((scope, str(winner_id)), label)
+        scopes.add(scope)
+    if not scopes:
+        return
+    rows.delete()
+    apply_deltas(deltas, labels)
+    transaction.on_commit(lambda: _remove_members(scopes, losers))
+
+
+def _increment_sets(deltas):
+    client = _redis()
+    if client is None:
+        return
+    try:
+        script = client.register_script(INCREMENT_IF_LOADED)
+        pipe = client.pipeline(transaction=False)
+        for (scope, member), amount in deltas.items():
+            script(keys=[_key(scope)], args=[str(amount), member], client=pipe)
+        pipe.execute()
+    except RedisError:
+        logger.warning("Could not update leaderboard sorted sets; they catch up when they expire", exc_info=True)
+
+
+def _remove_members(scopes, members):
+    client = _redis()
+    if client is None:
+        return
+    try:
+        pipe = client.pipeline(transaction=False)
+        for scope in scopes:
+            pipe.zrem(_key(scope), *members)
+        pipe.execute()
+    except RedisError:
+        logger.warning("Could not update leaderboard sorted sets; they catch up when they expire", exc_info=True)
+
+
+def _load_set(client, scope):
+    """Fill a scope's sorted set from the table, under a temporary key renamed into place"""
+    staging = f'{_key(scope)}:loading:{uuid.uuid4().hex}'
+    rows = LeaderboardEntry.objects.filter(scope=scope, score__gt=0).values_list('member', 'score').iterator(
+        chunk_size=LOAD_CHUNK_SIZE
+    )
+    loaded = False
+    while chunk := list(islice(rows, LOAD_CHUNK_SIZE)):
+        client.zadd(staging, {member: float(score) for member, score in chunk})
+        loaded = True
+    if loaded:
+        pipe = client.pipeline()
+        pipe.rename(staging, _key(scope))
+        pipe.expire(_key(scope), _timeout())
+        pipe.execute()
+
+
+def _top_from_set(scope, limit):
+    """[(member, amount)] from the sorted set, or None when Redis is not in use or unreachable"""
+    client = _redis()
+    if client is None:
+        return None
+    try:
+        if not client.exists(_key(scope)):
+            _load_set(client, scope)
+        ranked = client.zrevrange(_key(scope), 0, limit - 1, withscores=True)
+    except RedisError:
+        logger.warning("Leaderboard sorted set unavailable, reading %s from the database", scope, exc_info=True)
+        return None
+    return [(member.decode(), Decimal(score).quantize(CENTS)) for member, score in ranked if score > 0]
+
+
+def top(scope, limit=10):
+    """The scope's `limit` highest members as Standing(rank, member, label, amount)"""
+    ranked = _top_from_set(scope, limit)
+    if ranked is None:
+        rows = LeaderboardEntry.objects.filter(scope=scope, score__gt=0).order_by('-score', '-member')
+        ranked_labels = rows.values_list('member', 'score', 'label')[:limit]
+    else:
+        labels = dict(LeaderboardEntry.objects.filter(
+            scope=scope, member__in=[member for member, _ in ranked]
+        ).values_list('member', 'label'))
+        ranked_labels = [(member, amount, labels.get(member, '')) for member, amount in ranked]
+    return [
+        Standing(rank, member, label or member, amount)
+        for rank, (member, amount, label) in enumerate(ranked_labels, start=1)
+    ]
+
+
+def _clear_sets():
+    client = _redis()
+    if client is None:
+        return
+    try:
+        keys = list(client.scan_iter(match=f'{KEY_PREFIX}*', count=1000))
+        for start in range(0, len(keys), 1000):
+            client.delete(*keys[start:start + 1000])
+    except RedisError:
+        logger.warning("Could not clear leaderboard sorted sets; they reload when they expire", exc_info=True)
+
+
+def rebuild_leaderboards():
+    """Recompute every leaderboard from successful donations. Returns the number of entries."""
+    successful = Donation.objects.filter(status='SUCCESS')
+    named = successful.filter(anonymous=False, donor_identity__isnull=False)
+
+    constituencies = successful.exclude(constituency='').values('constituency').annotate(total=Sum('amount')).order_by()
+    donors = named.values('donor_identity_id').annotate(total=Sum('amount'), label=Max('donor_name')).order_by()
+    campaign_rows = named.filter(campaign__isnull=False).values('campaign_id', 'donor_identity_id').annotate(
+        total=Sum('amount'), label=Max('donor_name')
+    ).order_by()
+
+    entries = chain(
+        (LeaderboardEntry(scope=CONSTITUENCIES, member=row['constituency'], label=row['constituency'],
+                          score=row['total']) for row in constituencies.iterator()),
+        (LeaderboardEntry(scope=DONORS, member=str(row['donor_identity_id']), label=row['label'],
+                          score=row['total']) for row in donors.iterator()),
+        (LeaderboardEntry(scope=campaign_donors(row['campaign_id']), member=str(row['donor_identity_id']),
+                          label=row['label'], score=row['total']) for row in campaign_rows.iterator()),
+    )
+    with transaction.atomic():
+        LeaderboardEntry.objects.all().delete()
+        LeaderboardEntry.objects.bulk_create(entries, batch_size=1000)
+        transaction.on_commit(_clear_sets)
+    return LeaderboardEntry.objects.count()
@@ -0,0 +1,17 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from donations.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = ('Rebuild the donation rollup tables from all donations. '
+            'Migrations fill them on deploy; run this off-peak to repair drift.')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        rollups, donors = rebuild_rollups()
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {rollups} rollup rows and {donors} donor totals in {time.monotonic() - started:.1f}s'
+        ))
@@ -0,0 +1,52 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from donations.compliance import ReportedMarker, financial_year_bounds, iter_report_rows, write_csv, write_xlsx
+
+
+class Command(BaseCommand):
+    help = 'Write the Election Commission contribution report (Form 24A) for a financial year as CSV or XLSX'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='Report file to write (.csv or .xlsx)')
+        parser.add_argument('--year', type=int,
+                            help='Financial year by its starting year, e.g. 2025 for 2025-26 (default: last completed year)')
+        parser.add_argument('--threshold', type=int, help='Report donors whose yearly total exceeds this many rupees')
+        parser.add_argument('--mark-reported', action='store_true',
+                            help='Flag the reported donations as submitted to the Election Commission')
+        parser.add_argument('--reference', default='', help='EC reference number to store with --mark-reported')
+
+    def handle(self, *args, **options):
+        output = options['output']
+        if output.endswith('.xlsx'):
+            write = write_xlsx
+        elif output.endswith('.csv'):
+            write = write_csv
+        else:
+            raise CommandError('Output file must end in .csv or .xlsx')
+
+        year = options['year']
+        if year is None:
+            today = timezone.localdate()
+            year = today.year - (2 if today.month < 4 else 1)
+        start, end = financial_year_bounds(year)
+
+        marker = ReportedMarker(options['reference']) if options['mark_reported'] else None
+        stats = {}
+        started = time.monotonic()
+        # Flags are only kept if the whole report is written
+        with transaction.atomic():
+            write(output, iter_report_rows(start, end, options['threshold'], stats, marker))
+            if marker:
+                marker.flush()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'FY {year}-{(year + 1) % 100:02d}: {stats["contributions"]} contributions from '
+            f'{stats["donors"]} donors totalling ₹{stats["amount"]:,} written to {output} '
+            f'in {time.monotonic() - started:.1f}s'
+        ))
+        if marker:
+            self.stdout.write(f'Marked {marker.marked} donations as reported')
@@ -0,0 +1,66 @@
+import os
+import time
+from functools import partial
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.batches import run_in_batches
+from donations.models import TaxStatement
+from donations.statements import iter_donor_groups, render_batch
+
+
+class Command(BaseCommand):
+    help = 'Render yearly tax statements for every donor across a pool of worker processes (resumable)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int,
+                            help='Financial year by its starting year, e.g. 2025 for 2025-26 (default: last completed year)')
+        parser.add_argument('--force', action='store_true', help='Re-render statements that already exist')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 2, help='Worker processes')
+        parser.add_argument('--batch-size', type=int, default=100, help='Donors per worker task')
+
+    def handle(self, *args, **options):
+        year = options['year']
+        if year is None:
+            today = timezone.localdate()
+            year = today.year - (2 if today.month < 4 else 1)
+
+        batch_size = options['batch_size']
+        workers = options['workers']
+        self.stdout.write(f'Rendering FY {year}-{(year + 1) % 100:02d} statements with {workers} workers...')
+
+        started = time.monotonic()
+        self.rendered = self.failed = self.skipped = self.batches = 0
+        results = run_in_batches(
+            iter_donor_groups(year), partial(render_batch, year), batch_size, workers,
+            prepare=lambda batch: self.unrendered(year, batch, options['force']),
+        )
+        for result in results:
+            self.collect(result, started)
+
+        elapsed = time.monotonic() - started
+        rate = self.rendered / elapsed if elapsed else self.rendered
+        self.stdout.write(self.style.SUCCESS(
+            f'Rendered {self.rendered} statements in {elapsed:.1f}s ({rate:.0f}/s); '
+            f'{self.skipped} already existed, {self.failed} failed'
+        ))
+
+    def unrendered(self, year, batch, force):
+        """Drop statements that already exist, so a rerun resumes"""
+        if force:
+            return batch
+        done = set(TaxStatement.objects.filter(
+            financial_year=year, owner__in={owner for owner, _, _ in batch}
+        ).values_list('owner', 'pan'))
+        self.skipped += len(done & {(owner, donor['pan']) for owner, donor, _ in batch})
+        return [group for group in batch if (group[0], group[1]['pan']) not in done]
+
+    def collect(self, result, started):
+        rendered, failed = result
+        self.rendered += rendered
+        self.failed += failed
+        self.batches += 1
+        if self.batches % 25 == 0:
+            rate = self.rendered / (time.monotonic() - started)
+            self.stdout.write(f'{self.rendered + self.failed + self.skipped} donors done ({rate:.0f}/s)...')
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from donations.payments import process_pending_events
+
+
+class Command(BaseCommand):
+    help = 'Apply pending Razorpay webhook events to donations in batches (several workers may run at once)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Events applied per transaction')
+        parser.add_argument('--once', action='store_true', help='Drain the inbox and exit instead of polling')
+        parser.add_argument('--interval', type=float, default=2.0, help='Seconds to sleep when the inbox is empty')
+
+    def handle(self, *args, **options):
+        processed = 0
+        while True:
+            count = process_pending_events(options['batch_size'])
+            processed += count
+            if count:
+                self.stdout.write(f'Applied {count} events ({processed} total)')
+                continue
+            if options['once']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS(f'Processed {processed} Razorpay events'))
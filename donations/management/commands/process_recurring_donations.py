@@ -0,0 +1,39 @@
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from donations.recurring import process_due
+
+
+class Command(BaseCommand):
+    help = 'Create charges for due recurring donations (run daily; several workers may run at once)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Treat this date (YYYY-MM-DD) as today, e.g. to catch up a missed run')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Subscriptions locked and charged per transaction')
+
+    def handle(self, *args, **options):
+        today = None
+        if options['date']:
+            today = parse_date(options['date'])
+            if today is None:
+                raise CommandError(f'Invalid date: {options["date"]}')
+
+        started = time.monotonic()
+        totals = Counter()
+        for chunks, stats in enumerate(process_due(today, options['chunk_size']), start=1):
+            totals.update(stats)
+            if chunks % 10 == 0:
+                rate = totals['processed'] / (time.monotonic() - started)
+                self.stdout.write(f'{totals["processed"]} subscriptions processed ({rate:.0f}/s)...')
+
+        elapsed = time.monotonic() - started
+        rate = totals['processed'] / elapsed if elapsed else totals['processed']
+        self.stdout.write(self.style.SUCCESS(
+            f'Processed {totals["processed"]} subscriptions in {elapsed:.1f}s ({rate:.0f}/s): '
+            f'{totals["charges"]} charges created, {totals["retried"]} retries, '
+            f'{totals["deactivated"]} deactivated after failures, {totals["completed"]} completed, '
+            f'{totals["pending"]} skipped awaiting their last charge'
+        ))
@@ -0,0 +1,17 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from donations.leaderboards import rebuild_leaderboards
+
+
+class Command(BaseCommand):
+    help = ('Recompute the constituency and donor leaderboards from all successful donations. '
+            'Run once after deploying, or off-peak to repair drift.')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        entries = rebuild_leaderboards()
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {entries} leaderboard entries in {time.monotonic() - started:.1f}s'
+        ))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from donations.counters import reconcile_campaign_totals
+from donations.models import DonationCampaign
+
+
+class Command(BaseCommand):
+    help = ('Recompute campaign raised totals from their opening amounts and successful donations '
+            'and repair drifted counters (run from cron)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--campaign', type=int, action='append', help='Only reconcile this campaign id (repeatable)')
+
+    def handle(self, *args, **options):
+        campaigns = DonationCampaign.objects.all()
+        if options['campaign']:
+            campaigns = campaigns.filter(pk__in=options['campaign'])
+
+        repaired = reconcile_campaign_totals(campaigns)
+        for campaign_id, shard_total, expected_total in repaired:
+            self.stdout.write(f'Campaign {campaign_id}: counters had ₹{shard_total}, expected ₹{expected_total}')
+        self.stdout.write(self.style.SUCCESS(f'Reconciled campaign totals; {len(repaired)} repaired'))
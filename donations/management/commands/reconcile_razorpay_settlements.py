@@ -0,0 +1,48 @@
+import csv
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from donations.payments import reconcile_settlement
+
+REPORT_COLUMNS = ['issue', 'type', 'entity_id', 'payment_id', 'order_id', 'amount', 'settlement_id']
+
+
+class Command(BaseCommand):
+    help = 'Compare a Razorpay settlement report (CSV) with local donations and report discrepancies (run nightly)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', help='Settlement reconciliation CSV downloaded from Razorpay')
+        parser.add_argument('--report', help='Write discrepancies to this CSV file (default: stdout)')
+        parser.add_argument('--apply', action='store_true',
+                            help='Mark captured payments and full refunds missing locally as SUCCESS/REFUNDED')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Settlement rows matched per query')
+
+    def handle(self, *args, **options):
+        try:
+            source = open(options['file'], newline='', encoding='utf-8-sig')
+        except OSError as e:
+            raise CommandError(f'Cannot read {options["file"]}: {e}')
+
+        output = open(options['report'], 'w', newline='', encoding='utf-8') if options['report'] else sys.stdout
+        issues = {}
+        try:
+            reader = csv.DictReader(source)
+            missing = {'entity_id', 'type', 'amount'} - set(reader.fieldnames or [])
+            if missing:
+                raise CommandError(f'Settlement file is missing columns: {", ".join(sorted(missing))}')
+
+            writer = csv.writer(output)
+            writer.writerow(REPORT_COLUMNS)
+            for row, issue in reconcile_settlement(reader, options['apply'], options['chunk_size']):
+                issues[issue] = issues.get(issue, 0) + 1
+                writer.writerow([issue] + [row.get(column, '') for column in REPORT_COLUMNS[1:]])
+        finally:
+            source.close()
+            if output is not sys.stdout:
+                output.close()
+
+        for issue, count in sorted(issues.items()):
+            self.stderr.write(f'{issue}: {count}')
+        applied = '; missing captures and refunds were applied' if options['apply'] else ''
+        self.stderr.write(self.style.SUCCESS(f'Reconciliation found {sum(issues.values())} discrepancies{applied}'))
@@ -0,0 +1,52 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.batches import run_in_batches
+
+from donations.models import Donation
+from donations.receipts import render_batch
+
+
+class Command(BaseCommand):
+    help = 'Render PDF receipts for successful donations across a pool of worker processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int, help='Only donations made in this calendar year')
+        parser.add_argument('--all', action='store_true', help='Re-render receipts that already exist')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 2, help='Worker processes')
+        parser.add_argument('--batch-size', type=int, default=200, help='Donations per worker task')
+
+    def handle(self, *args, **options):
+        donations = Donation.objects.filter(status='SUCCESS')
+        if options['year']:
+            donations = donations.filter(created_at__year=options['year'])
+        if not options['all']:
+            donations = donations.filter(receipt_generated=False)
+
+        batch_size = options['batch_size']
+        workers = options['workers']
+        total = donations.count()
+        self.stdout.write(f'Rendering {total} receipts with {workers} workers...')
+
+        started = time.monotonic()
+        self.rendered = self.failed = self.batches = 0
+        ids = donations.order_by('pk').values_list('pk', flat=True).iterator(chunk_size=batch_size * 10)
+        for result in run_in_batches(ids, render_batch, batch_size, workers):
+            self.collect(result, total, started)
+
+        elapsed = time.monotonic() - started
+        rate = self.rendered / elapsed if elapsed else self.rendered
+        self.stdout.write(self.style.SUCCESS(
+            f'Rendered {self.rendered} receipts in {elapsed:.1f}s ({rate:.0f}/s); {self.failed} failed'
+        ))
+
+    def collect(self, result, total, started):
+        rendered, failed = result
+        self.rendered += rendered
+        self.failed += failed
+        self.batches += 1
+        if self.batches % 25 == 0:
+            rate = self.rendered / (time.monotonic() - started)
+            self.stdout.write(f'{self.rendered + self.failed}/{total} done ({rate:.0f}/s)...')
@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from donations.identity import rebuild_identity_totals, reset_identities, resolve_pending
+from donations.leaderboards import rebuild_leaderboards
+
+
+class Command(BaseCommand):
+    help = 'Cluster donations without a donor identity (bulk imports, recurring charges, history) into identities'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Donations resolved per transaction')
+        parser.add_argument('--rebuild-totals', action='store_true',
+                            help='Recompute every identity total from its successful donations afterwards')
+        parser.add_argument('--reset', action='store_true',
+                            help='Discard all identities and re-cluster every donation (after a change to the '
+                                 'matching rules); donor leaderboards are rebuilt afterwards')
+
+    def handle(self, *args, **options):
+        if options['reset']:
+            reset_identities()
+            self.stdout.write('Discarded existing identities')
+
+        started = time.monotonic()
+        resolved = created = 0
+        for count, new in resolve_pending(options['chunk_size']):
+            resolved += count
+            created += new
+            self.stdout.write(f'{resolved} donations resolved ({resolved / (time.monotonic() - started):.0f}/s)...')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Resolved {resolved} donations into {created} new identities in {time.monotonic() - started:.1f}s'
+        ))
+        if options['rebuild_totals']:
+            self.stdout.write(f'Recomputed totals for {rebuild_identity_totals()} identities')
+        if options['reset']:
+            self.stdout.write(f'Rebuilt leaderboards ({rebuild_leaderboards()} entries)')
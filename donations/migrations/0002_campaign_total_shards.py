@@ -0,0 +1,58 @@
+# Generated by Django 4.2.7 on 2026-10-17 03:23
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def link_and_seed(apps, schema_editor):
+    """
+    Link existing donations to their campaign by title (donate_form stored the
+    title as the purpose) and carry each campaign's raised_amount into shard 0
+    so displayed totals do not change.
+    """
+    Donation = apps.get_model('donations', 'Donation')
+    DonationCampaign = apps.get_model('donations', 'DonationCampaign')
+    CampaignTotalShard = apps.get_model('donations', 'CampaignTotalShard')
+
+    campaigns = list(DonationCampaign.objects.all())
+    titles = {}
+    for campaign in campaigns:
+        titles.setdefault(campaign.title, []).append(campaign.pk)
+
+    for title, ids in titles.items():
+        if len(ids) == 1:
+            Donation.objects.filter(campaign__isnull=True, purpose=title).update(campaign_id=ids[0])
+
+    CampaignTotalShard.objects.bulk_create([
+        CampaignTotalShard(campaign_id=campaign.pk, shard=0, amount=campaign.raised_amount)
+        for campaign in campaigns
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('donations', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='donation',
+            name='campaign',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='donations', to='donations.donationcampaign'),
+        ),
+        migrations.CreateModel(
+            name='CampaignTotalShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.PositiveSmallIntegerField()),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('campaign', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='total_shards', to='donations.donationcampaign')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='campaigntotalshard',
+            constraint=models.UniqueConstraint(fields=('campaign', 'shard'), name='donations_campaign_shard'),
+        ),
+        migrations.RunPython(link_and_seed, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.7 on 2026-10-17 03:24
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_user_phone_digits_search_indexes'),
+        ('donations', '0002_campaign_total_shards'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DonorDonationTotal',
+            fields=[
+                ('donor', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='donation_total', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('donation_count', models.IntegerField(default=0)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DonationRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('constituency', models.CharField(blank=True, max_length=100)),
+                ('purpose', models.CharField(blank=True, max_length=200)),
+                ('success_count', models.IntegerField(default=0)),
+                ('success_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('refund_count', models.IntegerField(default=0)),
+                ('refund_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('campaign', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='donations.donationcampaign')),
+            ],
+            options={
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='donationrollup',
+            constraint=models.UniqueConstraint(fields=('date', 'constituency', 'purpose', 'campaign'), name='donations_rollup_key'),
+        ),
+    ]
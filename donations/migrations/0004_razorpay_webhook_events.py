@@ -0,0 +1,41 @@
+# Generated by Django 4.2.7 on 2026-10-17 03:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('donations', '0003_donation_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RazorpayWebhookEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_id', models.CharField(max_length=100, unique=True)),
+                ('event', models.CharField(max_length=50)),
+                ('payload', models.JSONField()),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('APPLIED', 'Applied'), ('IGNORED', 'Ignored'), ('FAILED', 'Failed')], default='PENDING', max_length=10)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('error', models.TextField(blank=True)),
+            ],
+            options={
+                'ordering': ['received_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='donation',
+            index=models.Index(condition=models.Q(('razorpay_payment_id', ''), _negated=True), fields=['razorpay_payment_id'], name='donations_rzp_payment'),
+        ),
+        migrations.AddIndex(
+            model_name='donation',
+            index=models.Index(condition=models.Q(('razorpay_order_id', ''), _negated=True), fields=['razorpay_order_id'], name='donations_rzp_order'),
+        ),
+        migrations.AddIndex(
+            model_name='razorpaywebhookevent',
+            index=models.Index(condition=models.Q(('status', 'PENDING')), fields=['received_at'], name='donations_rzp_event_pending'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-17 03:32
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('donations', '0004_razorpay_webhook_events'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recurringdonation',
+            name='last_charge',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='donations.donation'),
+        ),
+        migrations.AddIndex(
+            model_name='recurringdonation',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['next_payment_date', 'id'], name='donations_recurring_due'),
+        ),
+    ]
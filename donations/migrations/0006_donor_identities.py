@@ -0,0 +1,49 @@
+# Generated by Django 4.2.7 on 2026-10-17 03:44
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('donations', '0005_recurring_last_charge'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DonorIdentity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(blank=True, max_length=100)),
+                ('pan', models.CharField(blank=True, max_length=10)),
+                ('phone', models.CharField(blank=True, max_length=15)),
+                ('email', models.EmailField(blank=True, max_length=254)),
+                ('donation_count', models.IntegerField(default=0)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Donor identities',
+            },
+        ),
+        migrations.CreateModel(
+            name='DonorIdentityKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('USER', 'User account'), ('PAN', 'PAN'), ('PHONE', 'Phone'), ('EMAIL', 'Email')], max_length=5)),
+                ('value', models.CharField(max_length=254)),
+                ('identity', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='keys', to='donations.donoridentity')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='donation',
+            name='donor_identity',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='donations', to='donations.donoridentity'),
+        ),
+        migrations.AddConstraint(
+            model_name='donoridentitykey',
+            constraint=models.UniqueConstraint(fields=('kind', 'value'), name='donations_identity_key'),
+        ),
+    ]
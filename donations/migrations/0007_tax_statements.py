@@ -0,0 +1,34 @@
+# Generated by Django 4.2.7 on 2026-10-17 03:47
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('donations', '0006_donor_identities'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaxStatement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('financial_year', models.IntegerField(help_text='Starting year, e.g. 2025 for 2025-26')),
+                ('donation_count', models.IntegerField(default=0)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('deductible_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('file', models.FileField(upload_to='tax_statements/')),
+                ('generated_at', models.DateTimeField(auto_now=True)),
+                ('identity', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tax_statements', to='donations.donoridentity')),
+            ],
+            options={
+                'ordering': ['-financial_year'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='taxstatement',
+            constraint=models.UniqueConstraint(fields=('identity', 'financial_year'), name='donations_tax_statement'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+from django.db import migrations, models
+
+
+def delete_statements(apps, schema_editor):
+    # Statements were keyed by donor identity, which could span several people;
+    # generate_tax_statements renders them again per owner and PAN
+    apps.get_model('donations', 'TaxStatement').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('donations', '0008_leaderboards'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_statements, migrations.RunPython.noop),
+        migrations.RemoveConstraint(
+            model_name='taxstatement',
+            name='donations_tax_statement',
+        ),
+        migrations.RemoveField(
+            model_name='taxstatement',
+            name='identity',
+        ),
+        migrations.AddField(
+            model_name='taxstatement',
+            name='owner',
+            field=models.CharField(default='', max_length=20),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='taxstatement',
+            name='pan',
+            field=models.CharField(blank=True, max_length=10),
+        ),
+        migrations.AddConstraint(
+            model_name='taxstatement',
+            constraint=models.UniqueConstraint(fields=('owner', 'pan', 'financial_year'), name='donations_tax_statement'),
+        ),
+    ]
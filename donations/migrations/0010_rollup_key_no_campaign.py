@@ -0,0 +1,66 @@
+# Generated by Django 4.2.7 on 2026-10-17 10:20
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
+
+ZERO = Decimal('0.00')
+
+
+def rebuild_rollups(apps, schema_editor):
+    """
+    Recompute the rollup tables from donations (as donations.rollups.rebuild_rollups
+    does). This fills the tables on deployments that never ran
+    backfill_donation_rollups, and merges the duplicate campaign-less rows the
+    old constraint let through before the new one is added.
+    """
+    Donation = apps.get_model('donations', 'Donation')
+    DonationRollup = apps.get_model('donations', 'DonationRollup')
+    DonorDonationTotal = apps.get_model('donations', 'DonorDonationTotal')
+
+    counted = Donation.objects.filter(status__in=['SUCCESS', 'REFUNDED'])
+    success = Q(status='SUCCESS')
+    refunded = Q(status='REFUNDED')
+    groups = counted.annotate(day=TruncDate('created_at')).values(
+        'day', 'constituency', 'purpose', 'campaign_id'
+    ).annotate(
+        success_count=Count('pk', filter=success),
+        success_amount=Coalesce(Sum('amount', filter=success), Value(ZERO)),
+        refund_count=Count('pk', filter=refunded),
+        refund_amount=Coalesce(Sum('amount', filter=refunded), Value(ZERO)),
+    ).order_by()
+    donors = counted.filter(success, donor__isnull=False).values('donor_id').annotate(
+        donation_count=Count('pk'), total=Sum('amount')
+    ).order_by()
+
+    DonationRollup.objects.all().delete()
+    DonorDonationTotal.objects.all().delete()
+    DonationRollup.objects.bulk_create((
+        DonationRollup(
+            date=row['day'], constituency=row['constituency'], purpose=row['purpose'],
+            campaign_id=row['campaign_id'], success_count=row['success_count'],
+            success_amount=row['success_amount'], refund_count=row['refund_count'],
+            refund_amount=row['refund_amount'],
+        ) for row in groups.iterator()
+    ), batch_size=1000)
+    DonorDonationTotal.objects.bulk_create((
+        DonorDonationTotal(donor_id=row['donor_id'], donation_count=row['donation_count'], amount=row['total'])
+        for row in donors.iterator()
+    ), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('donations', '0009_tax_statement_owner'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_rollups, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='donationrollup',
+            constraint=models.UniqueConstraint(condition=models.Q(('campaign__isnull', True)), fields=('date', 'constituency', 'purpose'), name='donations_rollup_key_no_campaign'),
+        ),
+    ]
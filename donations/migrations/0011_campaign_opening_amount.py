@@ -0,0 +1,42 @@
+# Generated by Django 4.2.7 on 2026-10-17 04:43
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def set_opening_amounts(apps, schema_editor):
+    """
+    The shards were seeded with raised_amount and have since moved only with
+    linked donations. Anything they hold beyond those donations was raised
+    outside them, and reconcile_campaign_totals must keep it.
+    """
+    Donation = apps.get_model('donations', 'Donation')
+    DonationCampaign = apps.get_model('donations', 'DonationCampaign')
+    CampaignTotalShard = apps.get_model('donations', 'CampaignTotalShard')
+
+    sharded = dict(CampaignTotalShard.objects.values('campaign_id').annotate(
+        total=Sum('amount')).values_list('campaign_id', 'total'))
+    donated = dict(Donation.objects.filter(status='SUCCESS', campaign__isnull=False).values('campaign_id').annotate(
+        total=Sum('amount')).values_list('campaign_id', 'total'))
+    for campaign_id, shard_total in sharded.items():
+        opening_amount = (shard_total or Decimal('0')) - (donated.get(campaign_id) or Decimal('0'))
+        if opening_amount > 0:
+            DonationCampaign.objects.filter(pk=campaign_id).update(opening_amount=opening_amount)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('donations', '0010_rollup_key_no_campaign'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='donationcampaign',
+            name='opening_amount',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.RunPython(set_opening_amounts, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,7 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 from django.utils import timezone
+from core.sequences import next_value, last_number, reserve_values
 import uuid
 
 PAYMENT_METHOD_CHOICES = [
@@ -44,6 +45,9 @@ class Donation(models.Model):
     is_recurring = models.BooleanField(default=False)
     constituency = models.CharField(max_length=100, blank=True)
     purpose = models.CharField(max_length=200, blank=True)
+    campaign = models.ForeignKey('DonationCampaign', on_delete=models.SET_NULL, null=True, blank=True, related_name='donations')
+    # Person behind the donation across logins and anonymous gifts, see donations.identity
+    donor_identity = models.ForeignKey('DonorIdentity', on_delete=models.SET_NULL, null=True, blank=True, related_name='donations')
     anonymous = models.BooleanField(default=False)
     receipt_number = models.CharField(max_length=50, unique=True, blank=True)
     receipt_generated = models.BooleanField(default=False)
@@ -53,13 +57,52 @@ class Donation(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    # Status as last read from or written to the database, to spot transitions
+    _saved_status = None
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._saved_status = instance.__dict__.get('status')
+        return instance
+    
+    @staticmethod
+    def _receipt_series():
+        now = timezone.now()
+        period = f"{now.year}{now.month:02d}"
+        prefix = f"NISHAD{period}"
+        return period, prefix, lambda: last_number(Donation.objects, 'receipt_number', prefix)
+    
+    @classmethod
+    def allocate_receipt_numbers(cls, count):
+        """Receipt numbers for `count` donations about to be bulk created"""
+        period, prefix, initial = cls._receipt_series()
+        return [f"{prefix}{n:05d}" for n in reserve_values('donation_receipt', count, period, initial)]
+    
     def save(self, *args, **kwargs):
         if not self.receipt_number:
-            year = timezone.now().year
-            month = timezone.now().month
-            count = Donation.objects.filter(created_at__year=year, created_at__month=month).count() + 1
-            self.receipt_number = f"NISHAD{year}{month:02d}{count:05d}"
-        super().save(*args, **kwargs)
+            period, prefix, initial = self._receipt_series()
+            count = next_value('donation_receipt', period, initial=initial)
+            self.receipt_number = f"{prefix}{count:05d}"
+        
+        adding = self._state.adding
+        previous_status = self._saved_status
+        if self.status == previous_status:
+            super().save(*args, **kwargs)
+        else:
+            # Campaign counters and rollups move in the same transaction as the status
+            from .rollups import apply_status_change
+            with transaction.atomic():
+                super().save(*args, **kwargs)
+                apply_status_change(self, previous_status, self.status)
+                if self.status == 'SUCCESS' and not self.receipt_generated:
+                    from .receipts import queue_receipt
+                    transaction.on_commit(lambda: queue_receipt(self.pk))
+            self._saved_status = self.status
+        
+        if adding and self.donor_identity_id is None:
+            from .identity import resolve_identities
+            resolve_identities([self])
     
     @property
     def requires_pan_verification(self):
@@ -70,6 +113,13 @@ class Donation(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Webhooks and settlement reconciliation look donations up by Razorpay ids
+            models.Index(fields=['razorpay_payment_id'], name='donations_rzp_payment',
+                         condition=~models.Q(razorpay_payment_id='')),
+            models.Index(fields=['razorpay_order_id'], name='donations_rzp_order',
+                         condition=~models.Q(razorpay_order_id='')),
+        ]
 
 class RecurringDonation(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -84,6 +134,8 @@ class RecurringDonation(models.Model):
     max_failures = models.IntegerField(default=3)
     constituency = models.CharField(max_length=100, blank=True)
     purpose = models.CharField(max_length=200, blank=True)
+    # Most recent charge created by the scheduler; its outcome drives retries
+    last_charge = models.ForeignKey(Donation, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -92,6 +144,10 @@ class RecurringDonation(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['next_payment_date', 'id'], name='donations_recurring_due',
+                         condition=models.Q(is_active=True)),
+        ]
 
 class DonationCompliance(models.Model):
     donation = models.OneToOneField(Donation, on_delete=models.CASCADE)
@@ -112,7 +168,9 @@ class DonationCampaign(models.Model):
     title = models.CharField(max_length=200)
     description = models.TextField()
     target_amount = models.DecimalField(max_digits=12, decimal_places=2)
-    raised_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    raised_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)  # last reconciled total, see donations.counters
+    # Raised outside the campaign's linked donations (offline, or before donations were linked); part of the total
+    opening_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     start_date = models.DateField()
     end_date = models.DateField()
     is_active = models.BooleanField(default=True)
@@ -122,10 +180,18 @@ class DonationCampaign(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    @property
+    def current_raised(self):
+        """Live total from the counter shards, cached for a few seconds"""
+        if not hasattr(self, '_current_raised'):
+            from .counters import campaign_total
+            self._current_raised = campaign_total(self.pk)
+        return self._current_raised
+    
     @property
     def progress_percentage(self):
         if self.target_amount > 0:
-            return min((self.raised_amount / self.target_amount) * 100, 100)
+            return min((self.current_raised / self.target_amount) * 100, 100)
         return 0
     
     def __str__(self):
@@ -133,3 +199,182 @@ class DonationCampaign(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+
+class DonationRollup(models.Model):
+    """
+    Donation totals pre-aggregated by day, constituency, purpose and campaign,
+    kept current by donations.rollups as donations succeed or are refunded.
+    """
+    date = models.DateField()
+    constituency = models.CharField(max_length=100, blank=True)
+    purpose = models.CharField(max_length=200, blank=True)
+    campaign = models.ForeignKey(DonationCampaign, on_delete=models.CASCADE, null=True, blank=True, related_name='rollups')
+    success_count = models.IntegerField(default=0)
+    success_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    refund_count = models.IntegerField(default=0)
+    refund_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    
+    def __str__(self):
+        return f"{self.date} {self.constituency or '-'} {self.purpose or '-'}: ₹{self.success_amount}"
+    
+    class Meta:
+        ordering = ['-date']
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'constituency', 'purpose', 'campaign'], name='donations_rollup_key'),
+            # NULLs never compare equal, so rows without a campaign need their own constraint
+            models.UniqueConstraint(
+                fields=['date', 'constituency', 'purpose'],
+                condition=models.Q(campaign__isnull=True),
+                name='donations_rollup_key_no_campaign',
+            ),
+        ]
+
+class DonorDonationTotal(models.Model):
+    """Running count and amount of a registered donor's successful donations"""
+    donor = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True, related_name='donation_total')
+    donation_count = models.IntegerField(default=0)
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    
+    def __str__(self):
+        return f"{self.donor}: {self.donation_count} donations, ₹{self.amount}"
+
+class DonorIdentity(models.Model):
+    """
+    One real-world donor, clustered from donations sharing a PAN, phone
+    number, email or user account. Keeps a running count and amount of the
+    cluster's successful donations.
+    """
+    name = models.CharField(max_length=100, blank=True)
+    pan = models.CharField(max_length=10, blank=True)
+    phone = models.CharField(max_length=15, blank=True)
+    email = models.EmailField(blank=True)
+    donation_count = models.IntegerField(default=0)
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.name or self.phone or self.email} ({self.donation_count} donations, ₹{self.amount})"
+    
+    class Meta:
+        verbose_name_plural = 'Donor identities'
+
+class DonorIdentityKey(models.Model):
+    """Normalized blocking key (PAN, phone, email, user) pointing at its donor identity"""
+    KIND_CHOICES = [
+        ('USER', 'User account'),
+        ('PAN', 'PAN'),
+        ('PHONE', 'Phone'),
+        ('EMAIL', 'Email'),
+    ]
+    
+    kind = models.CharField(max_length=5, choices=KIND_CHOICES)
+    value = models.CharField(max_length=254)
+    identity = models.ForeignKey(DonorIdentity, on_delete=models.CASCADE, related_name='keys')
+    
+    def __str__(self):
+        return f"{self.kind}:{self.value}"
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'value'], name='donations_identity_key'),
+        ]
+
+class TaxStatement(models.Model):
+    """
+    Consolidated statement of one donor's successful donations under one PAN
+    for a financial year. The donor is the owner key (see donations.statements):
+    a verified phone number, or an account without one.
+    """
+    owner = models.CharField(max_length=20)
+    pan = models.CharField(max_length=10, blank=True)
+    financial_year = models.IntegerField(help_text="Starting year, e.g. 2025 for 2025-26")
+    donation_count = models.IntegerField(default=0)
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    deductible_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    file = models.FileField(upload_to='tax_statements/')
+    generated_at = models.DateTimeField(auto_now=True)
+    
+    @property
+    def financial_year_label(self):
+        return f"{self.financial_year}-{(self.financial_year + 1) % 100:02d}"
+    
+    def __str__(self):
+        return f"FY {self.financial_year_label} statement for {self.owner} {self.pan}".rstrip()
+    
+    class Meta:
+        ordering = ['-financial_year']
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'pan', 'financial_year'], name='donations_tax_statement'),
+        ]
+
+class LeaderboardEntry(models.Model):
+    """
+    A member's running total on one leaderboard, e.g. a constituency on
+    'constituencies' or a donor identity on 'donors:campaign:<id>'. Kept
+    current by donations.leaderboards.
+    """
+    scope = models.CharField(max_length=60)
+    member = models.CharField(max_length=100)
+    label = models.CharField(max_length=100, blank=True)
+    score = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    
+    def __str__(self):
+        return f"{self.scope}: {self.label or self.member} ₹{self.score}"
+    
+    class Meta:
+        verbose_name_plural = 'Leaderboard entries'
+        constraints = [
+            models.UniqueConstraint(fields=['scope', 'member'], name='donations_leaderboard_member'),
+        ]
+        indexes = [
+            # Top N of a board is a range scan in rank order
+            models.Index(fields=['scope', '-score', '-member'], name='donations_leaderboard_rank'),
+        ]
+
+class CampaignTotalShard(models.Model):
+    """
+    One of several counters whose sum is a campaign's raised total. Donations
+    increment a random shard so concurrent donors do not queue on one row.
+    """
+    campaign = models.ForeignKey(DonationCampaign, on_delete=models.CASCADE, related_name='total_shards')
+    shard = models.PositiveSmallIntegerField()
+    amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    
+    def __str__(self):
+        return f"{self.campaign} #{self.shard}: ₹{self.amount}"
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['campaign', 'shard'], name='donations_campaign_shard'),
+        ]
+
+class RazorpayWebhookEvent(models.Model):
+    """
+    Inbox of verified Razorpay webhook deliveries, applied to donations in
+    batches by donations.payments. Rows are only ever inserted and then marked
+    processed; event_id makes redelivered webhooks a no-op.
+    """
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('APPLIED', 'Applied'),
+        ('IGNORED', 'Ignored'),
+        ('FAILED', 'Failed'),
+    ]
+    
+    event_id = models.CharField(max_length=100, unique=True)
+    event = models.CharField(max_length=50)
+    payload = models.JSONField()
+    received_at = models.DateTimeField(auto_now_add=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
+    processed_at = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    
+    def __str__(self):
+        return f"{self.event} {self.event_id} ({self.status})"
+    
+    class Meta:
+        ordering = ['received_at']
+        indexes = [
+            models.Index(fields=['received_at'], name='donations_rzp_event_pending', condition=models.Q(status='PENDING')),
+        ]
@@ -0,0 +1,283 @@
+"""
+Razorpay payment events.
+
+The webhook view only verifies the signature and inserts the event into the
+RazorpayWebhookEvent inbox (ON CONFLICT DO NOTHING on the event id), so it
+answers Razorpay straight away and redeliveries are harmless.
+process_pending_events() then takes inbox rows in batches, works out each
+donation's new status in memory, writes all of them with one bulk_update,
+and updates rollups, campaign totals and receipts for the batch.
+
+reconcile_settlement() compares a Razorpay settlement export with local
+donations; it is run nightly by the reconcile_razorpay_settlements command.
+"""
+import hashlib
+import hmac
+import uuid
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Donation, RazorpayWebhookEvent
+from .recurring import schedule_retries
+from .rollups import apply_status_changes
+
+# Webhook event -> donation status it moves the payment's donation to
+EVENT_STATUS = {
+    'payment.captured': 'SUCCESS',
+    'order.paid': 'SUCCESS',
+    'payment.failed': 'FAILED',
+    'refund.processed': 'REFUNDED',
+}
+
+# Donation status -> statuses it may be reached from
+ALLOWED_FROM = {
+    'SUCCESS': {'PENDING', 'FAILED', 'CANCELLED'},
+    'FAILED': {'PENDING'},
+    'REFUNDED': {'SUCCESS'},
+}
+
+
+def verify_webhook_signature(body, signature, secret):
+    expected = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature or '')
+
+
+def record_event(event_id, payload):
+    """Store a verified webhook in the inbox; redelivered event ids are dropped"""
+    RazorpayWebhookEvent.objects.bulk_create([
+        RazorpayWebhookEvent(event_id=event_id, event=str(payload.get('event', ''))[:50], payload=payload)
+    ], ignore_conflicts=True)
+
+
+def _entity(payload, name):
+    return ((payload.get('payload') or {}).get(name) or {}).get('entity') or {}
+
+
+def _paise(amount):
+    try:
+        return int(Decimal(amount) * 100)
+    except (InvalidOperation, TypeError):
+        return None
+
+
+def _parse(event):
+    """
+    Pull what is needed from an inbox row.
+    Returns (status, refs, payment_id, order_id, paise) or raises ValueError.
+    """
+    status = EVENT_STATUS.get(event.event)
+    if status is None:
+        raise ValueError(f"Unhandled event {event.event}")
+
+    payment = _entity(event.payload, 'payment')
+    if not payment:
+        raise ValueError("Event has no payment entity")
+
+    notes = payment.get('notes') or {}
+    donation_id = notes.get('donation_id') if isinstance(notes, dict) else None
+    try:
+        donation_id = uuid.UUID(str(donation_id)) if donation_id else None
+    except ValueError:
+        donation_id = None
+
+    paise = payment.get('amount')
+    if status == 'REFUNDED':
+        refund = _entity(event.payload, 'refund')
+        if refund and refund.get('amount') != payment.get('amount'):
+            raise ValueError("Partial refund; update the donation manually")
+
+    return status, donation_id, payment.get('id', ''), payment.get('order_id') or '', paise
+
+
+def _find(donations, donation_id, payment_id, order_id):
+    by_id, by_payment, by_order = donations
+    return (
+        (donation_id and by_id.get(donation_id)) or
+        (payment_id and by_payment.get(payment_id)) or
+        (order_id and by_order.get(order_id)) or
+        None
+    )
+
+
+def _load_donations(donation_ids, payment_ids, order_ids):
+    condition = Q(pk__in=donation_ids) | Q(razorpay_payment_id__in=payment_ids) | Q(razorpay_order_id__in=order_ids)
+    by_id, by_payment, by_order = {}, {}, {}
+    for donation in Donation.objects.select_for_update().filter(condition):
+        by_id[donation.pk] = donation
+        if donation.razorpay_payment_id:
+            by_payment[donation.razorpay_payment_id] = donation
+        if donation.razorpay_order_id:
+            by_order[donation.razorpay_order_id] = donation
+    return by_id, by_payment, by_order
+
+
+def save_transitions(donations, original_status):
+    """
+    Write status and Razorpay id changes for `donations` in one bulk UPDATE,
+    then update rollups and campaign totals, schedule retries of failed
+    recurring charges and queue receipts.
+    `original_status` maps donation pk to the status it had before.
+    """
+    if not donations:
+        return
+    now = timezone.now()
+    for donation in donations:
+        donation.updated_at = now
+    Donation.objects.bulk_update(
+        donations, ['status', 'razorpay_payment_id', 'razorpay_order_id', 'updated_at'], batch_size=500
+    )
+
+    changes = []
+    for donation in donations:
+        old_status = original_status[donation.pk]
+        if donation.status == old_status:
+            continue
+        if donation.status == 'REFUNDED' and old_status != 'SUCCESS':
+            # Captured and refunded within one batch: REFUNDED is only reached
+            # through SUCCESS, so count both steps rather than the net change
+            changes.append((donation, old_status, 'SUCCESS'))
+            old_status = 'SUCCESS'
+        changes.append((donation, old_status, donation.status))
+    apply_status_changes(changes)
+
+    failed = [d.pk for d in donations if d.status == 'FAILED' and d.is_recurring and d.status != original_status[d.pk]]
+    if failed:
+        schedule_retries(failed)
+
+    succeeded = [d.pk for d in donations if d.status == 'SUCCESS' and d.status != original_status[d.pk]
+                 and not d.receipt_generated]
+    if succeeded:
+        transaction.on_commit(lambda: _queue_receipts(succeeded))
+
+
+def _queue_receipts(donation_ids):
+    from .receipts import queue_receipt
+    for pk in donation_ids:
+        queue_receipt(pk)
+
+
+def transition(donation, status, original_status, payment_id='', order_id=''):
+    """
+    Move a donation to `status` in memory if the state machine allows it.
+    Returns an error message, or None when applied.
+    """
+    if donation.status == status:
+        return None
+    if donation.status not in ALLOWED_FROM[status]:
+        return f"Cannot move donation {donation.pk} from {donation.status} to {status}"
+    original_status.setdefault(donation.pk, donation.status)
+    donation.status = status
+    if payment_id and not donation.razorpay_payment_id:
+        donation.razorpay_payment_id = payment_id
+    if order_id and not donation.razorpay_order_id:
+        donation.razorpay_order_id = order_id
+    return None
+
+
+def process_pending_events(batch_size=500):
+    """
+    Apply one batch of pending webhook events. Concurrent workers skip rows
+    another worker has locked. Returns the number of events processed.
+    """
+    with transaction.atomic():
+        events = list(RazorpayWebhookEvent.objects.select_for_update(skip_locked=True).filter(
+            status='PENDING'
+        ).order_by('received_at', 'pk')[:batch_size])
+        if not events:
+            return 0
+
+        parsed, outcomes = {}, {}
+        for event in events:
+            try:
+                parsed[event.pk] = _parse(event)
+            except ValueError as e:
+                outcomes[event.pk] = ('IGNORED', str(e))
+
+        donations = _load_donations(
+            [p[1] for p in parsed.values() if p[1]],
+            [p[2] for p in parsed.values() if p[2]],
+            [p[3] for p in parsed.values() if p[3]],
+        )
+
+        original_status, touched = {}, {}
+        # Events are applied in arrival order so captured-then-refunded works
+        for event in events:
+            if event.pk not in parsed:
+                continue
+            status, donation_id, payment_id, order_id, paise = parsed[event.pk]
+            donation = _find(donations, donation_id, payment_id, order_id)
+            if donation is None:
+                outcomes[event.pk] = ('FAILED', f"No donation for payment {payment_id or order_id}")
+                continue
+            if paise is not None and paise != _paise(donation.amount):
+                outcomes[event.pk] = ('FAILED', f"Amount {paise} paise does not match donation {donation.pk}")
+                continue
+            original_status.setdefault(donation.pk, donation.status)
+            error = transition(donation, status, original_status, payment_id, order_id)
+            if error:
+                outcomes[event.pk] = ('IGNORED', error)
+                continue
+            touched[donation.pk] = donation
+            outcomes[event.pk] = ('APPLIED', '')
+
+        save_transitions(list(touched.values()), original_status)
+
+        # One UPDATE per distinct outcome
+        grouped = {}
+        for pk, outcome in outcomes.items():
+            grouped.setdefault(outcome, []).append(pk)
+        now = timezone.now()
+        for (status, error), pks in grouped.items():
+            RazorpayWebhookEvent.objects.filter(pk__in=pks).update(status=status, error=error, processed_at=now)
+
+    return len(events)
+
+
+def reconcile_settlement(rows, apply=False, chunk_size=2000):
+    """
+    Compare settlement report rows (dicts with entity_id, type, amount,
+    payment_id, order_id) with local donations, a chunk at a time.
+    Yields (row, issue) for every mismatch. With apply=True, captured
+    payments and full refunds that never reached us are applied.
+    """
+    chunk = []
+    for row in rows:
+        if row.get('type') in ('payment', 'refund'):
+            chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield from _reconcile_chunk(chunk, apply)
+            chunk = []
+    if chunk:
+        yield from _reconcile_chunk(chunk, apply)
+
+
+def _reconcile_chunk(rows, apply):
+    def payment_of(row):
+        return row.get('entity_id') if row.get('type') == 'payment' else row.get('payment_id')
+
+    with transaction.atomic():
+        donations = _load_donations([], [payment_of(row) for row in rows], [row.get('order_id') for row in rows if row.get('order_id')])
+        original_status, touched = {}, {}
+        for row in rows:
+            donation = _find(donations, None, payment_of(row), row.get('order_id'))
+            if donation is None:
+                yield row, 'UNKNOWN_PAYMENT'
+                continue
+
+            expected = 'SUCCESS' if row['type'] == 'payment' else 'REFUNDED'
+            if _paise(row.get('amount')) != _paise(donation.amount):
+                yield row, 'AMOUNT_MISMATCH'
+                continue
+            if row['type'] == 'payment' and donation.status in ('SUCCESS', 'REFUNDED'):
+                continue
+            if donation.status == expected:
+                continue
+
+            yield row, 'REFUND_NOT_RECORDED' if expected == 'REFUNDED' else 'NOT_CAPTURED_LOCALLY'
+            if apply and not transition(donation, expected, original_status, payment_of(row), row.get('order_id', '')):
+                touched[donation.pk] = donation
+
+        save_transitions(list(touched.values()), original_status)
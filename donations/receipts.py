@@ -0,0 +1,175 @@
+"""
+PDF donation receipts.
+
+Receipts are drawn with Pillow, which can write PDFs directly, and stored in
+Donation.receipt_file under receipts/. Once a receipt exists, downloads are
+served by the web server from MEDIA_ROOT. Django does not render it again.
+
+Successful donations are queued for rendering on a small per-process thread
+pool once their transaction commits; the regenerate_receipts command renders
+in bulk across a process pool.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections
+from django.utils import timezone
+from PIL import Image, ImageDraw
+
+from core.fonts import get_font
+from core.qr import qr_image
+from .models import Donation
+
+logger = logging.getLogger(__name__)
+
+DPI = 150
+PAGE_SIZE = (1240, 1754)  # A4 at 150 dpi
+MARGIN = 100
+BLUE = (0, 123, 255)
+GREEN = (40, 167, 69)
+GREY = (108, 117, 125)
+BLACK = (33, 37, 41)
+
+
+def receipt_filename(donation):
+    # The donation UUID keeps receipt URLs unguessable; receipt numbers are sequential
+    return f"{donation.receipt_number}-{donation.id.hex}.pdf"
+
+
+def render_receipt_pdf(donation):
+    """Return the receipt for a donation as PDF bytes"""
+    page = Image.new('RGB', PAGE_SIZE, 'white')
+    draw = ImageDraw.Draw(page)
+    width = PAGE_SIZE[0]
+    y = MARGIN
+
+    draw.text((width / 2, y), 'NISHAD PARTY', font=get_font(64, bold=True), fill=BLUE, anchor='mt')
+    y += 90
+    draw.text((width / 2, y), 'Donation Receipt', font=get_font(36), fill=BLACK, anchor='mt')
+    y += 70
+    draw.text((width / 2, y), f'Receipt No: {donation.receipt_number}', font=get_font(30, bold=True), fill=BLACK, anchor='mt')
+    y += 60
+    draw.line((MARGIN, y, width - MARGIN, y), fill=BLUE, width=4)
+    y += 50
+
+    created = timezone.localtime(donation.created_at)
+    rows = [
+        ('Donor Name', donation.donor_name),
+        ('Email', donation.donor_email),
+        ('Phone', donation.donor_phone),
+        ('Address', donation.donor_address),
+        ('PAN', donation.donor_pan),
+        ('Date', created.strftime('%d %b %Y, %I:%M %p')),
+        ('Payment Method', donation.get_payment_method_display()),
+        ('Purpose', donation.purpose),
+        ('Constituency', donation.constituency),
+    ]
+    label_font, value_font = get_font(28, bold=True), get_font(28)
+    for label, value in rows:
+        if not value:
+            continue
+        draw.text((MARGIN, y), f'{label}:', font=label_font, fill=GREY)
+        draw.text((MARGIN + 300, y), str(value)[:60], font=value_font, fill=BLACK)
+        y += 50
+
+    y += 30
+    draw.rounded_rectangle((MARGIN, y, width - MARGIN, y + 200), radius=20, fill=GREEN)
+    draw.text((width / 2, y + 40), 'Donation Amount', font=get_font(32), fill='white', anchor='mt')
+    draw.text((width / 2, y + 95), f'Rs. {donation.amount:,.2f}', font=get_font(60, bold=True), fill='white', anchor='mt')
+    y += 260
+
+    notes = [
+        'This donation is eligible for tax exemption under Section 13A of Income Tax Act.',
+        'This receipt is proof of donation made to a political party.',
+    ]
+    if donation.amount >= 2000:
+        notes.append('Donations of Rs. 2000 or above are reported to the Election Commission.')
+    for note in notes:
+        draw.text((MARGIN, y), f'- {note}', font=get_font(24), fill=BLACK)
+        y += 40
+
+    qr = qr_image(f'NISHAD-RECEIPT|{donation.receipt_number}|{donation.amount}|{donation.id}', box_size=8, border=2)
+    page.paste(qr, (width - MARGIN - qr.size[0], PAGE_SIZE[1] - MARGIN - qr.size[1] - 60))
+
+    bottom = PAGE_SIZE[1] - MARGIN
+    draw.text((MARGIN, bottom - 160), 'On behalf of Nishad Party', font=get_font(28, bold=True), fill=BLACK)
+    draw.text((MARGIN, bottom - 110), 'This is a computer generated receipt and does not require signature.',
+              font=get_font(22), fill=GREY)
+    draw.text((MARGIN, bottom - 70), f'Generated on: {timezone.localtime():%d %b %Y, %I:%M %p}',
+              font=get_font(22), fill=GREY)
+
+    buffer = BytesIO()
+    page.save(buffer, format='PDF', resolution=DPI)
+    return buffer.getvalue()
+
+
+def generate_receipt(donation):
+    """Render and store the PDF receipt for a successful donation"""
+    pdf = render_receipt_pdf(donation)
+    if donation.receipt_file:
+        # Replace in place so the download URL stays the same
+        donation.receipt_file.storage.delete(donation.receipt_file.name)
+    donation.receipt_file.save(receipt_filename(donation), ContentFile(pdf), save=False)
+    donation.receipt_generated = True
+    # Plain UPDATE: avoids save() side effects and racing other field changes
+    Donation.objects.filter(pk=donation.pk).update(
+        receipt_file=donation.receipt_file.name,
+        receipt_generated=True
+    )
+    return donation.receipt_file.name
+
+
+def generate_receipt_by_id(donation_id):
+    close_old_connections()
+    try:
+        donation = Donation.objects.filter(pk=donation_id, status='SUCCESS').first()
+        if donation is not None:
+            return generate_receipt(donation)
+    except Exception:
+        logger.exception("Rendering receipt for donation %s failed", donation_id)
+    finally:
+        close_old_connections()
+    return None
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    # Created lazily so every gunicorn worker gets its own pool after fork
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'RECEIPT_RENDER_WORKERS', 2),
+                    thread_name_prefix='receipt-render'
+                )
+    return _executor
+
+
+def queue_receipt(donation_id):
+    """Render a donation's receipt in the background"""
+    return get_executor().submit(generate_receipt_by_id, donation_id)
+
+
+def render_batch(donation_ids):
+    """
+    Process-pool entry point for regenerate_receipts.
+    Returns (rendered, failed) counts for the batch.
+    """
+    rendered = failed = 0
+    for donation in Donation.objects.filter(pk__in=donation_ids, status='SUCCESS'):
+        try:
+            generate_receipt(donation)
+            rendered += 1
+        except Exception:
+            logger.exception("Rendering receipt for donation %s failed", donation.pk)
+            failed += 1
+    close_old_connections()
+    return rendered, failed
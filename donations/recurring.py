@@ -0,0 +1,191 @@
+"""
+Recurring donation scheduler.
+
+Due subscriptions (active, next_payment_date on or before the run date) are
+walked in (next_payment_date, id) keyset order, one chunk per transaction.
+Each chunk is locked with SELECT ... FOR UPDATE SKIP LOCKED, so any number of
+process_recurring_donations workers can run at once without charging a
+subscription twice. For each chunk one query reads the outcome of every
+subscription's previous charge, the new PENDING charges are bulk inserted
+with a single receipt number reservation, and the subscriptions are bulk
+updated.
+
+A charge is a PENDING Donation linked from RecurringDonation.last_charge;
+the payment gateway settles it through the webhook inbox (donations.payments).
+When a charge fails, schedule_retries() brings next_payment_date forward to
+RECURRING_RETRY_DAYS after the failure, so the retry does not wait for the
+next cycle. A retry charge keeps the subscription on its cycle (anchored on
+start_date's day), and the subscription is deactivated after max_failures.
+A subscription whose previous charge is still PENDING is left alone until
+the gateway settles it: a slow webhook is not a failure, and charging again
+could bill the donor twice.
+"""
+import calendar
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Donation, RecurringDonation
+
+FREQUENCY_MONTHS = {
+    'MONTHLY': 1,
+    'QUARTERLY': 3,
+    'HALF_YEARLY': 6,
+    'YEARLY': 12,
+}
+
+FAILED = 'FAILED'
+
+
+def add_months(value, months, day):
+    """`value` moved forward by `months`, on `day` or the month's last day"""
+    month = value.month - 1 + months
+    year = value.year + month // 12
+    month = month % 12 + 1
+    return value.replace(year=year, month=month, day=min(day, calendar.monthrange(year, month)[1]))
+
+
+def next_due_date(subscription, today):
+    """First date after `today` in the subscription's cycle, anchored on start_date"""
+    months = FREQUENCY_MONTHS[subscription.frequency]
+    start = subscription.start_date
+    # Counted from start_date rather than next_payment_date, which a retry moves off the cycle
+    cycles = max(((today.year - start.year) * 12 + today.month - start.month) // months, 0)
+    due = add_months(start, cycles * months, start.day)
+    while due <= today:
+        cycles += 1
+        due = add_months(start, cycles * months, start.day)
+    return due
+
+
+def _retry_delay(failed_attempts):
+    delays = getattr(settings, 'RECURRING_RETRY_DAYS', [1, 3, 7])
+    return timedelta(days=delays[min(failed_attempts, len(delays)) - 1])
+
+
+def _new_charge(subscription):
+    donor = subscription.donor
+    return Donation(
+        donor=donor,
+        donor_name=donor.full_name,
+        donor_email=donor.email,
+        donor_phone=donor.phone_number,
+        amount=subscription.amount,
+        payment_method='ONLINE',
+        status='PENDING',
+        is_recurring=True,
+        constituency=subscription.constituency,
+        purpose=subscription.purpose,
+        notes=f"Recurring {subscription.get_frequency_display().lower()} donation {subscription.pk}",
+    )
+
+
+def process_chunk(today, after=None, chunk_size=1000):
+    """
+    Charge one chunk of due subscriptions after the (next_payment_date, id)
+    cursor `after`. Returns (cursor, stats); cursor is None when nothing
+    was left to process.
+    """
+    stats = Counter()
+    with transaction.atomic():
+        due = RecurringDonation.objects.filter(is_active=True, next_payment_date__lte=today)
+        if after:
+            due = due.filter(Q(next_payment_date__gt=after[0]) | Q(next_payment_date=after[0], pk__gt=after[1]))
+        subscriptions = list(
+            due.select_related('donor').select_for_update(skip_locked=True, of=('self',))
+            .order_by('next_payment_date', 'pk')[:chunk_size]
+        )
+        if not subscriptions:
+            return None, stats
+        cursor = (subscriptions[-1].next_payment_date, subscriptions[-1].pk)
+
+        previous = dict(Donation.objects.filter(
+            pk__in=[s.last_charge_id for s in subscriptions if s.last_charge_id]
+        ).values_list('pk', 'status'))
+
+        charges, charged, updated = [], [], []
+        for subscription in subscriptions:
+            stats['processed'] += 1
+            outcome = previous.get(subscription.last_charge_id)
+            if outcome == 'PENDING':
+                # Still waiting on the gateway; picked up again on the next run
+                stats['pending'] += 1
+                continue
+            updated.append(subscription)
+            retry = outcome == FAILED
+            if retry:
+                subscription.failed_attempts += 1
+                if subscription.failed_attempts >= subscription.max_failures:
+                    subscription.is_active = False
+                    stats['deactivated'] += 1
+                    continue
+            else:
+                subscription.failed_attempts = 0
+
+            if subscription.end_date and subscription.next_payment_date > subscription.end_date:
+                subscription.is_active = False
+                stats['completed'] += 1
+                continue
+
+            charge = _new_charge(subscription)
+            charges.append(charge)
+            charged.append(subscription)
+            subscription.last_charge = charge
+            subscription.next_payment_date = next_due_date(subscription, today)
+            if retry:
+                stats['retried'] += 1
+
+        for charge, receipt_number in zip(charges, Donation.allocate_receipt_numbers(len(charges))):
+            charge.receipt_number = receipt_number
+        Donation.objects.bulk_create(charges, batch_size=500)
+        stats['charges'] += len(charges)
+
+        now = timezone.now()
+        # Only last_charge differs per row; the rest collapse into a few
+        # plain UPDATEs, which is far cheaper than a CASE per field
+        groups = {}
+        for subscription in updated:
+            key = (subscription.next_payment_date, subscription.failed_attempts, subscription.is_active)
+            groups.setdefault(key, []).append(subscription.pk)
+        for (next_payment_date, failed_attempts, is_active), pks in groups.items():
+            RecurringDonation.objects.filter(pk__in=pks).update(
+                next_payment_date=next_payment_date, failed_attempts=failed_attempts,
+                is_active=is_active, updated_at=now
+            )
+        RecurringDonation.objects.bulk_update(charged, ['last_charge'], batch_size=1000)
+    return cursor, stats
+
+
+def schedule_retries(charge_ids, today=None):
+    """
+    Bring the subscriptions whose last charge is among the failed `charge_ids`
+    forward to their retry date, unless they are already due sooner.
+    """
+    today = today or timezone.localdate()
+    attempts = {}
+    for pk, failed_attempts in RecurringDonation.objects.filter(
+        last_charge_id__in=charge_ids, is_active=True
+    ).values_list('pk', 'failed_attempts'):
+        attempts.setdefault(failed_attempts, []).append(pk)
+    now = timezone.now()
+    for failed_attempts, pks in attempts.items():
+        # process_chunk counts this failure when it makes the retry
+        retry_date = today + _retry_delay(failed_attempts + 1)
+        RecurringDonation.objects.filter(pk__in=pks, next_payment_date__gt=retry_date).update(
+            next_payment_date=retry_date, updated_at=now
+        )
+
+
+def process_due(today=None, chunk_size=1000):
+    """Process every due subscription, yielding the stats of each chunk"""
+    today = today or timezone.localdate()
+    cursor = None
+    while True:
+        cursor, stats = process_chunk(today, cursor, chunk_size)
+        if cursor is None:
+            return
+        yield stats
@@ -0,0 +1,153 @@
+"""
+Pre-aggregated donation totals.
+
+DonationRollup keeps per-day totals for each (constituency, purpose, campaign)
+and DonorDonationTotal keeps per-donor totals; DonorIdentity totals (see
+donations.identity) are kept the same way. Donation.save() calls
+apply_status_change() whenever a donation's status changes. Only moves into
+and out of SUCCESS count: reaching SUCCESS adds the donation, and leaving it
+(refund, failure or cancellation) takes it back out. Refunds are also
+tallied. Leaderboard totals (donations.leaderboards) move in the same batch.
+Dashboards sum these small tables instead of scanning donations_donation.
+backfill_donation_rollups rebuilds them from history.
+"""
+from collections import Counter, defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from .counters import add_to_campaign
+from .leaderboards import apply_deltas, donation_entries
+from .models import Donation, DonationRollup, DonorDonationTotal, DonorIdentity
+
+ZERO = Decimal('0.00')
+
+
+def _increment(model, key, **deltas):
+    """UPDATE the row for `key` by `deltas`, inserting it first if needed"""
+    rows = model.objects.filter(**key)
+    changes = {field: F(field) + delta for field, delta in deltas.items()}
+    if rows.update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**key, **deltas)
+    except IntegrityError:
+        # Another transaction inserted it first
+        rows.update(**changes)
+
+
+def _rollup_key(donation):
+    return {
+        'date': timezone.localdate(donation.created_at),
+        'constituency': donation.constituency,
+        'purpose': donation.purpose,
+        'campaign_id': donation.campaign_id,
+    }
+
+
+def apply_status_change(donation, old_status, new_status):
+    apply_status_changes([(donation, old_status, new_status)])
+
+
+def apply_status_changes(changes):
+    """
+    Apply many (donation, old_status, new_status) transitions at once.
+    Deltas are merged per rollup row, donor and campaign first, so a batch
+    costs one increment per distinct key rather than one per donation.
+    """
+    rollups, donors, identities, campaigns = defaultdict(Counter), defaultdict(Counter), defaultdict(Counter), Counter()
+    boards, labels = Counter(), {}
+    for donation, old_status, new_status in changes:
+        if new_status == 'SUCCESS':
+            sign = 1
+        elif old_status == 'SUCCESS':
+            sign = -1
+        else:
+            continue
+
+        amount = sign * donation.amount
+        deltas = rollups[tuple(_rollup_key(donation).items())]
+        deltas['success_count'] += sign
+        deltas['success_amount'] += amount
+        if new_status == 'REFUNDED':
+            deltas['refund_count'] += 1
+            deltas['refund_amount'] += donation.amount
+
+        if donation.donor_id:
+            donors[donation.donor_id]['donation_count'] += sign
+            donors[donation.donor_id]['amount'] += amount
+        if donation.donor_identity_id:
+            identities[donation.donor_identity_id]['donation_count'] += sign
+            identities[donation.donor_identity_id]['amount'] += amount
+        if donation.campaign_id:
+            campaigns[donation.campaign_id] += amount
+        for scope, member, label in donation_entries(donation):
+            boards[scope, member] += amount
+            labels.setdefault((scope, member), label)
+
+    for key, deltas in rollups.items():
+        _increment(DonationRollup, dict(key), **deltas)
+    for donor_id, deltas in donors.items():
+        _increment(DonorDonationTotal, {'donor_id': donor_id}, **deltas)
+    for identity_id, deltas in identities.items():
+        DonorIdentity.objects.filter(pk=identity_id).update(
+            **{field: F(field) + delta for field, delta in deltas.items()}
+        )
+    for campaign_id, amount in campaigns.items():
+        if amount:
+            add_to_campaign(campaign_id, amount)
+    apply_deltas(boards, labels)
+
+
+def total_raised(**filters):
+    """Successful donations total, optionally filtered on rollup fields (date__gte=..., campaign=...)"""
+    return DonationRollup.objects.filter(**filters).aggregate(
+        total=Coalesce(Sum('success_amount'), Value(ZERO))
+    )['total']
+
+
+def donor_totals(user):
+    """(count, amount) of the user's successful donations"""
+    total = DonorDonationTotal.objects.filter(donor=user).values_list('donation_count', 'amount').first()
+    return total or (0, ZERO)
+
+
+def rebuild_rollups():
+    """Recompute both rollup tables from donations_donation"""
+    counted = Donation.objects.filter(status__in=['SUCCESS', 'REFUNDED'])
+    success = Q(status='SUCCESS')
+    refunded = Q(status='REFUNDED')
+
+    groups = counted.annotate(day=TruncDate('created_at')).values(
+        'day', 'constituency', 'purpose', 'campaign_id'
+    ).annotate(
+        success_count=Count('pk', filter=success),
+        success_amount=Coalesce(Sum('amount', filter=success), Value(ZERO)),
+        refund_count=Count('pk', filter=refunded),
+        refund_amount=Coalesce(Sum('amount', filter=refunded), Value(ZERO)),
+    ).order_by()
+
+    donors = counted.filter(success, donor__isnull=False).values('donor_id').annotate(
+        donation_count=Count('pk'), total=Sum('amount')
+    ).order_by()
+
+    with transaction.atomic():
+        DonationRollup.objects.all().delete()
+        DonorDonationTotal.objects.all().delete()
+        DonationRollup.objects.bulk_create((
+            DonationRollup(
+                date=row['day'], constituency=row['constituency'], purpose=row['purpose'],
+                campaign_id=row['campaign_id'], success_count=row['success_count'],
+                success_amount=row['success_amount'], refund_count=row['refund_count'],
+                refund_amount=row['refund_amount'],
+            ) for row in groups.iterator()
+        ), batch_size=1000)
+        DonorDonationTotal.objects.bulk_create((
+            DonorDonationTotal(donor_id=row['donor_id'], donation_count=row['donation_count'], amount=row['total'])
+            for row in donors.iterator()
+        ), batch_size=1000)
+    return DonationRollup.objects.count(), DonorDonationTotal.objects.count()
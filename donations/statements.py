@@ -0,0 +1,209 @@
+"""
+Annual donor tax statements.
+
+A statement covers one owner's donations under one PAN. The owner is the
+verified phone number of the account that gave while signed in, or the
+account itself when its phone is not verified. For an anonymous donation it
+is the phone number typed with it. A member can download the statements of
+their account and of their verified phone number (owner_keys). Statements
+are deliberately not built from the fuzzy DonorIdentity clusters, which may
+join several people who share a phone or email.
+
+generate_tax_statements makes one pass over a financial year's successful
+donations, sorted by (owner, PAN) in SQL. It groups each statement's rows as
+they stream past and hands batches of them to a process pool, which draws
+the PDFs (same Pillow setup as receipts) and stores them as TaxStatement
+rows. A statement that already exists is skipped, so an interrupted run
+picks up where it stopped.
+
+Donations under Section 80GGC are deductible unless paid in cash; statements
+show both the total and the deductible amount.
+"""
+import logging
+import uuid
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.db import close_old_connections
+from django.db.models import Case, CharField, F, Q, Value, When
+from django.db.models.functions import Cast, Concat, Replace, Right, Upper
+from django.utils import timezone
+from PIL import Image, ImageDraw
+
+from core.fonts import get_font
+from .compliance import financial_year_bounds
+from .identity import phone_key
+from .models import PAYMENT_METHOD_CHOICES, Donation, TaxStatement
+from .receipts import BLACK, BLUE, DPI, GREY, MARGIN, PAGE_SIZE
+
+logger = logging.getLogger(__name__)
+
+ROWS_PER_PAGE = 30
+PAYMENT_METHODS = dict(PAYMENT_METHOD_CHOICES)
+
+FIELDS = [
+    'statement_owner', 'statement_pan', 'receipt_number', 'created_at', 'amount', 'payment_method',
+    'purpose', 'donor_name', 'donor_address',
+]
+
+
+def _phone_digits(field):
+    """Last 10 digits of a typed phone number, in SQL (separators stripped like identity.phone_key)"""
+    digits = F(field)
+    for separator in ' -+().':
+        digits = Replace(digits, Value(separator), Value(''))
+    return Right(digits, 10)
+
+
+def owner_keys(user):
+    """Statement owners a member may download: the account and its verified phone number"""
+    keys = [f'U{user.pk}']
+    if user.is_phone_verified and phone_key(user.phone_number):
+        keys.append(f'P{phone_key(user.phone_number)}')
+    return keys
+
+
+def year_donations(year):
+    """The year's successful donations that have an owner, one statement after another"""
+    start, end = financial_year_bounds(year)
+    return Donation.objects.filter(
+        status='SUCCESS', created_at__gte=start, created_at__lt=end
+    ).filter(Q(donor__isnull=False) | ~Q(donor_phone='')).annotate(
+        statement_owner=Case(
+            When(donor__is_phone_verified=True, then=Concat(Value('P'), Right('donor__phone_digits', 10))),
+            When(donor__isnull=False, then=Concat(Value('U'), Cast('donor_id', CharField()))),
+            default=Concat(Value('P'), _phone_digits('donor_phone')),
+            output_field=CharField(),
+        ),
+        statement_pan=Upper('donor_pan'),
+    ).order_by('statement_owner', 'statement_pan', 'created_at', 'pk')
+
+
+def deductible(method, amount):
+    return 0 if method == 'CASH' else amount
+
+
+def _statement_pages(year, donor, rows):
+    """Yield one PIL page per ROWS_PER_PAGE donations"""
+    width = PAGE_SIZE[0]
+    total = sum(row[2] for row in rows)
+    eligible = sum(deductible(row[3], row[2]) for row in rows)
+    label = f"{year}-{(year + 1) % 100:02d}"
+    pages = [rows[i:i + ROWS_PER_PAGE] for i in range(0, len(rows), ROWS_PER_PAGE)] or [[]]
+
+    for number, page_rows in enumerate(pages, start=1):
+        page = Image.new('RGB', PAGE_SIZE, 'white')
+        draw = ImageDraw.Draw(page)
+        y = MARGIN
+        draw.text((width / 2, y), 'NISHAD PARTY', font=get_font(56, bold=True), fill=BLUE, anchor='mt')
+        y += 80
+        draw.text((width / 2, y), f'Statement of Donations - FY {label}', font=get_font(32), fill=BLACK, anchor='mt')
+        y += 60
+        draw.line((MARGIN, y, width - MARGIN, y), fill=BLUE, width=4)
+        y += 30
+
+        if number == 1:
+            for caption, value in (('Donor', donor['name']), ('PAN', donor['pan']), ('Address', donor['address'])):
+                if value:
+                    draw.text((MARGIN, y), f'{caption}:', font=get_font(26, bold=True), fill=GREY)
+                    draw.text((MARGIN + 180, y), str(value)[:70], font=get_font(26), fill=BLACK)
+                    y += 42
+            y += 20
+
+        columns = [MARGIN, MARGIN + 300, MARGIN + 500, MARGIN + 760]
+        for x, heading in zip(columns, ('Receipt No.', 'Date', 'Mode', 'Amount (Rs.)')):
+            draw.text((x, y), heading, font=get_font(24, bold=True), fill=BLACK)
+        y += 40
+        for receipt_number, created_at, amount, method, purpose in page_rows:
+            values = (receipt_number, timezone.localtime(created_at).strftime('%d-%m-%Y'),
+                      PAYMENT_METHODS.get(method, method), f'{amount:,.2f}')
+            for x, value in zip(columns, values):
+                draw.text((x, y), value, font=get_font(22), fill=BLACK)
+            y += 36
+
+        if number == len(pages):
+            y += 20
+            draw.line((MARGIN, y, width - MARGIN, y), fill=GREY, width=2)
+            y += 20
+            draw.text((MARGIN, y), f'Total donated: Rs. {total:,.2f} ({len(rows)} donations)',
+                      font=get_font(28, bold=True), fill=BLACK)
+            y += 45
+            draw.text((MARGIN, y), f'Eligible for deduction under Section 80GGC: Rs. {eligible:,.2f}',
+                      font=get_font(26), fill=BLACK)
+            y += 40
+            draw.text((MARGIN, y), 'Cash donations are not deductible under Section 80GGC.', font=get_font(22), fill=GREY)
+
+        bottom = PAGE_SIZE[1] - MARGIN
+        draw.text((MARGIN, bottom - 40), 'This is a computer generated statement and does not require signature.',
+                  font=get_font(20), fill=GREY)
+        draw.text((width - MARGIN, bottom - 40), f'Page {number} of {len(pages)}', font=get_font(20), fill=GREY, anchor='ra')
+        yield page
+
+
+def render_statement_pdf(year, donor, rows):
+    """
+    PDF bytes for a donor's statement. `rows` are (receipt_number,
+    created_at, amount, payment_method, purpose) tuples.
+    """
+    first, *rest = _statement_pages(year, donor, rows)
+    buffer = BytesIO()
+    first.save(buffer, format='PDF', resolution=DPI, save_all=True, append_images=rest)
+    return buffer.getvalue()
+
+
+def save_statement(year, owner, donor, rows):
+    pdf = render_statement_pdf(year, donor, rows)
+    statement = TaxStatement.objects.filter(owner=owner, pan=donor['pan'], financial_year=year).first()
+    if statement is None:
+        statement = TaxStatement(owner=owner, pan=donor['pan'], financial_year=year)
+    elif statement.file:
+        statement.file.storage.delete(statement.file.name)
+    statement.donation_count = len(rows)
+    statement.amount = sum(row[2] for row in rows)
+    statement.deductible_amount = sum(deductible(row[3], row[2]) for row in rows)
+    # Random name: statement URLs are served straight from MEDIA_ROOT
+    statement.file.save(f'FY{year}-{uuid.uuid4().hex}.pdf', ContentFile(pdf), save=False)
+    statement.save()
+    return statement
+
+
+def render_batch(year, donors):
+    """
+    Process-pool entry point for generate_tax_statements. `donors` is a list
+    of (owner, donor, rows). Returns (rendered, failed).
+    """
+    rendered = failed = 0
+    for owner, donor, rows in donors:
+        try:
+            save_statement(year, owner, donor, rows)
+            rendered += 1
+        except Exception:
+            logger.exception("Rendering FY%s statement for %s %s failed", year, owner, donor['pan'])
+            failed += 1
+    close_old_connections()
+    return rendered, failed
+
+
+def _has_owner(owner):
+    # An anonymous donation whose typed phone has no 10 digits could never be downloaded
+    return owner.startswith('U') or (len(owner) == 11 and owner[1:].isdigit())
+
+
+def iter_donor_groups(year, chunk_size=2000):
+    """Yield (owner, donor, rows) per statement (owner and PAN) from one streaming pass"""
+    current, donor, rows = None, None, []
+    for owner, pan, receipt_number, created_at, amount, method, purpose, name, address in (
+        year_donations(year).values_list(*FIELDS).iterator(chunk_size=chunk_size)
+    ):
+        if not _has_owner(owner):
+            continue
+        if (owner, pan) != current:
+            if rows:
+                yield current[0], donor, rows
+            current, donor, rows = (owner, pan), {'name': '', 'pan': pan, 'address': ''}, []
+        # Within one owner and PAN, the latest name and address given win
+        donor['name'] = name or donor['name']
+        donor['address'] = address or donor['address']
+        rows.append((receipt_number, created_at, amount, method, purpose))
+    if rows:
+        yield current[0], donor, rows
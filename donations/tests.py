@@ -1,3 +1,285 @@
-from django.test import TestCase
+import hashlib
+import hmac
+import json
+from datetime import timedelta
+from decimal import Decimal
+from itertools import count
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import User
+from .compliance import financial_year_bounds, iter_report_rows
+from .counters import campaign_total
+from .models import Donation, DonationCampaign, DonationRollup, RazorpayWebhookEvent, RecurringDonation
+from .payments import process_pending_events
+from .recurring import next_due_date, process_due
+from .rollups import total_raised
+
+WEBHOOK_SECRET = 'whsec_test'
+
+
+class FakeRazorpay:
+    """
+    Stands in for Razorpay's side of the webhook: builds event payloads the
+    way Razorpay does, signs them with the webhook secret and delivers them
+    (or redelivers them, as Razorpay does after a timeout) to our endpoint.
+    """
+
+    def __init__(self, client, secret=WEBHOOK_SECRET):
+        self.client = client
+        self.secret = secret
+        self.event_ids = count(1)
+
+    def sign(self, body):
+        return hmac.new(self.secret.encode(), body, hashlib.sha256).hexdigest()
+
+    def event(self, name, donation, paise=None, refund=False):
+        payment = {
+            'id': f'pay_{donation.razorpay_order_id}',
+            'order_id': donation.razorpay_order_id,
+            'amount': int(donation.amount * 100) if paise is None else paise,
+            'notes': {'donation_id': str(donation.pk)},
+        }
+        payload = {'payment': {'entity': payment}}
+        if refund:
+            payload['refund'] = {'entity': {'id': f'rfnd_{donation.razorpay_order_id}', 'amount': payment['amount']}}
+        return {'event': name, 'payload': payload}
+
+    def deliver(self, payload, event_id=None, signature=None):
+        body = json.dumps(payload).encode()
+        return self.client.post(
+            reverse('donations:razorpay_webhook'), body, content_type='application/json',
+            HTTP_X_RAZORPAY_SIGNATURE=signature if signature is not None else self.sign(body),
+            HTTP_X_RAZORPAY_EVENT_ID=event_id or f'evt_{next(self.event_ids)}',
+        )
+
+    def captured(self, donation, **kwargs):
+        return self.deliver(self.event('payment.captured', donation), **kwargs)
+
+    def refunded(self, donation, **kwargs):
+        return self.deliver(self.event('refund.processed', donation, refund=True), **kwargs)
+
+
+@override_settings(RAZORPAY_WEBHOOK_SECRET=WEBHOOK_SECRET)
+class RazorpayWebhookTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.razorpay = FakeRazorpay(self.client)
+        organiser = User.objects.create(username='organiser', phone_number='+919800000000')
+        self.campaign = DonationCampaign.objects.create(
+            title='Flood relief', description='', target_amount=100000,
+            start_date='2026-01-01', end_date='2026-12-31', created_by=organiser,
+        )
+
+    def donation(self, number, amount=500, campaign=None):
+        return Donation.objects.create(
+            donor_name=f'Donor {number}', donor_phone=f'98{number:08d}', amount=amount,
+            payment_method='ONLINE', status='PENDING', constituency='Gorakhpur', purpose='General',
+            campaign=campaign, razorpay_order_id=f'order_{number}',
+        )
+
+    def test_rejects_bad_signature(self):
+        donation = self.donation(1)
+        payload = self.razorpay.event('payment.captured', donation)
+        self.assertEqual(self.razorpay.deliver(payload, signature='0' * 64).status_code, 400)
+        self.assertEqual(self.razorpay.deliver(payload, signature='').status_code, 400)
+        self.assertFalse(RazorpayWebhookEvent.objects.exists())
+
+    def test_rejects_payload_signed_with_another_secret(self):
+        donation = self.donation(1)
+        other = FakeRazorpay(self.client, secret='whsec_other')
+        self.assertEqual(other.captured(donation).status_code, 400)
+        self.assertFalse(RazorpayWebhookEvent.objects.exists())
+
+    def test_applies_a_batch(self):
+        donations = [self.donation(number, campaign=self.campaign) for number in range(5)]
+        for donation in donations:
+            self.assertEqual(self.razorpay.captured(donation).status_code, 200)
+        failed = self.donation(9)
+        self.razorpay.deliver(self.razorpay.event('payment.failed', failed))
+
+        self.assertEqual(process_pending_events(), 6)
+        self.assertEqual(process_pending_events(), 0)
+
+        self.assertEqual(set(Donation.objects.filter(campaign=self.campaign).values_list('status', flat=True)), {'SUCCESS'})
+        failed.refresh_from_db()
+        self.assertEqual(failed.status, 'FAILED')
+        self.assertEqual(Donation.objects.get(pk=donations[0].pk).razorpay_payment_id, 'pay_order_0')
+        self.assertEqual(total_raised(), Decimal('2500'))
+        self.assertEqual(campaign_total(self.campaign.pk), Decimal('2500'))
+        self.assertEqual(set(RazorpayWebhookEvent.objects.values_list('status', flat=True)), {'APPLIED'})
+
+    def test_redelivered_event_is_applied_once(self):
+        donation = self.donation(1, campaign=self.campaign)
+        for _ in range(3):
+            self.assertEqual(self.razorpay.captured(donation, event_id='evt_same').status_code, 200)
+        self.assertEqual(RazorpayWebhookEvent.objects.count(), 1)
+
+        process_pending_events()
+        # A redelivery after processing is dropped as well
+        self.razorpay.captured(donation, event_id='evt_same')
+        self.assertEqual(process_pending_events(), 0)
+
+        self.assertEqual(total_raised(), Decimal('500'))
+        self.assertEqual(campaign_total(self.campaign.pk), Decimal('500'))
+
+    def test_duplicate_capture_under_new_event_id_is_harmless(self):
+        donation = self.donation(1)
+        self.razorpay.captured(donation)
+        self.razorpay.deliver(self.razorpay.event('order.paid', donation))
+        process_pending_events()
+
+        self.assertEqual(total_raised(), Decimal('500'))
+        self.assertEqual(DonationRollup.objects.get().success_count, 1)
+
+    def test_captured_then_refunded_in_one_batch(self):
+        donation = self.donation(1, campaign=self.campaign)
+        kept = self.donation(2, campaign=self.campaign)
+        self.razorpay.captured(donation)
+        self.razorpay.captured(kept)
+        self.razorpay.refunded(donation)
+        process_pending_events()
+
+        donation.refresh_from_db()
+        self.assertEqual(donation.status, 'REFUNDED')
+        rollup = DonationRollup.objects.get()
+        self.assertEqual((rollup.success_count, rollup.success_amount), (1, Decimal('500')))
+        self.assertEqual((rollup.refund_count, rollup.refund_amount), (1, Decimal('500')))
+        self.assertEqual(campaign_total(self.campaign.pk), Decimal('500'))
+
+    def test_refund_in_a_later_batch(self):
+        donation = self.donation(1)
+        self.razorpay.captured(donation)
+        process_pending_events()
+        self.razorpay.refunded(donation)
+        process_pending_events()
+
+        rollup = DonationRollup.objects.get()
+        self.assertEqual((rollup.success_count, rollup.refund_count), (0, 1))
+        self.assertEqual(total_raised(), Decimal('0'))
+
+    def test_amount_mismatch_is_not_applied(self):
+        donation = self.donation(1)
+        self.razorpay.deliver(self.razorpay.event('payment.captured', donation, paise=100))
+        process_pending_events()
+
+        donation.refresh_from_db()
+        self.assertEqual(donation.status, 'PENDING')
+        event = RazorpayWebhookEvent.objects.get()
+        self.assertEqual(event.status, 'FAILED')
+        self.assertIn('does not match', event.error)
+
+
+@override_settings(EC_CONTRIBUTION_THRESHOLD=20000)
+class ECReportTests(TestCase):
+    def donation(self, amount, pan=''):
+        return Donation.objects.create(
+            donor_name='Ramesh Kumar', donor_phone='9876543210', donor_pan=pan, amount=amount,
+            payment_method='UPI', status='SUCCESS', constituency='Gorakhpur', purpose='General',
+        )
+
+    def report(self):
+        stats = {}
+        start, end = financial_year_bounds(timezone.localdate().year - (timezone.localdate().month < 4))
+        rows = list(iter_report_rows(start, end, stats=stats))
+        return rows, stats
+
+    def test_donor_giving_with_and_without_pan_is_one_contributor(self):
+        first = self.donation(12000)
+        second = self.donation(12000, pan='abcde1234f')
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.donor_identity_id, second.donor_identity_id)
+
+        rows, stats = self.report()
+        self.assertEqual((stats['donors'], stats['contributions']), (1, 2))
+        self.assertEqual({row[-1] for row in rows}, {Decimal('24000')})
+
+    def test_donors_below_threshold_are_left_out(self):
+        self.donation(12000)
+        self.donation(8000, pan='ABCDE1234F')
+        rows, stats = self.report()
+        self.assertEqual((rows, stats['donors']), ([], 0))
+
+
+@override_settings(RAZORPAY_WEBHOOK_SECRET=WEBHOOK_SECRET, RECURRING_RETRY_DAYS=[1, 3, 7])
+class RecurringRetryTests(TestCase):
+    def setUp(self):
+        self.razorpay = FakeRazorpay(self.client)
+        self.today = timezone.localdate()
+        donor = User.objects.create(username='donor', phone_number='+919800000001')
+        self.subscription = RecurringDonation.objects.create(
+            donor=donor, amount=500, frequency='MONTHLY', start_date=self.today,
+            next_payment_date=self.today, constituency='Gorakhpur', purpose='General',
+        )
+        self.cycle = next_due_date(self.subscription, self.today)
+
+    def run_scheduler(self, days=0):
+        for _ in process_due(self.today + timedelta(days=days)):
+            pass
+        self.subscription.refresh_from_db()
+        return self.subscription
+
+    def settle(self, event):
+        charge = self.subscription.last_charge
+        # The checkout creates a Razorpay order for each charge
+        charge.razorpay_order_id = f'order_{charge.pk.hex}'
+        charge.save(update_fields=['razorpay_order_id'])
+        self.razorpay.deliver(self.razorpay.event(event, charge))
+        process_pending_events()
+        self.subscription.refresh_from_db()
+        return self.subscription
+
+    def charges(self):
+        return Donation.objects.filter(is_recurring=True).count()
+
+    def test_failed_charge_is_retried_after_the_retry_delay(self):
+        self.run_scheduler()
+        self.assertEqual(self.subscription.next_payment_date, self.cycle)
+
+        subscription = self.settle('payment.failed')
+        self.assertEqual(subscription.next_payment_date, self.today + timedelta(days=1))
+        self.run_scheduler()
+        self.assertEqual(self.charges(), 1)
+
+        subscription = self.run_scheduler(days=1)
+        self.assertEqual(self.charges(), 2)
+        self.assertEqual(subscription.failed_attempts, 1)
+        # The retry keeps the subscription on its cycle
+        self.assertEqual(subscription.next_payment_date, self.cycle)
+
+    def test_successful_retry_is_not_charged_again_before_the_cycle(self):
+        self.run_scheduler()
+        self.settle('payment.failed')
+        self.run_scheduler(days=1)
+        subscription = self.settle('payment.captured')
+        self.assertEqual(subscription.next_payment_date, self.cycle)
+
+        self.run_scheduler(days=2)
+        self.assertEqual(self.charges(), 2)
+        subscription = self.run_scheduler(days=(self.cycle - self.today).days)
+        self.assertEqual(self.charges(), 3)
+        self.assertEqual(subscription.failed_attempts, 0)
+
+    def test_deactivated_after_max_failures(self):
+        self.run_scheduler()
+        for days, attempts in [(1, 1), (3, 2)]:
+            subscription = self.settle('payment.failed')
+            self.assertEqual(subscription.next_payment_date, self.today + timedelta(days=days))
+            subscription = self.run_scheduler(days=days)
+            self.assertEqual(subscription.failed_attempts, attempts)
+
+        subscription = self.settle('payment.failed')
+        self.assertEqual(subscription.next_payment_date, self.today + timedelta(days=7))
+        subscription = self.run_scheduler(days=7)
+        self.assertFalse(subscription.is_active)
+        self.assertEqual(subscription.failed_attempts, 3)
+        self.assertEqual(self.charges(), 3)
+
+    def test_pending_charge_is_not_charged_again(self):
+        self.run_scheduler()
+        self.run_scheduler(days=(self.cycle - self.today).days)
+        self.assertEqual(self.charges(), 1)
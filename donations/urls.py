@@ -8,7 +8,11 @@ urlpatterns = [
     path('donate/', views.donate_form, name='donate'),
     path('donate/<int:campaign_id>/', views.donate_form, name='donate_campaign'),
     path('receipt/<uuid:donation_id>/', views.donation_receipt, name='receipt'),
+    path('receipt/<uuid:donation_id>/pdf/', views.download_receipt, name='receipt_pdf'),
     path('instructions/<uuid:donation_id>/', views.payment_instructions, name='payment_instructions'),
     path('my-donations/', views.my_donations, name='my_donations'),
+    path('tax-statements/<int:statement_id>/', views.download_tax_statement, name='tax_statement'),
     path('dashboard-content/', views.dashboard_donations_content, name='dashboard_content'),
+    path('export/', views.export_donations, name='export'),
+    path('razorpay/webhook/', views.razorpay_webhook, name='razorpay_webhook'),
 ]
\ No newline at end of file
@@ -3,17 +3,33 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import JsonResponse, HttpResponse
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 from django.utils.translation import gettext as _
-from django.db import models
+from django.conf import settings
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 from decimal import Decimal
+import hashlib
 import json
 
-from .models import Donation, DonationCampaign, RecurringDonation
+from .models import Donation, DonationCampaign, RecurringDonation, TaxStatement
+from .counters import attach_totals
+from .identity import donor_summary
+from .statements import owner_keys
+from .payments import record_event, verify_webhook_signature
+from .receipts import generate_receipt
+from . import leaderboards, rollups
 from accounts.models import User
+from accounts.decorators import admin_or_feature_required
+from core.exports import export_response, export_rows
+from core.pagination import paginate_by_cursor
+from core.ratelimit import ratelimit
 
 def donation_home(request):
     """Display donation campaigns and options"""
-    active_campaigns = DonationCampaign.objects.filter(is_active=True, end_date__gte=timezone.now().date())
+    active_campaigns = attach_totals(
+        DonationCampaign.objects.filter(is_active=True, end_date__gte=timezone.now().date())
+    )
     
     # Check if user is admin to determine what donations to show
     if request.user.is_authenticated and request.user.user_type == 'ADMINISTRATOR':
@@ -21,20 +37,14 @@ def donation_home(request):
         recent_donations = Donation.objects.filter(
             status='SUCCESS'
         ).select_related('donor').order_by('-created_at')[:10]
-        total_raised = Donation.objects.filter(status='SUCCESS').aggregate(
-            total=models.Sum('amount')
-        )['total'] or Decimal('0.00')
+        total_raised = rollups.total_raised()
         is_admin_view = True
     elif request.user.is_authenticated:
         # Regular users can only see their own donations (including anonymous ones)
         recent_donations = Donation.objects.filter(
             donor=request.user
         ).select_related('donor').order_by('-created_at')[:5]
-        total_raised = Donation.objects.filter(
-            donor=request.user
-        ).aggregate(
-            total=models.Sum('amount')
-        )['total'] or Decimal('0.00')
+        _, total_raised = rollups.donor_totals(request.user)
         is_admin_view = False
     else:
         # Non-authenticated users see no donations data
@@ -47,9 +57,16 @@ def donation_home(request):
         'recent_donations': recent_donations,
         'total_raised': total_raised,
         'is_admin_view': is_admin_view,
+        'constituency_leaderboard': leaderboards.top(leaderboards.CONSTITUENCIES, 10),
+        'top_donors': leaderboards.top(leaderboards.DONORS, 10),
     }
     return render(request, 'donations/home.html', context)
 
+def donor_phone_key(request):
+    """Rate-limit key for anonymous donations"""
+    return ''.join(filter(str.isdigit, request.POST.get('donor_phone', ''))) or None
+
+@ratelimit('10/h', key=('user', donor_phone_key), scope='donate')
 def donate_form(request, campaign_id=None):
     """Display donation form"""
     campaign = None
@@ -78,6 +95,14 @@ def donate_form(request, campaign_id=None):
             messages.error(request, _('PAN card number is required for donations of ₹2000 or more'))
             return render(request, 'donations/donate.html', {'campaign': campaign})
         
+        # ...including when this donation takes the donor's total to ₹2000
+        if not donor_pan:
+            donor = request.user if request.user.is_authenticated else None
+            donated = donor_summary(donor, phone=donor_phone, email=donor_email)[1]
+            if donated + amount >= 2000:
+                messages.error(request, _('PAN card number is required once your donations total ₹2000 or more'))
+                return render(request, 'donations/donate.html', {'campaign': campaign})
+        
         # Create donation record
         donation = Donation.objects.create(
             donor=request.user if request.user.is_authenticated else None,
@@ -89,20 +114,17 @@ def donate_form(request, campaign_id=None):
             amount=amount,
             payment_method=payment_method,
             purpose=purpose or (campaign.title if campaign else ''),
+            campaign=campaign,
             anonymous=anonymous,
             constituency=request.POST.get('constituency', '')
         )
         
         if payment_method == 'ONLINE':
             # For now, mark as success (in real implementation, integrate with payment gateway)
+            # Saving the SUCCESS transition also updates the campaign total and rollups
             donation.status = 'SUCCESS'
             donation.save()
             
-            # Update campaign amount if applicable
-            if campaign:
-                campaign.raised_amount += amount
-                campaign.save()
-            
             messages.success(request, _('Donation received successfully. Thank you!'))
             return redirect('donations:receipt', donation_id=donation.id)
         else:
@@ -111,6 +133,7 @@ def donate_form(request, campaign_id=None):
     
     context = {
         'campaign': campaign,
+        'top_donors': leaderboards.top(leaderboards.campaign_donors(campaign.pk), 5) if campaign else [],
     }
     return render(request, 'donations/donate.html', context)
 
@@ -123,6 +146,27 @@ def donation_receipt(request, donation_id):
     }
     return render(request, 'donations/receipt.html', context)
 
+def download_receipt(request, donation_id):
+    """Send the PDF receipt, rendering it first if the background job has not yet"""
+    donation = get_object_or_404(Donation, id=donation_id, status='SUCCESS')
+    
+    if not (donation.receipt_generated and donation.receipt_file):
+        generate_receipt(donation)
+    
+    # The file itself is served from MEDIA_ROOT by the web server
+    return redirect(donation.receipt_file.url)
+
+def user_tax_statements(user):
+    # Only statements of the account itself and its verified phone number, never a wider donor identity
+    return TaxStatement.objects.filter(owner__in=owner_keys(user))
+
+@login_required
+def download_tax_statement(request, statement_id):
+    """Send one of the user's yearly tax statements"""
+    statement = get_object_or_404(user_tax_statements(request.user), pk=statement_id)
+    # The file itself is served from MEDIA_ROOT by the web server
+    return redirect(statement.file.url)
+
 def payment_instructions(request, donation_id):
     """Display payment instructions for offline payments"""
     donation = get_object_or_404(Donation, id=donation_id)
@@ -135,17 +179,16 @@ def payment_instructions(request, donation_id):
 @login_required
 def my_donations(request):
     """Display user's donation history"""
-    donations = Donation.objects.filter(
-        donor=request.user
-    ).order_by('-created_at')
+    donations = Donation.objects.filter(donor=request.user).order_by('-created_at')
+    page = paginate_by_cursor(request, donations, per_page=20)
 
-    total_donated = donations.filter(status='SUCCESS').aggregate(
-        total=models.Sum('amount')
-    )['total'] or Decimal('0.00')
+    donation_count, total_donated = rollups.donor_totals(request.user)
 
     context = {
-        'donations': donations,
+        'donations': page,
         'total_donated': total_donated,
+        'donation_count': donation_count,
+        'tax_statements': user_tax_statements(request.user),
     }
     return render(request, 'donations/my_donations.html', context)
 
@@ -158,21 +201,13 @@ def dashboard_donations_content(request):
     ).order_by('-created_at')[:5]
 
     # Calculate statistics
-    total_donated = Donation.objects.filter(
-        donor=request.user,
-        status='SUCCESS'
-    ).aggregate(total=models.Sum('amount'))['total'] or Decimal('0.00')
-
-    donation_count = Donation.objects.filter(
-        donor=request.user,
-        status='SUCCESS'
-    ).count()
+    donation_count, total_donated = rollups.donor_totals(request.user)
 
     # Get active campaigns
-    active_campaigns = DonationCampaign.objects.filter(
+    active_campaigns = attach_totals(DonationCampaign.objects.filter(
         is_active=True,
         end_date__gte=timezone.now().date()
-    )[:3]
+    )[:3])
 
     context = {
         'user_donations': user_donations,
@@ -181,3 +216,58 @@ def dashboard_donations_content(request):
         'active_campaigns': active_campaigns,
     }
     return render(request, 'donations/dashboard_content.html', context)
+
+def filter_donations(request):
+    """Donations matching the export filters (status, purpose, constituency, payment method, date range)"""
+    donations = Donation.objects.order_by('-created_at')
+
+    for param in ('status', 'payment_method', 'constituency', 'purpose'):
+        value = request.GET.get(param)
+        if value:
+            donations = donations.filter(**{param: value})
+
+    date_from = parse_date(request.GET.get('from', '') or '')
+    date_to = parse_date(request.GET.get('to', '') or '')
+    if date_from:
+        donations = donations.filter(created_at__date__gte=date_from)
+    if date_to:
+        donations = donations.filter(created_at__date__lte=date_to)
+    return donations
+
+@login_required
+@admin_or_feature_required('DONATION_MANAGEMENT')
+def export_donations(request):
+    """Stream the filtered donations as CSV"""
+    fields = [
+        ('receipt_number', 'Receipt Number'), ('created_at', 'Date'), ('donor_name', 'Donor Name'),
+        ('donor_phone', 'Phone'), ('donor_email', 'Email'), ('donor_pan', 'PAN'),
+        ('donor_address', 'Address'), ('amount', 'Amount'), ('payment_method', 'Payment Method'),
+        ('status', 'Status'), ('constituency', 'Constituency'), ('purpose', 'Purpose'),
+        ('is_recurring', 'Recurring'), ('anonymous', 'Anonymous'),
+        ('tax_exemption_claimed', 'Tax Exemption Claimed'), ('razorpay_payment_id', 'Razorpay Payment ID'),
+    ]
+    rows = export_rows(filter_donations(request), [field for field, _ in fields])
+    return export_response(request, 'donations', [label for _, label in fields], rows)
+
+@csrf_exempt
+@require_POST
+def razorpay_webhook(request):
+    """
+    Receive a Razorpay webhook. The event is only verified and stored here;
+    process_razorpay_events applies it, so Razorpay gets its 200 straight away.
+    """
+    secret = settings.RAZORPAY_WEBHOOK_SECRET
+    signature = request.headers.get('X-Razorpay-Signature', '')
+    if not secret or not verify_webhook_signature(request.body, signature, secret):
+        return JsonResponse({'error': 'Invalid signature'}, status=400)
+
+    try:
+        payload = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid payload'}, status=400)
+    if not isinstance(payload, dict):
+        return JsonResponse({'error': 'Invalid payload'}, status=400)
+
+    event_id = request.headers.get('X-Razorpay-Event-Id') or hashlib.sha256(request.body).hexdigest()
+    record_event(event_id[:100], payload)
+    return JsonResponse({'status': 'ok'})
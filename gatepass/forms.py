@@ -1,5 +1,6 @@
 from django import forms
 from django.contrib.auth import get_user_model
+from accounts.widgets import UserAutocompleteWidget
 from .models import GatePass, GatePassPermission, GATE_PASS_TYPE_CHOICES, GATE_PASS_STATUS_CHOICES
 
 User = get_user_model()
@@ -52,7 +53,7 @@ class GatePassPermissionForm(forms.ModelForm):
         model = GatePassPermission
         fields = ['user', 'can_create_gatepass']
         widgets = {
-            'user': forms.Select(attrs={'class': 'form-control'}),
+            'user': UserAutocompleteWidget('GATE_PASS', user_types=['MEMBER', 'VOLUNTEER', 'COORDINATOR']),
             'can_create_gatepass': forms.CheckboxInput(attrs={'class': 'form-check-input'}),
         }
 
@@ -63,7 +64,6 @@ class GatePassPermissionForm(forms.ModelForm):
         ).exclude(
             user_type='ADMINISTRATOR'
         )
-        self.fields['user'].empty_label = "Select User"
 
 class GatePassSearchForm(forms.Form):
     search = forms.CharField(
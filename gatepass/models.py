@@ -3,6 +3,7 @@ from django.contrib.auth import get_user_model
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
+from core.sequences import next_value, last_number
 
 User = get_user_model()
 
@@ -70,10 +71,11 @@ class GatePass(models.Model):
         super().save(*args, **kwargs)
     
     def generate_pass_number(self):
-        from datetime import datetime
-        prefix = "GP"
-        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-        return f"{prefix}{timestamp}"
+        today = timezone.localdate().strftime("%Y%m%d")
+        prefix = f"GP{today}"
+        count = next_value('gatepass_number', today,
+                           initial=lambda: last_number(GatePass.objects, 'pass_number', prefix))
+        return f"{prefix}{count:05d}"
     
     def clean(self):
         if self.valid_from and self.valid_until:
@@ -100,6 +102,10 @@ class GatePass(models.Model):
         verbose_name = _("Gate Pass")
         verbose_name_plural = _("Gate Passes")
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination of the gate pass list (core.pagination)
+            models.Index(fields=['created_at', 'id'], name='gatepass_created_at'),
+        ]
 
 class GatePassLog(models.Model):
     gatepass = models.ForeignKey(GatePass, on_delete=models.CASCADE, related_name='logs')
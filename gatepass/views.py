@@ -2,7 +2,6 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import JsonResponse, HttpResponse
-from django.core.paginator import Paginator
 from django.db.models import Q
 from django.utils import timezone
 from django.contrib.auth import get_user_model
@@ -16,6 +15,8 @@ from .permissions import (
     gatepass_manage_permissions_required, gatepass_owner_or_manager_required,
     can_create_gatepass, can_view_all_gatepasses
 )
+from core.pagination import paginate_by_cursor
+from core.ratelimit import ratelimit
 
 User = get_user_model()
 
@@ -46,6 +47,7 @@ def dashboard(request):
     }
     return render(request, 'gatepass/dashboard.html', context)
 
+@ratelimit('30/h', key='user', scope='gatepass_create')
 @gatepass_create_required
 def create_gatepass(request):
     if request.method == 'POST':
@@ -121,9 +123,7 @@ def list_gatepasses(request):
         if date_to:
             gatepasses = gatepasses.filter(created_at__date__lte=date_to)
     
-    paginator = Paginator(gatepasses.order_by('-created_at'), 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginate_by_cursor(request, gatepasses.order_by('-created_at'), per_page=10)
     
     context = {
         'form': form,
@@ -3,7 +3,8 @@ from django.utils.html import format_html
 from django.urls import reverse
 from django.utils.safestring import mark_safe
 
-from .models import MembershipTier, Membership, DocumentVerification, MembershipApplicationSteps
+from .models import MembershipTier, Membership, DocumentVerification, MembershipApplicationSteps, MembershipSweep
+from .tokens import revoke_cards
 
 @admin.register(MembershipTier)
 class MembershipTierAdmin(admin.ModelAdmin):
@@ -70,7 +71,14 @@ class MembershipAdmin(admin.ModelAdmin):
             return format_html('<span style="color: green;">Active</span>')
     is_expired_status.short_description = 'Expiry Status'
 
-    actions = ['approve_memberships', 'reject_memberships', 'mark_active', 'mark_inactive']
+    actions = ['approve_memberships', 'reject_memberships', 'mark_active', 'mark_inactive', 'reissue_cards']
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        # Cards issued while the membership was approved and active stop scanning as valid
+        if change and {'verification_status', 'is_active'} & set(form.changed_data):
+            if obj.verification_status != 'APPROVED' or not obj.is_active:
+                revoke_cards(Membership.objects.filter(pk=obj.pk))
 
     def approve_memberships(self, request, queryset):
         from django.utils import timezone
@@ -89,6 +97,7 @@ class MembershipAdmin(admin.ModelAdmin):
             verified_by=request.user,
             verified_at=timezone.now()
         )
+        revoke_cards(queryset)
         self.message_user(request, f'{updated} memberships rejected.')
     reject_memberships.short_description = "Reject selected memberships"
 
@@ -99,20 +108,26 @@ class MembershipAdmin(admin.ModelAdmin):
 
     def mark_inactive(self, request, queryset):
         updated = queryset.update(is_active=False)
+        revoke_cards(queryset)
         self.message_user(request, f'{updated} memberships marked as inactive.')
     mark_inactive.short_description = "Mark selected memberships as inactive"
 
+    def reissue_cards(self, request, queryset):
+        updated = revoke_cards(queryset)
+        self.message_user(request, f'{updated} cards revoked; members get a new card on their next download.')
+    reissue_cards.short_description = "Revoke and reissue cards (lost or stolen)"
+
 @admin.register(DocumentVerification)
 class DocumentVerificationAdmin(admin.ModelAdmin):
-    list_display = ['membership_id', 'member_name', 'document_type', 'document_number', 'verification_status', 'verified_by', 'created_at']
+    list_display = ['membership_id', 'member_name', 'document_type', 'document_number', 'verification_status', 'verified_by', 'created_at', 'preview_thumbnail']
     list_filter = ['document_type', 'verification_status', 'created_at']
     search_fields = ['membership__membership_id', 'membership__user__first_name', 'membership__user__last_name', 'document_number']
     ordering = ['-created_at']
-    readonly_fields = ['created_at', 'updated_at']
+    readonly_fields = ['created_at', 'updated_at', 'content_hash', 'preview_image']
 
     fieldsets = (
         ('Document Information', {
-            'fields': ('membership', 'document_type', 'document_file', 'document_number')
+            'fields': ('membership', 'document_type', 'document_file', 'document_number', 'preview_image', 'content_hash')
         }),
         ('Verification', {
             'fields': ('verification_status', 'verified_by', 'verified_at', 'rejection_reason', 'notes')
@@ -131,6 +146,19 @@ class DocumentVerificationAdmin(admin.ModelAdmin):
         return obj.membership.user.get_full_name() or obj.membership.user.phone_number
     member_name.short_description = 'Member Name'
 
+    def preview_thumbnail(self, obj):
+        if not obj.preview:
+            return '-'
+        return format_html('<img src="{}" style="max-height: 60px;">', obj.preview.url)
+    preview_thumbnail.short_description = 'Preview'
+
+    def preview_image(self, obj):
+        if not obj.preview:
+            return 'No preview (PDF, or still being drawn)'
+        return format_html('<a href="{}" target="_blank"><img src="{}" style="max-width: 480px;"></a>',
+                           obj.document_file.url, obj.preview.url)
+    preview_image.short_description = 'Preview'
+
     actions = ['verify_documents', 'reject_documents']
 
     def verify_documents(self, request, queryset):
@@ -167,3 +195,12 @@ class MembershipApplicationStepsAdmin(admin.ModelAdmin):
     def member_name(self, obj):
         return obj.membership.user.get_full_name() or obj.membership.user.phone_number
     member_name.short_description = 'Member Name'
+
+@admin.register(MembershipSweep)
+class MembershipSweepAdmin(admin.ModelAdmin):
+    list_display = ['run_date', 'expired', 'deactivated', 'reminders', 'reminder_days', 'started_at', 'finished_at']
+    ordering = ['-started_at']
+    readonly_fields = ['run_date', 'reminder_days', 'expired', 'deactivated', 'reminders', 'started_at', 'finished_at']
+
+    def has_add_permission(self, request):
+        return False
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class MembershipConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "membership"
+
+    def ready(self):
+        from django.db.models.signals import post_delete
+        from .models import Membership
+        from .tokens import revoke_deleted
+        post_delete.connect(revoke_deleted, sender=Membership, dispatch_uid='membership_revoke_deleted')
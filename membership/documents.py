@@ -0,0 +1,345 @@
+"""
+Verification documents: resumable uploads, content-addressed storage and
+previews.
+
+Documents are uploaded in fixed-size chunks so a dropped mobile connection
+only costs the chunk in flight:
+
+    POST membership/documents/<membership>/uploads/          start (size, filename, sha256)
+    GET  .../uploads/<upload>/                                chunks received so far
+    PUT  .../uploads/<upload>/chunks/<index>/                 raw chunk bytes
+    POST .../uploads/<upload>/complete/                       assemble and attach
+
+A membership has at most one open upload per document type: starting another
+replaces it and discards its parts, so a client cannot pile up part files.
+
+Each chunk is streamed to its own part file under DOCUMENT_UPLOAD_DIR (outside
+MEDIA_ROOT, so parts are never served), hashed as it is written and checked
+against the client's X-Chunk-SHA256 header. The part files are the upload's
+state: resuming lists the directory, and re-sending a chunk replaces it
+atomically. On completion the parts are copied into one file in fixed-size
+blocks while the whole-file SHA-256 is computed and compared with the digest
+given at the start. The file is then checked against the allowed formats by
+its leading bytes.
+
+Files are stored once under their content hash
+(membership_documents/<aa>/<sha256>.<ext>), so a document uploaded again,
+or the same scan attached to several applications, takes no extra space.
+Uploading a document type again updates the existing DocumentVerification
+row and resets it to PENDING.
+
+Verifier previews (JPEG thumbnails of image documents, also named by content
+hash) are drawn on a small thread pool after the transaction commits. A file
+that already has a preview gets it straight away.
+"""
+import hashlib
+import logging
+import os
+import shutil
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from PIL import Image, ImageOps
+
+from .models import DocumentUpload, DocumentVerification
+
+logger = logging.getLogger(__name__)
+
+BLOCK_SIZE = 64 * 1024
+DOCUMENT_DIR = 'membership_documents'
+PREVIEW_DIR = 'membership_document_previews'
+PREVIEW_SIZE = (480, 480)
+
+# Leading bytes of the accepted formats
+SIGNATURES = [
+    (b'%PDF-', '.pdf'),
+    (b'\xff\xd8\xff', '.jpg'),
+    (b'\x89PNG\r\n\x1a\n', '.png'),
+]
+
+
+class UploadError(Exception):
+    """An upload was rejected; the message is shown to the member"""
+
+
+def upload_dir():
+    return getattr(settings, 'DOCUMENT_UPLOAD_DIR', os.path.join(settings.BASE_DIR, 'upload_parts'))
+
+
+def max_size():
+    return getattr(settings, 'DOCUMENT_UPLOAD_MAX_SIZE', 20 * 1024 * 1024)
+
+
+def chunk_size():
+    return getattr(settings, 'DOCUMENT_UPLOAD_CHUNK_SIZE', 512 * 1024)
+
+
+def sniff_extension(head):
+    """File extension for the format the leading bytes belong to, None if not accepted"""
+    for signature, extension in SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return '.webp'
+    return None
+
+
+def document_name(content_hash, extension):
+    return f'{DOCUMENT_DIR}/{content_hash[:2]}/{content_hash}{extension}'
+
+
+def preview_name(content_hash):
+    return f'{PREVIEW_DIR}/{content_hash[:2]}/{content_hash}.jpg'
+
+
+# Resumable uploads
+
+def start_upload(membership, document_type, document_number, filename, size, sha256=''):
+    if document_type not in dict(DocumentVerification._meta.get_field('document_type').choices):
+        raise UploadError('Choose a document type.')
+    if not 0 < size <= max_size():
+        raise UploadError(f'Documents must be smaller than {max_size() // (1024 * 1024)} MB.')
+    sha256 = sha256.lower()
+    if sha256 and (len(sha256) != 64 or set(sha256) - set('0123456789abcdef')):
+        raise UploadError('Invalid checksum.')
+    try:
+        with transaction.atomic():
+            # Replaces the open upload of this document type, if any
+            replaced = list(DocumentUpload.objects.filter(
+                membership=membership, document_type=document_type
+            ).values_list('pk', flat=True))
+            if replaced:
+                DocumentUpload.objects.filter(pk__in=replaced).delete()
+                for upload_id in replaced:
+                    transaction.on_commit(lambda upload_id=upload_id: discard_parts(upload_id))
+            return DocumentUpload.objects.create(
+                membership=membership,
+                document_type=document_type,
+                document_number=document_number[:50],
+                filename=os.path.basename(filename)[:255],
+                size=size,
+                chunk_size=chunk_size(),
+                sha256=sha256,
+            )
+    except IntegrityError:
+        raise UploadError('This document is already being uploaded, please try again.')
+
+
+def _parts_dir(upload):
+    return os.path.join(upload_dir(), str(upload.pk))
+
+
+def _part_path(upload, index):
+    return os.path.join(_parts_dir(upload), f'{index}.part')
+
+
+def received_chunks(upload):
+    """Indexes of the chunks stored so far"""
+    try:
+        names = os.listdir(_parts_dir(upload))
+    except FileNotFoundError:
+        return []
+    return sorted(int(name[:-5]) for name in names if name.endswith('.part') and name[:-5].isdigit())
+
+
+def expected_length(upload, index):
+    if index == upload.chunks - 1:
+        return upload.size - index * upload.chunk_size
+    return upload.chunk_size
+
+
+def write_chunk(upload, index, stream, sha256=''):
+    """
+    Stream one chunk from `stream` (the request body) to its part file,
+    checking its length and, when given, its SHA-256.
+    """
+    if not 0 <= index < upload.chunks:
+        raise UploadError('Invalid chunk.')
+    length = expected_length(upload, index)
+    os.makedirs(_parts_dir(upload), exist_ok=True)
+    # Written under a unique name and renamed, so a retry never sees half a chunk
+    temporary = f'{_part_path(upload, index)}.{uuid.uuid4().hex}.tmp'
+    digest = hashlib.sha256()
+    written = 0
+    try:
+        with open(temporary, 'wb') as part:
+            while written <= length:
+                block = stream.read(min(BLOCK_SIZE, length + 1 - written))
+                if not block:
+                    break
+                digest.update(block)
+                part.write(block)
+                written += len(block)
+        if written != length:
+            raise UploadError(f'Chunk {index} should be {length} bytes, received {written}.')
+        if sha256 and digest.hexdigest() != sha256.lower():
+            raise UploadError(f'Chunk {index} was corrupted in transit, send it again.')
+        os.replace(temporary, _part_path(upload, index))
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+    return written
+
+
+def _assemble(upload):
+    """Join the parts into one file, returning (path, sha256)"""
+    missing = set(range(upload.chunks)) - set(received_chunks(upload))
+    if missing:
+        raise UploadError(f'{len(missing)} chunks are still missing.')
+    path = os.path.join(_parts_dir(upload), f'assembled.{uuid.uuid4().hex}')
+    digest = hashlib.sha256()
+    with open(path, 'wb') as assembled:
+        for index in range(upload.chunks):
+            with open(_part_path(upload, index), 'rb') as part:
+                while block := part.read(BLOCK_SIZE):
+                    digest.update(block)
+                    assembled.write(block)
+    content_hash = digest.hexdigest()
+    if upload.sha256 and content_hash != upload.sha256:
+        # Some part differs from what the member has; start over rather than keep bad parts
+        shutil.rmtree(_parts_dir(upload), ignore_errors=True)
+        raise UploadError('The uploaded file does not match its checksum, please upload it again.')
+    return path, content_hash
+
+
+def complete_upload(upload):
+    """Assemble an upload, store it and attach it to the membership. Returns the DocumentVerification."""
+    upload_id = upload.pk
+    path, content_hash = _assemble(upload)
+    try:
+        with open(path, 'rb') as assembled:
+            extension = sniff_extension(assembled.read(16))
+            if extension is None:
+                raise UploadError('Upload only PDF or image files.')
+            assembled.seek(0)
+            name = store_file(assembled, content_hash, extension)
+        with transaction.atomic():
+            document = attach_document(upload.membership, upload.document_type, upload.document_number,
+                                       name, content_hash)
+            upload.delete()
+    finally:
+        discard_parts(upload_id)
+    return document
+
+
+def discard_parts(upload_id):
+    shutil.rmtree(os.path.join(upload_dir(), str(upload_id)), ignore_errors=True)
+
+
+# Storage
+
+def store_file(fileobj, content_hash, extension):
+    """Make sure the content is in storage under its hash and return the name"""
+    name = document_name(content_hash, extension)
+    if not default_storage.exists(name):
+        saved = default_storage.save(name, File(fileobj))
+        if saved != name:
+            # Stored concurrently by another request; storage kept both
+            default_storage.delete(saved)
+    return name
+
+
+def store_uploaded_file(membership, document_type, document_number, uploaded):
+    """Attach a document sent as one multipart upload (forms without JavaScript)"""
+    if uploaded.size > max_size():
+        raise UploadError(f'Documents must be smaller than {max_size() // (1024 * 1024)} MB.')
+    digest = hashlib.sha256()
+    head = b''
+    for block in uploaded.chunks(BLOCK_SIZE):
+        if not head:
+            head = block[:16]
+        digest.update(block)
+    extension = sniff_extension(head)
+    if extension is None:
+        raise UploadError('Upload only PDF or image files.')
+    uploaded.seek(0)
+    content_hash = digest.hexdigest()
+    name = store_file(uploaded, content_hash, extension)
+    return attach_document(membership, document_type, document_number, name, content_hash)
+
+
+def attach_document(membership, document_type, document_number, name, content_hash):
+    """Point the membership's document of this type at stored content, resetting its review"""
+    preview = preview_name(content_hash)
+    has_preview = default_storage.exists(preview)
+    document, _ = DocumentVerification.objects.update_or_create(
+        membership=membership,
+        document_type=document_type,
+        defaults={
+            'document_file': name,
+            'document_number': document_number,
+            'content_hash': content_hash,
+            'preview': preview if has_preview else '',
+            'verification_status': 'PENDING',
+            'verified_at': None,
+            'verified_by': None,
+            'rejection_reason': '',
+        }
+    )
+    if not has_preview:
+        queue_preview(content_hash, name)
+    return document
+
+
+# Previews
+
+def render_preview(name):
+    """JPEG thumbnail of a stored image document, None for formats without one (PDF)"""
+    if name.endswith('.pdf'):
+        return None
+    with default_storage.open(name) as stored:
+        image = Image.open(stored)
+        image.thumbnail((PREVIEW_SIZE[0] * 2, PREVIEW_SIZE[1] * 2))  # lets JPEG decode at a reduced scale
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail(PREVIEW_SIZE)
+    buffer = BytesIO()
+    image.convert('RGB').save(buffer, format='JPEG', quality=80)
+    return buffer.getvalue()
+
+
+def make_preview(content_hash, name):
+    preview = preview_name(content_hash)
+    if not default_storage.exists(preview):
+        data = render_preview(name)
+        if data is None:
+            return
+        saved = default_storage.save(preview, ContentFile(data))
+        if saved != preview:
+            default_storage.delete(saved)
+    DocumentVerification.objects.filter(content_hash=content_hash, preview='').update(preview=preview)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    # Created lazily so every gunicorn worker gets its own pool after fork
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'DOCUMENT_PREVIEW_WORKERS', 1),
+                    thread_name_prefix='document-preview'
+                )
+    return _executor
+
+
+def _make_preview_quietly(content_hash, name):
+    try:
+        make_preview(content_hash, name)
+    except Exception:
+        logger.exception("Drawing preview of %s failed", name)
+
+
+def queue_preview(content_hash, name):
+    """Draw the document's preview in the background once the current transaction commits"""
+    transaction.on_commit(lambda: get_executor().submit(_make_preview_quietly, content_hash, name))
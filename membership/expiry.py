@@ -0,0 +1,114 @@
+"""
+Membership expiry and renewal reminders.
+
+expire_memberships runs daily. Both passes read the partial index on
+(end_date, id) over active memberships, so their cost follows the number of
+memberships due that day, not the size of the table.
+
+- Lapsed memberships (active, end_date before the run date) are switched off
+  a chunk at a time: one UPDATE moves the approved ones to EXPIRED and another
+  deactivates the rest (applications that were never approved). Each UPDATE
+  takes the rows out of the index, so the next chunk is simply the first rows
+  still left.
+- Approved memberships ending within MEMBERSHIP_RENEWAL_REMINDER_DAYS get one
+  in-app reminder per end date. Each chunk's notifications are bulk inserted,
+  and reminded_end_date is set in the same transaction. A renewal moves
+  end_date past it, so the next term gets its own reminder.
+
+Every run is recorded as a MembershipSweep row.
+"""
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.urls import reverse
+from django.utils import timezone
+
+from communications.models import Notification
+from .models import Membership, MembershipSweep
+
+
+def lapsed(today):
+    return Membership.objects.filter(is_active=True, end_date__lt=today)
+
+
+def due_for_reminder(today, days):
+    return Membership.objects.filter(
+        is_active=True,
+        verification_status='APPROVED',
+        end_date__gte=today,
+        end_date__lte=today + timedelta(days=days),
+    ).filter(Q(reminded_end_date__isnull=True) | Q(reminded_end_date__lt=F('end_date')))
+
+
+def expire_chunk(today, chunk_size=1000):
+    """Switch off one chunk of lapsed memberships. Returns stats, empty when none were left."""
+    stats = Counter()
+    with transaction.atomic():
+        pks = list(lapsed(today).order_by('end_date', 'pk').values_list('pk', flat=True)[:chunk_size])
+        if not pks:
+            return stats
+        now = timezone.now()
+        stats['expired'] = Membership.objects.filter(pk__in=pks, verification_status='APPROVED').update(
+            verification_status='EXPIRED', is_active=False, updated_at=now
+        )
+        stats['deactivated'] = Membership.objects.filter(pk__in=pks, is_active=True).update(
+            is_active=False, updated_at=now
+        )
+    return stats
+
+
+def _reminder(user_id, membership_id, end_date):
+    return Notification(
+        user_id=user_id,
+        title='Renew your membership',
+        message=f'Your membership {membership_id} expires on {end_date:%d %b %Y}. Renew it to keep your card valid.',
+        notification_type='REMINDER',
+        action_url=reverse('membership:home'),
+        action_label='Renew',
+        data={'membership_id': membership_id, 'end_date': end_date.isoformat()},
+    )
+
+
+def remind_chunk(today, days, chunk_size=1000):
+    """Queue renewal reminders for one chunk of memberships. Returns stats, empty when none were due."""
+    stats = Counter()
+    with transaction.atomic():
+        rows = list(due_for_reminder(today, days).order_by('end_date', 'pk').values_list(
+            'pk', 'user_id', 'membership_id', 'end_date'
+        )[:chunk_size])
+        if not rows:
+            return stats
+        Notification.objects.bulk_create(
+            [_reminder(user_id, membership_id, end_date) for _, user_id, membership_id, end_date in rows],
+            batch_size=500
+        )
+        Membership.objects.filter(pk__in=[row[0] for row in rows]).update(reminded_end_date=F('end_date'))
+        stats['reminders'] = len(rows)
+    return stats
+
+
+def sweep(today=None, days=None, chunk_size=1000):
+    """
+    Expire lapsed memberships, then queue renewal reminders, yielding the
+    stats of each chunk. The run's totals are saved as a MembershipSweep.
+    """
+    today = today or timezone.localdate()
+    if days is None:
+        days = getattr(settings, 'MEMBERSHIP_RENEWAL_REMINDER_DAYS', 14)
+    run = MembershipSweep.objects.create(run_date=today, reminder_days=days)
+    totals = Counter()
+    for step in (lambda: expire_chunk(today, chunk_size), lambda: remind_chunk(today, days, chunk_size)):
+        while True:
+            stats = step()
+            if not stats:
+                break
+            totals.update(stats)
+            yield stats
+    run.expired = totals['expired']
+    run.deactivated = totals['deactivated']
+    run.reminders = totals['reminders']
+    run.finished_at = timezone.now()
+    run.save()
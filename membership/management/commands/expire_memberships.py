@@ -0,0 +1,35 @@
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from membership.expiry import sweep
+
+
+class Command(BaseCommand):
+    help = 'Expire lapsed memberships and queue renewal reminders (run daily from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Treat this date (YYYY-MM-DD) as today, e.g. to catch up a missed run')
+        parser.add_argument('--days', type=int, default=None,
+                            help='Remind members this many days before expiry (default MEMBERSHIP_RENEWAL_REMINDER_DAYS)')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Memberships updated per transaction')
+
+    def handle(self, *args, **options):
+        today = None
+        if options['date']:
+            today = parse_date(options['date'])
+            if today is None:
+                raise CommandError(f'Invalid date: {options["date"]}')
+
+        started = time.monotonic()
+        totals = Counter()
+        for stats in sweep(today, options['days'], options['chunk_size']):
+            totals.update(stats)
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'{totals["expired"]} memberships expired, {totals["deactivated"]} lapsed applications deactivated, '
+            f'{totals["reminders"]} renewal reminders queued in {elapsed:.1f}s'
+        ))
@@ -0,0 +1,50 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.batches import run_in_batches
+
+from membership.cards import approved_memberships, iter_cards, render_batch
+
+
+class Command(BaseCommand):
+    help = ('Render card images for approved memberships across a pool of worker processes. '
+            'Only cards whose printed details changed are redrawn.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--constituency', action='append', default=[],
+                            help="Only members from this constituency (repeatable)")
+        parser.add_argument('--force', action='store_true', help='Redraw cards that are up to date')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 2, help='Worker processes')
+        parser.add_argument('--batch-size', type=int, default=200, help='Cards per worker task')
+
+    def handle(self, *args, **options):
+        memberships = approved_memberships()
+        if options['constituency']:
+            memberships = memberships.filter(user__constituency__in=options['constituency'])
+
+        batch_size = options['batch_size']
+        workers = options['workers']
+        self.stdout.write(f'Rendering membership cards with {workers} workers...')
+
+        started = time.monotonic()
+        self.rendered = self.failed = self.batches = 0
+        cards = iter_cards(memberships, force=options['force'], chunk_size=batch_size * 10)
+        for result in run_in_batches(cards, render_batch, batch_size, workers):
+            self.collect(result, started)
+
+        elapsed = time.monotonic() - started
+        rate = self.rendered / elapsed if elapsed else self.rendered
+        self.stdout.write(self.style.SUCCESS(
+            f'Rendered {self.rendered} cards in {elapsed:.1f}s ({rate:.0f}/s); {self.failed} failed'
+        ))
+
+    def collect(self, result, started):
+        rendered, failed = result
+        self.rendered += rendered
+        self.failed += failed
+        self.batches += 1
+        if self.batches % 25 == 0:
+            rate = self.rendered / (time.monotonic() - started)
+            self.stdout.write(f'{self.rendered + self.failed} cards done ({rate:.0f}/s)...')
@@ -0,0 +1,65 @@
+import hashlib
+import os
+import time
+import unicodedata
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from membership.cards import approved_memberships, write_print_sheet
+
+
+class Command(BaseCommand):
+    help = ('Write A4 print sheets of membership cards, ten per page, as one PDF per constituency. '
+            'Out-of-date cards are rendered first.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('output_dir', help='Directory for the <constituency>.pdf files')
+        parser.add_argument('--constituency', action='append', default=[],
+                            help='Only this constituency (repeatable; default: all)')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 2,
+                            help='Worker processes for rendering cards')
+
+    def handle(self, *args, **options):
+        call_command('generate_membership_cards', constituency=options['constituency'],
+                     workers=options['workers'], stdout=self.stdout)
+
+        memberships = approved_memberships().exclude(card_file='')
+        if options['constituency']:
+            memberships = memberships.filter(user__constituency__in=options['constituency'])
+        constituencies = (
+            memberships.order_by('user__constituency').values_list('user__constituency', flat=True).distinct()
+        )
+
+        os.makedirs(options['output_dir'], exist_ok=True)
+        started = time.monotonic()
+        taken = set()
+        for constituency in constituencies:
+            names = list(memberships.filter(user__constituency=constituency).order_by(
+                'membership_id'
+            ).values_list('card_file', flat=True))
+            path = os.path.join(options['output_dir'], sheet_name(constituency, taken))
+            if os.path.exists(path):
+                os.remove(path)  # left by an earlier run
+            pages = write_print_sheet(path, names)
+            self.stdout.write(f'{constituency or "(no constituency)"}: {len(names)} cards, {pages} pages -> {path}')
+
+        self.stdout.write(self.style.SUCCESS(f'Wrote print sheets in {time.monotonic() - started:.1f}s'))
+
+
+def sheet_name(constituency, taken):
+    """
+    File name for a constituency's sheet, unique among `taken` (which it is
+    added to). Names that slugify alike, e.g. differing only in case or
+    spacing, get a short hash of the constituency appended.
+    """
+    # Like slugify(allow_unicode=True), but keeps combining marks: Devanagari
+    # vowel signs are not \w, so slugify turns गोरखपुर into गरखपर
+    text = unicodedata.normalize('NFC', constituency).lower()
+    words = ''.join(ch if unicodedata.category(ch)[0] in 'LMN' else ' ' for ch in text).split()
+    base = '-'.join(words) or 'unassigned'
+    name = f'{base}.pdf'
+    if name in taken:
+        name = f'{base}-{hashlib.sha256(constituency.encode()).hexdigest()[:8]}.pdf'
+    taken.add(name)
+    return name
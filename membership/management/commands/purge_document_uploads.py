@@ -0,0 +1,60 @@
+import os
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from membership.documents import discard_parts, upload_dir
+from membership.models import DocumentUpload
+
+
+class Command(BaseCommand):
+    help = 'Delete chunked document uploads abandoned for DOCUMENT_UPLOAD_TTL_HOURS and their part files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Uploads deleted per statement')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        ttl = timedelta(hours=getattr(settings, 'DOCUMENT_UPLOAD_TTL_HOURS', 48))
+        cutoff = timezone.now() - ttl
+        total = 0
+
+        while True:
+            batch = list(DocumentUpload.objects.filter(
+                created_at__lt=cutoff
+            ).values_list('pk', flat=True)[:batch_size])
+            if not batch:
+                break
+            for upload_id in batch:
+                discard_parts(upload_id)
+            DocumentUpload.objects.filter(pk__in=batch).delete()
+            total += len(batch)
+            if len(batch) < batch_size:
+                break
+
+        # Part directories left behind without an upload row (e.g. a crash mid-completion)
+        orphans = 0
+        root = upload_dir()
+        if os.path.isdir(root):
+            stale = time.time() - ttl.total_seconds()
+            names = {name for name in os.listdir(root) if os.path.getmtime(os.path.join(root, name)) < stale}
+            known = {str(pk) for pk in DocumentUpload.objects.filter(
+                pk__in=[name for name in names if _is_uuid(name)]
+            ).values_list('pk', flat=True)}
+            for name in names - known:
+                discard_parts(name)
+                orphans += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Purged {total} abandoned uploads and {orphans} orphaned part directories'))
+
+
+def _is_uuid(value):
+    try:
+        uuid.UUID(value)
+    except ValueError:
+        return False
+    return True
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-17 04:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('membership', '0002_membership_address_membership_amount_paid_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='membership',
+            name='card_file',
+            field=models.FileField(blank=True, upload_to='membership_cards/'),
+        ),
+        migrations.AddField(
+            model_name='membership',
+            name='card_version',
+            field=models.CharField(blank=True, max_length=16),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 04:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('membership', '0003_membership_cards'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='membership',
+            name='status_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.7 on 2026-10-17 04:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('membership', '0005_membership_expiry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='documentverification',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='documentverification',
+            name='preview',
+            field=models.FileField(blank=True, upload_to='membership_document_previews/'),
+        ),
+        migrations.CreateModel(
+            name='DocumentUpload',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('document_type', models.CharField(choices=[('AADHAR', 'Aadhar Card'), ('VOTER_ID', 'Voter ID'), ('PAN', 'PAN Card'), ('FISHING_LICENSE', 'Fishing License'), ('BOAT_REGISTRATION', 'Boat Registration'), ('INCOME_CERTIFICATE', 'Income Certificate'), ('CASTE_CERTIFICATE', 'Caste Certificate')], max_length=30)),
+                ('document_number', models.CharField(blank=True, max_length=50)),
+                ('filename', models.CharField(blank=True, max_length=255)),
+                ('size', models.PositiveBigIntegerField()),
+                ('chunk_size', models.PositiveIntegerField()),
+                ('sha256', models.CharField(blank=True, max_length=64)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('membership', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='uploads', to='membership.membership')),
+            ],
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.7 on 2026-10-17 04:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('membership', '0006_document_uploads'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevokedCard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('membership_id', models.CharField(max_length=20, unique=True)),
+                ('end_date', models.DateField()),
+                ('revoked_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
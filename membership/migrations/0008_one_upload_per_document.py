@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-17 04:46
+
+from django.db import migrations, models
+
+
+def drop_replaced_uploads(apps, schema_editor):
+    """Keep only the newest open upload of each document; purge_document_uploads removes the orphaned parts"""
+    DocumentUpload = apps.get_model('membership', 'DocumentUpload')
+    seen = set()
+    stale = []
+    for pk, membership_id, document_type in DocumentUpload.objects.order_by(
+        'membership_id', 'document_type', '-created_at'
+    ).values_list('pk', 'membership_id', 'document_type').iterator():
+        if (membership_id, document_type) in seen:
+            stale.append(pk)
+        seen.add((membership_id, document_type))
+    DocumentUpload.objects.filter(pk__in=stale).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('membership', '0007_revoked_cards'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_replaced_uploads, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='documentupload',
+            constraint=models.UniqueConstraint(fields=('membership', 'document_type'), name='membership_document_upload'),
+        ),
+    ]
@@ -1,6 +1,8 @@
 from django.db import models
 from django.conf import settings
 from django.utils import timezone
+from core.sequences import next_value, last_number
+import math
 import uuid
 
 VERIFICATION_STATUS_CHOICES = [
@@ -63,14 +65,24 @@ class Membership(models.Model):
     occupation = models.CharField(max_length=100, blank=True)
     address = models.TextField(blank=True)
 
+    # Rendered card image and a hash of what is printed on it, see membership.cards
+    card_file = models.FileField(upload_to='membership_cards/', blank=True)
+    card_version = models.CharField(max_length=16, blank=True)
+    # Bumped to invalidate issued cards, see membership.tokens
+    status_version = models.PositiveIntegerField(default=0)
+    # end_date the last renewal reminder was sent for, see membership.expiry
+    reminded_end_date = models.DateField(null=True, blank=True)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     def save(self, *args, **kwargs):
         if not self.membership_id:
             year = timezone.now().year
-            count = Membership.objects.filter(created_at__year=year).count() + 1
-            self.membership_id = f"NISHAD{year}{count:06d}"
+            prefix = f"NISHAD{year}"
+            count = next_value('membership_id', str(year),
+                               initial=lambda: last_number(Membership.objects, 'membership_id', prefix))
+            self.membership_id = f"{prefix}{count:06d}"
         super().save(*args, **kwargs)
     
     @property
@@ -82,6 +94,11 @@ class Membership(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Active memberships by expiry: the sweeper, renewal reminders and member counts
+            models.Index(fields=['end_date', 'id'], name='membership_active_end_date',
+                         condition=models.Q(is_active=True)),
+        ]
 
 class DocumentVerification(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -94,6 +111,9 @@ class DocumentVerification(models.Model):
     verified_by = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL, related_name='verified_documents')
     rejection_reason = models.TextField(blank=True)
     notes = models.TextField(blank=True)
+    # Files are stored once per content, see membership.documents
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True)
+    preview = models.FileField(upload_to='membership_document_previews/', blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -104,6 +124,31 @@ class DocumentVerification(models.Model):
         unique_together = ['membership', 'document_type']
         ordering = ['-created_at']
 
+class DocumentUpload(models.Model):
+    """A chunked document upload in progress; the chunks are on disk, see membership.documents"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    membership = models.ForeignKey(Membership, on_delete=models.CASCADE, related_name='uploads')
+    document_type = models.CharField(max_length=30, choices=DOCUMENT_TYPE_CHOICES)
+    document_number = models.CharField(max_length=50, blank=True)
+    filename = models.CharField(max_length=255, blank=True)
+    size = models.PositiveBigIntegerField()
+    chunk_size = models.PositiveIntegerField()
+    sha256 = models.CharField(max_length=64, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    @property
+    def chunks(self):
+        return math.ceil(self.size / self.chunk_size)
+    
+    def __str__(self):
+        return f"{self.document_type} upload for {self.membership.membership_id}"
+    
+    class Meta:
+        constraints = [
+            # One open upload per document; starting another replaces it
+            models.UniqueConstraint(fields=['membership', 'document_type'], name='membership_document_upload'),
+        ]
+
 class MembershipApplicationSteps(models.Model):
     membership = models.OneToOneField(Membership, on_delete=models.CASCADE)
     personal_info_completed = models.BooleanField(default=False)
@@ -114,3 +159,28 @@ class MembershipApplicationSteps(models.Model):
     
     def __str__(self):
         return f"Application steps for {self.membership.user.full_name}"
+
+class RevokedCard(models.Model):
+    """Card of a deleted membership, kept until it expires so scans report it revoked (see membership.tokens)"""
+    membership_id = models.CharField(max_length=20, unique=True)
+    end_date = models.DateField()
+    revoked_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"Revoked card {self.membership_id} (valid until {self.end_date})"
+
+class MembershipSweep(models.Model):
+    """Statistics of one expire_memberships run"""
+    run_date = models.DateField()
+    reminder_days = models.PositiveIntegerField()
+    expired = models.PositiveIntegerField(default=0)
+    deactivated = models.PositiveIntegerField(default=0)
+    reminders = models.PositiveIntegerField(default=0)
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    def __str__(self):
+        return f"Membership sweep {self.run_date}: {self.expired} expired, {self.reminders} reminders"
+    
+    class Meta:
+        ordering = ['-started_at']
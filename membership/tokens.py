@@ -0,0 +1,141 @@
+"""
+Signed membership card tokens for scanning at events.
+
+The QR code on a card holds a short token:
+
+    NP1.<membership_id>.<end date YYYYMMDD>.<status version>.<signature>
+
+The signature is a truncated HMAC-SHA256 of the other fields keyed with
+SECRET_KEY, so a scanner can trust the membership ID and expiry without
+looking the member up. Membership.status_version is bumped whenever a card
+must stop working (rejection, deactivation, a lost card) and the card is
+redrawn with the new version, which makes the old token stale.
+
+The only state a scan needs is the revocation map, {membership_id: current
+status version} for the unexpired memberships whose version was ever bumped.
+It is small, kept in the shared cache, and each process holds a copy for
+MEMBERSHIP_REVOCATION_REFRESH seconds. A scan is therefore an HMAC and a
+dict lookup, with no database query and usually no cache round trip.
+Revocations reach every process within the refresh interval.
+
+Deleting a membership (in the admin, or with its user) leaves a RevokedCard
+row behind until the card's end date, so its last card keeps scanning as
+revoked rather than as valid.
+"""
+import time
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.signing import b64_encode
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+from .models import Membership, RevokedCard
+
+TOKEN_PREFIX = 'NP1'
+SIGNATURE_BYTES = 12
+REVOCATIONS_KEY = 'membership:revocations'
+
+VALID = 'VALID'
+INVALID = 'INVALID'
+EXPIRED = 'EXPIRED'
+REVOKED = 'REVOKED'
+
+# Version recorded for deleted memberships: every card of theirs is stale
+DELETED = float('inf')
+
+# (loaded_at, {membership_id: status_version}) for this process
+_revocations = (0.0, None)
+
+
+def _sign(value):
+    digest = salted_hmac('membership.card_token', value, algorithm='sha256').digest()
+    return b64_encode(digest[:SIGNATURE_BYTES]).decode()
+
+
+def card_token(membership_id, end_date, status_version=0):
+    value = f'{TOKEN_PREFIX}.{membership_id}.{end_date:%Y%m%d}.{status_version}'
+    return f'{value}.{_sign(value)}'
+
+
+def read_token(token):
+    """(membership_id, end_date, status_version) from a token with a valid signature, else None"""
+    value, _, signature = token.strip().rpartition('.')
+    if not constant_time_compare(signature, _sign(value)):
+        return None
+    try:
+        prefix, membership_id, end_date, status_version = value.split('.')
+        end_date = datetime.strptime(end_date, '%Y%m%d').date()
+        status_version = int(status_version)
+    except ValueError:
+        return None
+    if prefix != TOKEN_PREFIX:
+        return None
+    return membership_id, end_date, status_version
+
+
+def _load_revocations():
+    today = timezone.localdate()
+    revoked = dict(Membership.objects.filter(
+        status_version__gt=0,
+        end_date__gte=today,
+    ).values_list('membership_id', 'status_version'))
+    for membership_id in RevokedCard.objects.filter(end_date__gte=today).values_list('membership_id', flat=True):
+        revoked[membership_id] = DELETED
+    return revoked
+
+
+def revocations():
+    """The revocation map, from this process's copy while it is fresh"""
+    global _revocations
+    loaded_at, revoked = _revocations
+    now = time.monotonic()
+    if revoked is None or now - loaded_at > getattr(settings, 'MEMBERSHIP_REVOCATION_REFRESH', 30):
+        revoked = cache.get(REVOCATIONS_KEY)
+        if revoked is None:
+            revoked = _load_revocations()
+            cache.set(REVOCATIONS_KEY, revoked, getattr(settings, 'MEMBERSHIP_REVOCATION_CACHE_TIMEOUT', 3600))
+        _revocations = (now, revoked)
+    return revoked
+
+
+def check_token(token):
+    """Verify a scanned token. Returns (status, membership_id, end_date)."""
+    fields = read_token(token)
+    if fields is None:
+        return INVALID, None, None
+    membership_id, end_date, status_version = fields
+    if end_date < timezone.localdate():
+        return EXPIRED, membership_id, end_date
+    if status_version < revocations().get(membership_id, 0):
+        return REVOKED, membership_id, end_date
+    return VALID, membership_id, end_date
+
+
+def revoke_cards(memberships):
+    """
+    Invalidate the current cards of a Membership queryset. Cards drawn
+    afterwards carry the new status version and scan as valid again once the
+    membership is approved and active.
+    """
+    updated = memberships.update(status_version=F('status_version') + 1)
+    transaction.on_commit(_forget_revocations)
+    return updated
+
+
+def revoke_deleted(sender, instance, **kwargs):
+    """post_delete handler for Membership: keep the deleted membership's card revoked"""
+    if instance.membership_id and instance.end_date >= timezone.localdate():
+        RevokedCard.objects.update_or_create(
+            membership_id=instance.membership_id, defaults={'end_date': instance.end_date}
+        )
+        transaction.on_commit(_forget_revocations)
+
+
+def _forget_revocations():
+    global _revocations
+    cache.delete(REVOCATIONS_KEY)
+    _revocations = (0.0, None)
@@ -10,6 +10,16 @@ urlpatterns = [
     path('payment/<uuid:membership_id>/', views.payment_page, name='payment'),
     path('payment/complete/<uuid:membership_id>/', views.payment_complete, name='payment_complete'),
     path('status/<uuid:membership_id>/', views.application_status, name='application_status'),
+    path('documents/<uuid:membership_id>/uploads/', views.start_document_upload, name='document_upload_start'),
+    path('documents/<uuid:membership_id>/uploads/<uuid:upload_id>/', views.document_upload_status,
+         name='document_upload_status'),
+    path('documents/<uuid:membership_id>/uploads/<uuid:upload_id>/chunks/<int:index>/', views.upload_document_chunk,
+         name='document_upload_chunk'),
+    path('documents/<uuid:membership_id>/uploads/<uuid:upload_id>/complete/', views.complete_document_upload,
+         name='document_upload_complete'),
     path('card/', views.membership_card, name='card'),
+    path('card/download/', views.download_card, name='card_download'),
+    path('card/verify/', views.verify_card, name='card_verify'),
     path('dashboard-content/', views.dashboard_membership_content, name='dashboard_content'),
+    path('export/', views.export_memberships, name='export'),
 ]
\ No newline at end of file
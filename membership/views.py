@@ -1,17 +1,23 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse
+from django.http import Http404, HttpResponse, JsonResponse
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 from datetime import timedelta
 from django.utils.translation import gettext as _
-import qrcode
-import io
-import base64
+from django.views.decorators.http import require_GET, require_http_methods, require_POST
 import uuid as uuid_lib
 
-from .models import MembershipTier, Membership, DocumentVerification, MembershipApplicationSteps
+from .models import MembershipTier, Membership, DocumentVerification, MembershipApplicationSteps, DocumentUpload
+from .cards import card_pdf, ensure_card
+from .documents import (UploadError, chunk_size, complete_upload, received_chunks, start_upload,
+                        store_uploaded_file, write_chunk)
+from .tokens import VALID, check_token
 from accounts.models import User
+from accounts.decorators import admin_or_feature_required
+from core.exports import export_response, export_rows
+from core.qr import ERROR_CORRECT_L, qr_url
 
 @login_required
 def membership_home(request):
@@ -31,8 +37,7 @@ def apply_membership(request, tier_id):
     tier = get_object_or_404(MembershipTier, id=tier_id, is_active=True)
     
     # Check if user already has active membership
-    existing_membership = Membership.objects.filter(user=request.user, is_active=True).first()
-    if existing_membership and not existing_membership.is_expired:
+    if Membership.objects.filter(user=request.user, is_active=True, end_date__gte=timezone.localdate()).exists():
         messages.warning(request, _('You already have an active membership.'))
         return redirect('membership:home')
     
@@ -71,22 +76,18 @@ def application_status(request, membership_id):
         document_type = request.POST.get('document_type')
         document_number = request.POST.get('document_number', '')
         
+        if membership.verification_status != 'PENDING':
+            # Same rule as the chunked API (_pending_membership): reviewed applications keep their documents
+            messages.error(request, _('Documents can only be uploaded while the application is pending.'))
+            return redirect('membership:application_status', membership_id=membership.id)
         if 'document_file' in request.FILES and document_type:
-            # Remove existing document of same type
-            DocumentVerification.objects.filter(
-                membership=membership, 
-                document_type=document_type
-            ).delete()
-            
-            # Create new document
-            DocumentVerification.objects.create(
-                membership=membership,
-                document_type=document_type,
-                document_file=request.FILES['document_file'],
-                document_number=document_number
-            )
-            
-            messages.success(request, _('Document uploaded successfully.'))
+            # Without JavaScript the form posts the whole file; see upload_document_chunk for the chunked API
+            try:
+                store_uploaded_file(membership, document_type, document_number, request.FILES['document_file'])
+            except UploadError as e:
+                messages.error(request, str(e))
+            else:
+                messages.success(request, _('Document uploaded successfully.'))
             return redirect('membership:application_status', membership_id=membership.id)
     
     context = {
@@ -94,15 +95,82 @@ def application_status(request, membership_id):
         'app_steps': app_steps,
         'documents': documents,
         'document_choices': DocumentVerification._meta.get_field('document_type').choices,
+        'upload_chunk_size': chunk_size(),
     }
     return render(request, 'membership/application_status.html', context)
 
+def _pending_membership(request, membership_id):
+    """The member's application while documents can still be uploaded"""
+    return get_object_or_404(Membership, id=membership_id, user=request.user, verification_status='PENDING')
+
+def _pending_upload(request, membership_id, upload_id):
+    return get_object_or_404(DocumentUpload, id=upload_id, membership=_pending_membership(request, membership_id))
+
+def _upload_state(upload):
+    return {
+        'upload_id': str(upload.pk),
+        'size': upload.size,
+        'chunk_size': upload.chunk_size,
+        'chunks': upload.chunks,
+        'received': received_chunks(upload),
+    }
+
+@login_required
+@require_POST
+def start_document_upload(request, membership_id):
+    """Start a chunked document upload (document_type, document_number, filename, size, sha256)"""
+    membership = _pending_membership(request, membership_id)
+    try:
+        size = int(request.POST.get('size', ''))
+    except ValueError:
+        return JsonResponse({'error': 'Invalid size'}, status=400)
+    try:
+        upload = start_upload(
+            membership,
+            request.POST.get('document_type', ''),
+            request.POST.get('document_number', '').strip(),
+            request.POST.get('filename', ''),
+            size,
+            request.POST.get('sha256', ''),
+        )
+    except UploadError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse(_upload_state(upload), status=201)
+
+@login_required
+@require_GET
+def document_upload_status(request, membership_id, upload_id):
+    """Chunks received so far, for resuming an interrupted upload"""
+    upload = _pending_upload(request, membership_id, upload_id)
+    return JsonResponse(_upload_state(upload))
+
+@login_required
+@require_http_methods(['PUT'])
+def upload_document_chunk(request, membership_id, upload_id, index):
+    """Store one chunk sent as the raw request body, checked against the X-Chunk-SHA256 header"""
+    upload = _pending_upload(request, membership_id, upload_id)
+    try:
+        received = write_chunk(upload, index, request, request.headers.get('X-Chunk-SHA256', ''))
+    except UploadError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse({'index': index, 'received': received})
+
+@login_required
+@require_POST
+def complete_document_upload(request, membership_id, upload_id):
+    """Assemble the chunks and attach the document to the application"""
+    upload = _pending_upload(request, membership_id, upload_id)
+    try:
+        document = complete_upload(upload)
+    except UploadError as e:
+        return JsonResponse({'error': str(e), 'received': received_chunks(upload)}, status=400)
+    return JsonResponse({'document_id': str(document.pk), 'document_type': document.document_type})
+
 @login_required
 def apply_membership_with_payment(request):
     """Handle new membership application with custom payment amount"""
     # Check if user already has active membership
-    existing_membership = Membership.objects.filter(user=request.user, is_active=True).first()
-    if existing_membership and not existing_membership.is_expired:
+    if Membership.objects.filter(user=request.user, is_active=True, end_date__gte=timezone.localdate()).exists():
         messages.warning(request, _('You already have an active membership.'))
         return redirect('membership:home')
 
@@ -158,37 +226,19 @@ def payment_page(request, membership_id):
     """Display QR code payment page"""
     membership = get_object_or_404(Membership, id=membership_id, user=request.user)
 
-    # Generate dummy QR code for payment
-    payment_id = str(uuid_lib.uuid4())[:8].upper()
-    membership.payment_id = payment_id
-    membership.save()
+    # Dummy payment reference, kept across reloads so the QR payload (and its cached image) stays the same
+    if not membership.payment_id:
+        membership.payment_id = str(uuid_lib.uuid4())[:8].upper()
+        membership.save(update_fields=['payment_id', 'updated_at'])
+    payment_id = membership.payment_id
 
     # Create QR code data
     qr_data = f"UPI://pay?pa=nishadparty@upi&pn=Nishad%20Party&mc=0000&tid={payment_id}&tr={membership.membership_id}&tn=Membership%20Payment&am={membership.amount_paid}&cu=INR"
 
-    # Generate QR code
-    qr = qrcode.QRCode(
-        version=1,
-        error_correction=qrcode.constants.ERROR_CORRECT_L,
-        box_size=10,
-        border=4,
-    )
-    qr.add_data(qr_data)
-    qr.make(fit=True)
-
-    # Create QR code image
-    qr_img = qr.make_image(fill_color="black", back_color="white")
-
-    # Convert to base64 for template
-    buffer = io.BytesIO()
-    qr_img.save(buffer, format='PNG')
-    buffer.seek(0)
-    qr_code_base64 = base64.b64encode(buffer.getvalue()).decode()
-
     context = {
         'membership': membership,
         'payment_id': payment_id,
-        'qr_code_base64': qr_code_base64,
+        'qr_code_url': qr_url(qr_data, error_correction=ERROR_CORRECT_L),
     }
     return render(request, 'membership/payment.html', context)
 
@@ -239,6 +289,35 @@ def membership_card(request):
 
     return render(request, 'membership/card.html', context)
 
+@login_required
+def download_card(request):
+    """Card image (PNG, or PDF with ?format=pdf), redrawn first if the member's details changed"""
+    membership = Membership.objects.filter(
+        user=request.user, is_active=True, verification_status='APPROVED'
+    ).first()
+    if membership is None:
+        raise Http404("No approved membership")
+    name = ensure_card(membership)
+    if request.GET.get('format') == 'pdf':
+        response = HttpResponse(card_pdf(name), content_type='application/pdf')
+        response['Content-Disposition'] = f'attachment; filename="{membership.membership_id}.pdf"'
+        return response
+    return redirect(membership.card_file.url)
+
+@require_GET
+def verify_card(request):
+    """
+    Scan check for volunteers at events. Validates the card token's signature
+    and expiry and looks it up in the cached revocation map; no database query.
+    """
+    status, membership_id, end_date = check_token(request.GET.get('token', ''))
+    return JsonResponse({
+        'valid': status == VALID,
+        'status': status,
+        'membership_id': membership_id,
+        'valid_until': end_date.isoformat() if end_date else None,
+    })
+
 @login_required
 def dashboard_membership_content(request):
     """Return membership dashboard content for AJAX loading"""
@@ -257,3 +336,38 @@ def dashboard_membership_content(request):
         'membership_tiers': membership_tiers,
     }
     return render(request, 'membership/dashboard_content.html', context)
+
+def filter_memberships(request):
+    """Memberships matching the export filters (verification status, tier, active, constituency, date range)"""
+    memberships = Membership.objects.order_by('-created_at')
+
+    if request.GET.get('verification_status'):
+        memberships = memberships.filter(verification_status=request.GET['verification_status'])
+    if request.GET.get('tier', '').isdigit():
+        memberships = memberships.filter(tier_id=request.GET['tier'])
+    if request.GET.get('is_active') in ('0', '1'):
+        memberships = memberships.filter(is_active=request.GET['is_active'] == '1')
+    if request.GET.get('constituency'):
+        memberships = memberships.filter(user__constituency=request.GET['constituency'])
+
+    date_from = parse_date(request.GET.get('from', '') or '')
+    date_to = parse_date(request.GET.get('to', '') or '')
+    if date_from:
+        memberships = memberships.filter(created_at__date__gte=date_from)
+    if date_to:
+        memberships = memberships.filter(created_at__date__lte=date_to)
+    return memberships
+
+@login_required
+@admin_or_feature_required('MEMBERSHIP_MANAGEMENT')
+def export_memberships(request):
+    """Stream the filtered memberships as CSV"""
+    fields = [
+        ('membership_id', 'Membership ID'), ('full_name', 'Name'), ('user__phone_number', 'Phone'),
+        ('email', 'Email'), ('tier__name', 'Tier'), ('start_date', 'Start Date'), ('end_date', 'End Date'),
+        ('is_active', 'Active'), ('verification_status', 'Verification Status'), ('amount_paid', 'Amount Paid'),
+        ('payment_id', 'Payment ID'), ('occupation', 'Occupation'), ('address', 'Address'),
+        ('user__constituency', 'Constituency'), ('user__district', 'District'), ('created_at', 'Applied On'),
+    ]
+    rows = export_rows(filter_memberships(request), [field for field, _ in fields])
+    return export_response(request, 'memberships', [label for _, label in fields], rows)
@@ -78,6 +78,7 @@ MIDDLEWARE = [
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "core.middleware.RateLimitMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -189,6 +190,7 @@ REST_FRAMEWORK = {
 # Third-party API Keys
 RAZORPAY_KEY_ID = os.environ.get('RAZORPAY_KEY_ID')
 RAZORPAY_KEY_SECRET = os.environ.get('RAZORPAY_KEY_SECRET')
+RAZORPAY_WEBHOOK_SECRET = os.environ.get('RAZORPAY_WEBHOOK_SECRET')
 MSG91_AUTH_KEY = os.environ.get('MSG91_AUTH_KEY')
 MSG91_DEFAULT_TEMPLATE = os.environ.get('MSG91_DEFAULT_TEMPLATE')
 SENDGRID_API_KEY = os.environ.get('SENDGRID_API_KEY')
@@ -196,6 +198,16 @@ TWILIO_ACCOUNT_SID = os.environ.get('TWILIO_ACCOUNT_SID')
 TWILIO_AUTH_TOKEN = os.environ.get('TWILIO_AUTH_TOKEN')
 TWILIO_PHONE_NUMBER = os.environ.get('TWILIO_PHONE_NUMBER')
 
+# SMS provider endpoints (overridable to point at a local stand-in)
+MSG91_API_URL = os.environ.get('MSG91_API_URL', 'https://api.msg91.com/api/v5/flow/')
+TWILIO_API_URL = os.environ.get('TWILIO_API_URL', 'https://api.twilio.com')
+
+# OTP delivery queue: (connect, read) timeout in seconds, retries per provider before failover
+OTP_SMS_TIMEOUT = (3.05, 10)
+OTP_SMS_MAX_RETRIES = 2
+OTP_SMS_RETRY_BACKOFF = 0.5
+OTP_DELIVERY_WORKERS = 4
+
 # Email Configuration
 if ENVIRONMENT == 'production':
     EMAIL_BACKEND = 'sendgrid_backend.SendgridBackend'
@@ -203,8 +215,102 @@ if ENVIRONMENT == 'production':
 else:
     EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 
+# Cache Configuration
+# Redis is shared by all gunicorn workers; local memory is a per-process fallback for development
+REDIS_URL = os.environ.get('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django_redis.cache.RedisCache',
+            'LOCATION': REDIS_URL,
+            'OPTIONS': {
+                'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+            },
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# OTP storage: CacheOTPStore keeps codes out of the database but needs a cache
+# shared by all workers (a code issued by one must verify on another), so it is
+# only enabled with Redis
+OTP_STORE_BACKEND = 'accounts.otp_store.CacheOTPStore' if REDIS_URL else 'accounts.otp_store.DatabaseOTPStore'
+OTP_TTL_SECONDS = 600
+OTP_MAX_ATTEMPTS = 5
+
+# Numbers each worker reserves at a time from core.sequences counters. Larger
+# blocks mean fewer counter updates but can leave gaps when a worker restarts.
+ID_SEQUENCE_BLOCK_SIZE = 10
+ID_SEQUENCE_BLOCK_SIZES = {
+    'donation_receipt': 1,  # receipts are audited, keep them gap-free
+}
+
+# Campaign totals: counter rows per campaign and how long a summed total is cached
+CAMPAIGN_COUNTER_SHARDS = 8
+CAMPAIGN_TOTAL_CACHE_TIMEOUT = 5
+
+# Seconds a leaderboard's Redis sorted set lives before it is reloaded from the database
+LEADERBOARD_CACHE_TIMEOUT = 3600
+
+# Background receipt rendering threads per worker; fonts default to DejaVu
+# (set RECEIPT_FONT_PATH / RECEIPT_BOLD_FONT_PATH to a font covering Devanagari)
+RECEIPT_RENDER_WORKERS = 2
+
+# Background threads per worker drawing QR images for asset and gate pass saves (see core.qr)
+QR_RENDER_WORKERS = 1
+
+# Card scans (membership.tokens): seconds each worker reuses its copy of the
+# revocation map, and how long the shared copy is cached. Without Redis the
+# "shared" copy is per process and never sees another worker's revocations,
+# so it lives no longer than the refresh interval
+MEMBERSHIP_REVOCATION_REFRESH = 30
+MEMBERSHIP_REVOCATION_CACHE_TIMEOUT = 3600 if REDIS_URL else MEMBERSHIP_REVOCATION_REFRESH
+
+# Days before expiry that expire_memberships sends a renewal reminder
+MEMBERSHIP_RENEWAL_REMINDER_DAYS = 14
+
+# Chunked verification document uploads (membership.documents). Parts are kept
+# outside MEDIA_ROOT so they are never served; purge_document_uploads removes
+# uploads abandoned for DOCUMENT_UPLOAD_TTL_HOURS
+DOCUMENT_UPLOAD_DIR = BASE_DIR / "upload_parts"
+DOCUMENT_UPLOAD_CHUNK_SIZE = 512 * 1024
+DOCUMENT_UPLOAD_MAX_SIZE = 20 * 1024 * 1024
+DOCUMENT_UPLOAD_TTL_HOURS = 48
+DOCUMENT_PREVIEW_WORKERS = 1
+
+# Recurring donations: days to wait before retrying after the 1st, 2nd, ... failed charge
+RECURRING_RETRY_DAYS = [1, 3, 7]
+
+# Election Commission reporting: donors giving more than this in a financial year
+EC_CONTRIBUTION_THRESHOLD = 20000
+
+# Rows fetched per round trip by the streaming CSV exports (core.exports)
+EXPORT_CHUNK_SIZE = 2000
+
+# Feature permission snapshots are versioned, so this only bounds staleness for out-of-band edits.
+# The version bump only reaches other workers through a shared cache, so without
+# Redis snapshots are read from the database on every request (0 disables caching)
+FEATURE_PERMISSION_CACHE_TIMEOUT = 300 if REDIS_URL else 0
+
+# Rate limiting: per-IP ceilings applied by core.middleware.RateLimitMiddleware.
+# Per-phone and per-user limits are set on the views with core.ratelimit.ratelimit
+RATE_LIMIT_RULES = [
+    {'path': '/accounts/login/', 'rate': '20/10m', 'key': 'ip', 'methods': ['POST']},
+    {'path': '/accounts/verify-otp/', 'rate': '30/10m', 'key': 'ip', 'methods': ['POST']},
+    {'path': '/accounts/resend-otp/', 'rate': '10/10m', 'key': 'ip', 'methods': ['POST']},
+    {'path': '/donations/donate/', 'rate': '30/h', 'key': 'ip', 'methods': ['POST']},
+]
+# Addresses or networks of the reverse proxies whose X-Real-IP header is trusted
+# (comma separated). Requests from anywhere else are keyed on their own address.
+TRUSTED_PROXIES = [proxy.strip() for proxy in os.environ.get('TRUSTED_PROXIES', '').split(',') if proxy.strip()]
+
 # Session Configuration
-SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+# Cache-first sessions need a cache shared by all workers, so they are only enabled with Redis
+SESSION_ENGINE = 'core.sessions' if REDIS_URL else 'django.contrib.sessions.backends.db'
 SESSION_COOKIE_AGE = 86400  # 24 hours
 
 # Logging Configuration